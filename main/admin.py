@@ -2,11 +2,25 @@
 
 from django.contrib import admin
 
-from .models import VkAccount
+from .models import VkAccount, ProfileChange, ProfileSnapshot
 
 
 class VkAccountAdmin(admin.ModelAdmin):
     readonly_fields = ('date_of_first_request',)
+    list_filter = ('watched',)
+
+
+class ProfileChangeAdmin(admin.ModelAdmin):
+    list_display = ('account', 'section', 'detected_at')
+    list_filter = ('section',)
+    readonly_fields = ('detected_at',)
+
+
+class ProfileSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('vk_id', 'version', 'fetched_at')
+    exclude = ('friends', 'subscribed_users', 'subscribed_groups', 'post_dates')
 
 
 admin.site.register(VkAccount, VkAccountAdmin)
+admin.site.register(ProfileChange, ProfileChangeAdmin)
+admin.site.register(ProfileSnapshot, ProfileSnapshotAdmin)
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def enable_wal(sender, connection, **kwargs) -> None:
+    """
+    Перевод SQLite в режим журнала WAL: чтение не блокируется
+    записью, а запись не ждёт завершения чтений
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL;')
+            cursor.execute('PRAGMA synchronous=NORMAL;')
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self) -> None:
+        connection_created.connect(enable_wal)
+        # подключение сброса кэша истории при изменении записей
+        from . import history  # noqa: F401
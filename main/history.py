@@ -0,0 +1,178 @@
+"""Запись истории запросов пользователей и её постраничная выдача с кэшированием"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from threading import Lock
+from time import sleep, time_ns
+from typing import Dict, List, Optional, Tuple
+import atexit
+import logging
+
+from django.db import DatabaseError
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from vkapi.cache import get_cache
+from .models import VkAccount
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PAGE_SIZE = 50
+FLUSH_DELAY = 1.0
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history-writer')
+_pending: Dict[Tuple[str, str], VkAccount] = {}
+_scheduled = False
+_lock = Lock()
+
+
+def record_history(login: str, link: str, first_name: str, last_name: str) -> None:
+    """
+    Функция, добавляющая аккаунт в историю запросов пользователя
+    без ожидания записи в БД: запись попадает в буфер, который
+    фоновый поток сохраняет одним пакетом через FLUSH_DELAY секунд
+
+    Parameters
+    ----------
+    login: str
+        Логин пользователя
+    link: str
+        Ссылка на аккаунт VK
+    first_name: str
+        Имя владельца аккаунта
+    last_name: str
+        Фамилия владельца аккаунта
+
+    """
+    global _scheduled
+    with _lock:
+        _pending.setdefault((login, link), VkAccount(
+            link=link, first_name=first_name, last_name=last_name, creator=login
+        ))
+        if _scheduled:
+            return
+        _scheduled = True
+    _executor.submit(_flush_later)
+
+
+def flush_history() -> int:
+    """
+    Функция, сохраняющая буфер истории одним пакетом. Записи,
+    уже имеющиеся в истории пользователя, пропускаются ограничением
+    уникальности (creator, link). При ошибке БД записи возвращаются
+    в буфер и сохраняются при следующей записи истории
+
+    Returns
+    -------
+    int
+        Количество записей в сохранённом буфере
+
+    """
+    global _scheduled
+    with _lock:
+        accounts = list(_pending.values())
+        _pending.clear()
+        _scheduled = False
+
+    if accounts:
+        try:
+            VkAccount.objects.bulk_create(accounts, ignore_conflicts=True)
+        except DatabaseError:
+            logger.exception('Не удалось сохранить историю запросов (%d записей)', len(accounts))
+            with _lock:
+                for account in accounts:
+                    _pending.setdefault((account.creator, account.link), account)
+            return 0
+        # bulk_create не отправляет post_save
+        for login in {account.creator for account in accounts}:
+            get_cache().set(f'history_version:{login}', time_ns())
+    return len(accounts)
+
+
+def _flush_later() -> None:
+    """Сохранение буфера истории после паузы, за которую накапливаются записи"""
+    sleep(FLUSH_DELAY)
+    flush_history()
+
+
+atexit.register(flush_history)
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[date, int]]:
+    """
+    Функция разбора курсора страницы истории вида <дата>_<ID записи>
+
+    Parameters
+    ----------
+    cursor: Optional[str]
+        Курсор из адреса страницы
+
+    Returns
+    -------
+    Optional[Tuple[date, int]]
+        Дата добавления и ID последней записи предыдущей страницы
+        (None для первой страницы)
+
+    Raises
+    ------
+    ValueError
+        Если курсор некорректен
+
+    """
+    if not cursor:
+        return None
+    day, _, pk = cursor.partition('_')
+    return date.fromisoformat(day), int(pk)
+
+
+def get_history_page(login: str, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Функция, возвращающая страницу истории запросов пользователя
+    (от новых записей к старым). Страницы выбираются по ключу
+    (дата добавления, ID) индекса (creator, date_of_first_request)
+    и кэшируются до изменения истории пользователя
+
+    Parameters
+    ----------
+    login: str
+        Логин пользователя
+    cursor: Optional[str]
+        Курсор, полученный с предыдущей страницей
+
+    Returns
+    -------
+    Tuple[List[Dict], Optional[str]]
+        Записи страницы (name, link, watched) и курсор следующей
+        страницы (None для последней)
+
+    Raises
+    ------
+    ValueError
+        Если курсор некорректен
+
+    """
+    after = parse_cursor(cursor)
+    cache = get_cache()
+    version = cache.get_or_set(f'history_version:{login}', time_ns)
+
+    def build() -> Tuple[List[Dict], Optional[str]]:
+        accounts = VkAccount.objects.filter(creator=login).order_by('-date_of_first_request', '-id')
+        if after is not None:
+            accounts = accounts.filter(Q(date_of_first_request__lt=after[0]) |
+                                       Q(date_of_first_request=after[0], id__lt=after[1]))
+        page = list(accounts[:HISTORY_PAGE_SIZE + 1])
+        last = page[HISTORY_PAGE_SIZE - 1] if len(page) > HISTORY_PAGE_SIZE else None
+        return [{
+            'name': f'{elem.first_name} {elem.last_name}',
+            'link': elem.link,
+            'watched': elem.watched
+        } for elem in page[:HISTORY_PAGE_SIZE]], last and f'{last.date_of_first_request.isoformat()}_{last.id}'
+
+    return cache.get_or_set(f'history:{login}:{version}:{cursor or ""}', build)
+
+
+@receiver([post_save, post_delete], sender=VkAccount)
+def invalidate_history(instance: VkAccount, **kwargs) -> None:
+    """Сброс кэша истории автора записи при её изменении"""
+    get_cache().set(f'history_version:{instance.creator}', time_ns())
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.3 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_vkaccount_first_name_vkaccount_last_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vkaccount',
+            name='watched',
+            field=models.BooleanField(default=False, verbose_name='Отслеживается'),
+        ),
+        migrations.AddField(
+            model_name='vkaccount',
+            name='watch_state',
+            field=models.JSONField(blank=True, null=True, verbose_name='Состояние при последней синхронизации'),
+        ),
+        migrations.CreateModel(
+            name='ProfileChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(choices=[('friends', 'Друзья'), ('subscriptions', 'Подписки'), ('activity', 'Записи на стене')], max_length=20, verbose_name='Раздел')),
+                ('added', models.JSONField(default=list, verbose_name='Добавлены')),
+                ('removed', models.JSONField(default=list, verbose_name='Удалены')),
+                ('detected_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата обнаружения')),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='main.vkaccount', verbose_name='Аккаунт')),
+            ],
+            options={
+                'verbose_name': 'Изменение аккаунта',
+                'verbose_name_plural': 'Изменения аккаунтов',
+                'db_table': 'Изменения аккаунтов',
+                'ordering': ['-detected_at'],
+            },
+        ),
+    ]
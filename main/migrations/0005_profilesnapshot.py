@@ -0,0 +1,38 @@
+# Generated by Django 5.0.3 on 2026-10-19 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_vkaccount_watched_vkaccount_watch_state_profilechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vk_id', models.BigIntegerField(verbose_name='ID VK')),
+                ('version', models.PositiveIntegerField(verbose_name='Версия')),
+                ('fetched_at', models.DateTimeField(verbose_name='Дата получения')),
+                ('info', models.JSONField(verbose_name='Данные аккаунта')),
+                ('friends', models.BinaryField(null=True, verbose_name='Друзья')),
+                ('subscribed_users', models.BinaryField(null=True, verbose_name='Подписки на пользователей')),
+                ('subscribed_groups', models.BinaryField(null=True, verbose_name='Подписки на сообщества')),
+                ('post_dates', models.BinaryField(null=True, verbose_name='Даты постов')),
+            ],
+            options={
+                'verbose_name': 'Снимок аккаунта',
+                'verbose_name_plural': 'Снимки аккаунтов',
+                'db_table': 'Снимки аккаунтов',
+                'ordering': ['vk_id', '-version'],
+                'get_latest_by': 'version',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='profilesnapshot',
+            constraint=models.UniqueConstraint(fields=('vk_id', 'version'), name='unique_snapshot_version'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_profilesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vkaccount',
+            index=models.Index(fields=['creator', 'date_of_first_request'], name='account_creator_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vkaccount',
+            index=models.Index(fields=['creator', 'link'], name='account_creator_link_idx'),
+        ),
+    ]
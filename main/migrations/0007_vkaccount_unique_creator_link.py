@@ -0,0 +1,46 @@
+# Generated by Django 5.0.3 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Удаление повторных записей истории (creator, link) перед созданием
+    ограничения уникальности: остаётся самая ранняя запись, к ней
+    переносятся изменения и отметка отслеживания дубликатов
+    """
+    VkAccount = apps.get_model('main', 'VkAccount')
+    ProfileChange = apps.get_model('main', 'ProfileChange')
+
+    kept = {}
+    for account in VkAccount.objects.order_by('id'):
+        key = (account.creator, account.link)
+        if key not in kept:
+            kept[key] = account
+            continue
+        original = kept[key]
+        ProfileChange.objects.filter(account=account).update(account=original)
+        if account.watched and not original.watched:
+            original.watched = True
+            original.watch_state = original.watch_state or account.watch_state
+            original.save(update_fields=['watched', 'watch_state'])
+        account.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_vkaccount_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='vkaccount',
+            name='account_creator_link_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='vkaccount',
+            constraint=models.UniqueConstraint(fields=('creator', 'link'), name='unique_account_per_creator'),
+        ),
+    ]
@@ -12,6 +12,8 @@ class VkAccount(models.Model):
     first_name = models.CharField('Имя', max_length=200)
     last_name = models.CharField('Фамилия', max_length=200)
     date_of_first_request = models.DateField('Дата добавления', auto_now_add=True)
+    watched = models.BooleanField('Отслеживается', default=False)
+    watch_state = models.JSONField('Состояние при последней синхронизации', null=True, blank=True)
 
     def __str__(self):
         return self.link
@@ -21,3 +23,66 @@ class VkAccount(models.Model):
         verbose_name_plural = 'Аккаунты'
         db_table = verbose_name_plural
         ordering = ['-date_of_first_request']
+        indexes = [
+            models.Index(fields=['creator', 'date_of_first_request'], name='account_creator_date_idx')
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['creator', 'link'], name='unique_account_per_creator')
+        ]
+
+
+class ProfileChange(models.Model):
+    """Модель изменения отслеживаемого аккаунта между синхронизациями"""
+
+    SECTIONS = [
+        ('friends', 'Друзья'),
+        ('subscriptions', 'Подписки'),
+        ('activity', 'Записи на стене')
+    ]
+
+    objects = None
+    account = models.ForeignKey(VkAccount, on_delete=models.CASCADE, related_name='changes',
+                                verbose_name='Аккаунт')
+    section = models.CharField('Раздел', max_length=20, choices=SECTIONS)
+    added = models.JSONField('Добавлены', default=list)
+    removed = models.JSONField('Удалены', default=list)
+    detected_at = models.DateTimeField('Дата обнаружения', auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.account}: {self.section} (+{len(self.added)}/-{len(self.removed)})'
+
+    class Meta:
+        verbose_name = 'Изменение аккаунта'
+        verbose_name_plural = 'Изменения аккаунтов'
+        db_table = verbose_name_plural
+        ordering = ['-detected_at']
+
+
+class ProfileSnapshot(models.Model):
+    """
+    Модель версии данных об аккаунте VK (UserInfo). Списки ID друзей,
+    подписок и дат постов хранятся упакованными в массивы int64
+    """
+
+    objects = None
+    vk_id = models.BigIntegerField('ID VK')
+    version = models.PositiveIntegerField('Версия')
+    fetched_at = models.DateTimeField('Дата получения')
+    info = models.JSONField('Данные аккаунта')
+    friends = models.BinaryField('Друзья', null=True)
+    subscribed_users = models.BinaryField('Подписки на пользователей', null=True)
+    subscribed_groups = models.BinaryField('Подписки на сообщества', null=True)
+    post_dates = models.BinaryField('Даты постов', null=True)
+
+    def __str__(self):
+        return f'{self.vk_id} v{self.version}'
+
+    class Meta:
+        verbose_name = 'Снимок аккаунта'
+        verbose_name_plural = 'Снимки аккаунтов'
+        db_table = verbose_name_plural
+        ordering = ['vk_id', '-version']
+        get_latest_by = 'version'
+        constraints = [
+            models.UniqueConstraint(fields=['vk_id', 'version'], name='unique_snapshot_version')
+        ]
@@ -0,0 +1,71 @@
+"""Тесты постраничной выдачи истории запросов"""
+
+from datetime import date, timedelta
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from vkapi import cache
+from .history import HISTORY_PAGE_SIZE, get_history_page, parse_cursor
+from .models import VkAccount
+
+
+class HistoryPageTests(TestCase):
+    """Тесты выборки страниц истории по ключу (дата добавления, ID)"""
+
+    def setUp(self) -> None:
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(VKAPI_CACHE={'BACKEND': 'vkapi.cache.SQLiteCache',
+                                                   'LOCATION': f'{directory}/cache.sqlite3',
+                                                   'MAX_SIZE': 64 * 1024 * 1024, 'TIMEOUT': 60 * 60})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # кэш создаётся один раз на процесс, поэтому сбрасывается на время теста
+        cache._cache = None
+        self.addCleanup(setattr, cache, '_cache', None)
+
+        # по три записи на дату, чтобы границы страниц приходились и на одинаковые даты
+        today = date.today()
+        for number in range(2 * HISTORY_PAGE_SIZE + 10):
+            account = VkAccount.objects.create(link=f'https://vk.com/id{number}', first_name='Имя',
+                                               last_name=str(number), creator='tester')
+            VkAccount.objects.filter(pk=account.pk).update(date_of_first_request=today - timedelta(days=number // 3))
+        VkAccount.objects.create(link='https://vk.com/id1', first_name='Имя', last_name='Чужой', creator='other')
+
+    def expected_links(self) -> list:
+        """Ссылки истории в порядке от новых записей к старым"""
+        return list(VkAccount.objects.filter(creator='tester').order_by('-date_of_first_request', '-id')
+                    .values_list('link', flat=True))
+
+    def test_pages_follow_cursor(self) -> None:
+        links, sizes, cursor = [], [], None
+        while True:
+            page, cursor = get_history_page('tester', cursor)
+            links += [item['link'] for item in page]
+            sizes.append(len(page))
+            if cursor is None:
+                break
+        self.assertEqual(sizes, [HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE, 10])
+        self.assertEqual(links, self.expected_links())
+
+    def test_cursor_is_stable_when_history_grows(self) -> None:
+        first, cursor = get_history_page('tester')
+        VkAccount.objects.create(link='https://vk.com/new', first_name='Имя', last_name='Новый', creator='tester')
+        second, _ = get_history_page('tester', cursor)
+        self.assertEqual(second[0]['link'], self.expected_links()[HISTORY_PAGE_SIZE + 1])
+        self.assertNotIn(first[-1]['link'], [item['link'] for item in second])
+
+    def test_cache_is_invalidated(self) -> None:
+        get_history_page('tester')
+        VkAccount.objects.filter(creator='tester').first().delete()
+        page, _ = get_history_page('tester')
+        self.assertEqual([item['link'] for item in page], self.expected_links()[:HISTORY_PAGE_SIZE])
+
+    def test_parse_cursor(self) -> None:
+        self.assertIsNone(parse_cursor(None))
+        self.assertEqual(parse_cursor('2024-05-01_17'), (date(2024, 5, 1), 17))
+        for cursor in ('2024-05-01', 'bad_1', '2024-05-01_x'):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                get_history_page('tester', cursor)
@@ -6,6 +6,7 @@ from . import views
 
 urlpatterns = [
     path('', views.index_view, name='index'),
+    path('watch', views.watch_view, name='watch'),
     path('logout', views.logout_view, name='logout'),
     path('change_theme', views.change_theme, name='change_theme')
 ]
@@ -1,15 +1,23 @@
 """Обработка страниц приложения main"""
 
+import os
+
+from django.conf import settings
 from django.shortcuts import render, redirect, HttpResponse, HttpResponseRedirect
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponseBadRequest
+from django.views.decorators.http import require_POST
 
+from vkapi.refresh import schedule_refresh
+from vkapi.vk_tools import Vk
 from .models import VkAccount
+from .history import get_history_page
 
 
 def index_view(request: HttpRequest) -> HttpResponse:
     """
     Высылка главной страницы, проверка,
-    аутентифицирован ли пользователь, с помощью cookie
+    аутентифицирован ли пользователь, с помощью cookie.
+    История запросов выдаётся постранично (параметр after - курсор)
 
     Parameters
     ----------
@@ -35,20 +43,57 @@ def index_view(request: HttpRequest) -> HttpResponse:
             'main/index.html',
             {'theme': request.COOKIES['theme']}
         )
+
+    after = request.GET.get('after')
+    try:
+        history, next_cursor = get_history_page(login, after)
+    except ValueError:
+        return HttpResponseBadRequest('Некорректный курсор')
+
+    if not after:
+        # обновление устаревших данных о недавних аккаунтах истории в фоне
+        recent = [elem['link'] for elem in history[:settings.VKAPI_PREFETCH['ENTRIES']]]
+        schedule_refresh(('history', login), lambda: Vk(token=os.environ['VK_TOKEN']).prefetch_info(
+            recent, settings.VKAPI_PREFETCH['BUDGET']
+        ))
+
     return render(
         request,
         'main/auth-index.html',
         {
             'login': login,
-            'links': [{
-                'name': f'{elem.first_name} {elem.last_name}',
-                'link': elem.link
-            } for elem in VkAccount.objects.filter(creator=login)],
+            'links': history,
+            'after': after,
+            'next': next_cursor,
             'theme': request.COOKIES['theme']
         }
     )
 
 
+@require_POST
+def watch_view(request: HttpRequest) -> HttpResponseRedirect:
+    """
+    Включение или отключение отслеживания аккаунта из истории
+    запросов пользователя (POST с параметром link)
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    HttpResponseRedirect
+        Перенаправление на главную страницу
+
+    """
+    if 'login' in request.COOKIES:
+        for account in VkAccount.objects.filter(creator=request.COOKIES['login'], link=request.POST.get('link')):
+            account.watched = not account.watched
+            account.save(update_fields=['watched'])
+    return redirect('/')
+
+
 def logout_view(request: HttpRequest) -> HttpResponseRedirect:
     """
     Выход из учётной записи путём
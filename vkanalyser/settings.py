@@ -127,3 +127,65 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 STATICFILES_DIRS = [
     BASE_DIR / 'vkanalyser/static'
 ]
+
+# Cache of VK API data shared by all worker processes
+# (backends: vkapi.cache.SQLiteCache, vkapi.cache.FileCache)
+
+VKAPI_CACHE = {
+    'BACKEND': 'vkapi.cache.SQLiteCache',
+    'LOCATION': BASE_DIR / 'vkapi_cache.sqlite3',
+    'MAX_SIZE': 256 * 1024 * 1024,
+    'TIMEOUT': 60 * 60,
+}
+
+# Limit of VK API requests per second for one token, shared by all threads of a process
+# and, through the schedule file below, by all worker and bulk analysis processes
+
+VKAPI_RATE_LIMIT = 3
+
+VKAPI_RATE_LIMIT_LOCATION = BASE_DIR / 'vkapi_rate_limit.sqlite3'
+
+# Requests per second available to each priority class within the limit above;
+# background requests also wait while interactive ones are queued
+
+VKAPI_PRIORITY_QUOTAS = {
+    'interactive': 3,
+    'background': 2,
+}
+
+# Directory for reports of bulk analysis uploaded through the site
+
+VKAPI_BULK_DIR = BASE_DIR / 'bulk_reports'
+
+# Bulk analyses started through the site: how many may run at once and after how
+# many seconds without progress a job is considered dead
+
+VKAPI_BULK = {
+    'MAX_JOBS': 2,
+    'STALE_TIMEOUT': 15 * 60,
+}
+
+# Background refresh of stale profile data for the most recent history entries
+# when the history page is opened (ENTRIES checked, at most BUDGET refreshed)
+
+VKAPI_PREFETCH = {
+    'ENTRIES': 20,
+    'BUDGET': 5,
+}
+
+# Synchronisation of watched accounts by the watch command: pause between cycles
+# in seconds and the number of VK API calls one cycle may spend
+
+VKAPI_WATCH = {
+    'INTERVAL': 60 * 60,
+    'BUDGET': 300,
+}
+
+# Local copy of the obscene words corpus used by the toxicity check, one word per line
+# (None - download it from GitHub on every check)
+
+VKAPI_OBSCENE_CORPUS = None
+
+# Age in seconds after which the stored snapshot of a profile is fetched from VK again
+
+VKAPI_SNAPSHOT_MAX_AGE = 60 * 60
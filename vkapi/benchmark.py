@@ -0,0 +1,130 @@
+"""Замеры времени работы методов Vk и Visualization"""
+
+from hashlib import sha1
+from pickle import dumps
+from statistics import median
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+import re
+
+from main.models import ProfileSnapshot
+from .cache import get_cache
+from .crawl_budget import CrawlBudget
+from .fake_api import FakeVkSession
+from .visualization import Visualization
+from .vk_tools import Vk
+
+_UUID = re.compile(rb'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+
+def _fingerprint(result: Any) -> str:
+    """Хэш результата сценария без UUID (идентификаторов элементов в HTML графиков)"""
+    return sha1(_UUID.sub(b'', dumps(result))).hexdigest()[:12]
+
+
+def _friend_ids(vk: Vk, link: str, count: int) -> List[int]:
+    """Первые count друзей пользователя"""
+    return (vk.get_info(link).get('friends') or [])[:count]
+
+
+def _friend_links(vk: Vk, link: str, count: int) -> List[str]:
+    """Ссылки на первых count друзей пользователя"""
+    return [f'https://vk.com/id{_id}' for _id in _friend_ids(vk, link, count)]
+
+
+SCENARIOS: Dict[str, Callable[[Vk, str], Any]] = {
+    'get_info': lambda vk, link: vk.get_info(link),
+    'get_info_short': lambda vk, link: vk.get_info_short(link),
+    'get_users_list_info': lambda vk, link: vk.get_users_list_info(_friend_ids(vk, link, 5000)),
+    'get_groups_list_info': lambda vk, link: vk.get_groups_list_info(
+        (vk.get_info(link).get('subscriptions') or {}).get('groups') or []
+    ),
+    'get_friends_demographics': lambda vk, link: vk.get_friends_demographics(link),
+    'get_activity': lambda vk, link: vk.get_activity(vk.get_info(link)),
+    'sample_activity': lambda vk, link: vk.sample_activity(vk.get_info(link)),
+    'check_toxicity': lambda vk, link: vk.check_toxicity(vk.get_info(link)),
+    'get_mutual_friends': lambda vk, link: vk.get_mutual_friends(link, *_friend_links(vk, link, 1)),
+    'compare_friends': lambda vk, link: vk.compare_friends(link, *_friend_links(vk, link, 3)),
+    'get_common_connections': lambda vk, link: vk.get_common_connections(link),
+    'get_friend_graph': lambda vk, link: vk.get_friend_graph(link),
+    'estimate_two_hop_reach': lambda vk, link: vk.estimate_two_hop_reach(link),
+    'get_counters': lambda vk, link: vk.get_counters(_friend_ids(vk, link, 100)),
+    'visualization.mutual_friends_graph': lambda vk, link: Visualization(
+        link, vk=vk).get_mutual_friends_graph_html(),
+    'visualization.graph_analytics': lambda vk, link: Visualization(link, vk=vk).get_graph_analytics(),
+    'visualization.toxicity': lambda vk, link: Visualization(link, vk=vk).get_toxicity(),
+    'visualization.subscriptions': lambda vk, link: (Visualization(link, vk=vk).get_user_subscriptions(),
+                                                     Visualization(link, vk=vk).get_group_subscriptions()),
+    'visualization.activity_graph': lambda vk, link: Visualization(link, vk=vk).get_activity_graph_html()
+}
+
+
+def run_benchmark(vk: Vk, link: str, names: Optional[List[str]] = None, repeat: int = 3, warm: bool = False,
+                  session: Optional[FakeVkSession] = None) -> List[Dict[str, Any]]:
+    """
+    Функция, замеряющая время выполнения сценариев SCENARIOS.
+    Перед каждым запуском (кроме warm) очищаются кэш, снимки аккаунтов
+    в БД и статистика обхода стен, поэтому замеряется обработка без
+    сохранённых данных.
+    Для определения недетерминированных результатов считается хэш ответа
+
+    Parameters
+    ----------
+    vk: Vk
+        Объект доступа к API VK
+    link: str
+        Ссылка на анализируемый аккаунт
+    names: Optional[List[str]]
+        Названия сценариев (по умолчанию все)
+    repeat: int
+        Количество запусков каждого сценария
+    warm: bool
+        Не очищать кэш между запусками
+    session: Optional[FakeVkSession]
+        Сессия vk, статистика которой добавляется к результатам
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        По каждому сценарию: название, минимальное и медианное время
+        в секундах, количество запросов к API и ошибок 6 за последний
+        запуск, хэши результатов запусков (или текст ошибки)
+
+    Raises
+    ------
+    KeyError
+        Если сценарий не существует
+
+    """
+    cache = get_cache()
+    results = []
+    for name in names or list(SCENARIOS):
+        scenario = SCENARIOS[name]
+        seconds, digests, error = [], [], None
+        for _ in range(repeat):
+            if not warm:
+                cache.clear()
+                CrawlBudget.reset_stats()
+                ProfileSnapshot.objects.all().delete()
+            if session is not None:
+                session.reset_stats()
+            start = perf_counter()
+            try:
+                result = scenario(vk, link)
+            except Exception as exception:
+                error = f'{type(exception).__name__}: {exception}'
+                break
+            seconds.append(perf_counter() - start)
+            digests.append(_fingerprint(result))
+
+        stats = session.stats if session is not None else {}
+        results.append({
+            'name': name,
+            'min': min(seconds) if seconds else None,
+            'median': median(seconds) if seconds else None,
+            'requests': stats.get('requests'),
+            'errors': stats.get('errors:6', 0),
+            'digests': digests,
+            'error': error
+        })
+    return results
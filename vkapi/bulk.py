@@ -0,0 +1,340 @@
+"""Пакетный анализ списка аккаунтов VK с записью отчёта в CSV или Parquet"""
+
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps, loads
+from threading import Lock, local
+from time import monotonic, time
+from typing import Callable, Dict, Iterable, List, Optional
+import logging
+import os
+
+import pandas as pd
+from django.conf import settings
+from vk_api.exceptions import ApiError
+
+from .rate_limit import priority, BACKGROUND
+from .toxicity_check import check_obscene_vocabulary
+from .visualization import Visualization
+from .vk_tools import Vk
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = ['link', 'id', 'first_name', 'last_name', 'country', 'city', 'friends_count',
+                  'followers_count', 'texts', 'toxicity', 'sampled', 'error']
+
+
+def analyse_profile(vk: Vk, link: str) -> Dict:
+    """
+    Функция, рассчитывающая показатели одного аккаунта для отчёта:
+    данные профиля, количество проанализированных текстов (комментарии
+    пользователя за месяц и последние 100 записей на его стене, без
+    ограничения по дате) и долю токсичных среди них (у крупных
+    аккаунтов комментарии ищутся по выборке стен)
+
+    Parameters
+    ----------
+    vk: Vk
+        Объект доступа к API VK
+    link: str
+        Ссылка на аккаунт
+
+    Returns
+    -------
+    Dict
+        Строка отчёта; при ошибке заполнены только link и error
+
+    """
+    try:
+        # профиль держится в памяти потока всё время анализа, поэтому - в компактном виде
+        info = vk.get_info(link, compact=True)
+    except (TypeError, IndexError):
+        return {'link': link, 'error': 'Некорректная ссылка'}
+    except ApiError as error:
+        return {'link': link, 'error': str(error)}
+    except Exception as error:
+        logger.exception('Ошибка анализа аккаунта %s', link)
+        return {'link': link, 'error': f'{type(error).__name__}: {error}'}
+
+    size = (info.get('friends_count') or 0) + (info.get('followers_count') or 0)
+    sample = Visualization.SAMPLE_SIZE if size > Visualization.LARGE_ACCOUNT_THRESHOLD else None
+    error = None
+    try:
+        texts = vk.get_activity(info, times=False, sample=sample) or []
+        toxicity = len(check_obscene_vocabulary(texts)) / len(texts) if texts else None
+    except ApiError as exception:
+        texts, toxicity, error = [], None, str(exception)
+    except Exception as exception:
+        logger.exception('Ошибка анализа активности аккаунта %s', link)
+        texts, toxicity, error = [], None, f'{type(exception).__name__}: {exception}'
+
+    return {
+        'link': link,
+        'id': info.get('id'),
+        'first_name': info.get('first_name'),
+        'last_name': info.get('last_name'),
+        'country': info.get('country'),
+        'city': info.get('city'),
+        'friends_count': info.get('friends_count'),
+        'followers_count': info.get('followers_count'),
+        'texts': len(texts),
+        'toxicity': toxicity,
+        'sampled': sample is not None,
+        'error': error
+    }
+
+
+def read_checkpoint(path: str) -> List[Dict]:
+    """
+    Функция, читающая строки отчёта, сохранённые предыдущим запуском
+
+    Parameters
+    ----------
+    path: str
+        Путь к файлу контрольной точки (JSON Lines)
+
+    Returns
+    -------
+    List[Dict]
+        Готовые строки отчёта
+
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        # последняя строка может быть недописана при аварийном завершении
+        rows = []
+        for line in f:
+            try:
+                rows.append(loads(line))
+            except ValueError:
+                break
+        return rows
+
+
+def write_report(rows: List[Dict], output: str) -> None:
+    """
+    Функция, записывающая отчёт в Parquet (по расширению .parquet,
+    требуется пакет pyarrow) или в CSV
+
+    Parameters
+    ----------
+    rows: List[Dict]
+        Строки отчёта
+    output: str
+        Путь к файлу отчёта
+
+    Raises
+    ------
+    ImportError
+        Если для Parquet не установлен pyarrow
+
+    """
+    frame = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    for column in ('id', 'friends_count', 'followers_count', 'texts'):
+        frame[column] = frame[column].astype('Int64')
+    for column in ('country', 'city'):
+        frame[column] = frame[column].astype('category')
+
+    if output.endswith('.parquet'):
+        frame.to_parquet(output, index=False)
+    else:
+        frame.to_csv(output, index=False)
+
+
+def run_bulk(links: Iterable[str], output: str, workers: int = 4,
+             progress: Optional[Callable[[int, int, float], None]] = None) -> Dict:
+    """
+    Функция пакетного анализа аккаунтов. Аккаунты обрабатываются
+    параллельно в workers потоках (у каждого потока свой объект Vk,
+    запросы выполняются с фоновым приоритетом в пределах общего
+    для процесса лимита токена).
+    Готовые строки сразу дописываются в контрольную точку
+    <output>.checkpoint, поэтому повторный запуск продолжает работу
+    с места остановки; в конце отчёт записывается в output.
+    Ошибка одного аккаунта записывается в его строку отчёта, при
+    аварийном завершении текст ошибки записывается в <output>.failed.
+    PID процесса записывается в <output>.pid (см. is_running)
+
+    Parameters
+    ----------
+    links: Iterable[str]
+        Ссылки на аккаунты
+    output: str
+        Путь к файлу отчёта (.parquet или .csv)
+    workers: int
+        Количество потоков
+    progress: Optional[Callable[[int, int, float], None]]
+        Функция, вызываемая после каждого аккаунта с количеством
+        готовых аккаунтов, их общим количеством и скоростью (аккаунтов в минуту)
+
+    Returns
+    -------
+    Dict
+        Количество аккаунтов (total), обработанных в этом запуске (processed),
+        время работы в секундах (seconds) и скорость (profiles_per_minute)
+
+    """
+    if os.path.exists(f'{output}.failed'):
+        os.remove(f'{output}.failed')
+    with open(f'{output}.pid', 'w', encoding='utf-8') as f:
+        f.write(str(os.getpid()))
+    try:
+        return _run_bulk(links, output, workers, progress)
+    except BaseException as error:
+        logger.exception('Пакетный анализ %s завершён с ошибкой', output)
+        mark_failed(output, f'{type(error).__name__}: {error}')
+        raise
+
+
+def _run_bulk(links: Iterable[str], output: str, workers: int,
+              progress: Optional[Callable[[int, int, float], None]]) -> Dict:
+    """Пакетный анализ аккаунтов без обработки аварийного завершения (см. run_bulk)"""
+    checkpoint = f'{output}.checkpoint'
+    rows = read_checkpoint(checkpoint)
+    done = {row['link'] for row in rows}
+    pending = list(dict.fromkeys(link for link in links if link and link not in done))
+    total = len(rows) + len(pending)
+
+    state = local()
+    lock = Lock()
+    started = monotonic()
+
+    def analyse(link: str) -> None:
+        if not hasattr(state, 'vk'):
+            state.vk = Vk(token=os.environ['VK_TOKEN'])
+        with priority(BACKGROUND):
+            row = analyse_profile(state.vk, link)
+        with lock:
+            rows.append(row)
+            f.write(dumps(row, ensure_ascii=False) + '\n')
+            f.flush()
+            if progress:
+                elapsed = monotonic() - started
+                progress(len(rows), total, (len(rows) - len(done)) / elapsed * 60 if elapsed else 0.0)
+
+    # контрольная точка переписывается, чтобы отбросить недописанную строку
+    with open(checkpoint, 'w', encoding='utf-8') as f:
+        f.writelines(dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(analyse, pending))
+
+    write_report(rows, output)
+    os.remove(checkpoint)
+
+    seconds = monotonic() - started
+    return {
+        'total': total,
+        'processed': len(pending),
+        'seconds': seconds,
+        'profiles_per_minute': len(pending) / seconds * 60 if seconds else 0.0
+    }
+
+
+def mark_failed(output: str, error: str) -> None:
+    """
+    Функция, отмечающая задачу пакетного анализа как завершённую с ошибкой
+
+    Parameters
+    ----------
+    output: str
+        Путь к файлу отчёта задачи
+    error: str
+        Текст ошибки
+
+    """
+    with open(f'{output}.failed', 'w', encoding='utf-8') as f:
+        f.write(error)
+
+
+def read_failure(output: str) -> Optional[str]:
+    """
+    Функция, возвращающая ошибку задачи пакетного анализа
+
+    Parameters
+    ----------
+    output: str
+        Путь к файлу отчёта задачи
+
+    Returns
+    -------
+    Optional[str]
+        Текст ошибки или None, если задача не завершалась с ошибкой
+
+    """
+    if not os.path.exists(f'{output}.failed'):
+        return None
+    with open(f'{output}.failed', encoding='utf-8') as f:
+        return f.read() or 'Неизвестная ошибка'
+
+
+def is_running(output: str) -> bool:
+    """
+    Функция, проверяющая, выполняется ли задача пакетного анализа:
+    есть контрольная точка, процесс задачи (если записан его PID
+    в <output>.pid) жив и контрольная точка обновлялась не раньше
+    чем VKAPI_BULK['STALE_TIMEOUT'] секунд назад
+
+    Parameters
+    ----------
+    output: str
+        Путь к файлу отчёта задачи
+
+    Returns
+    -------
+    bool
+        Выполняется ли задача?
+
+    """
+    checkpoint = f'{output}.checkpoint'
+    try:
+        if time() - os.path.getmtime(checkpoint) > settings.VKAPI_BULK['STALE_TIMEOUT']:
+            return False
+    except OSError:
+        return False
+    if os.path.exists(f'{output}.failed'):
+        return False
+
+    try:
+        with open(f'{output}.pid', encoding='utf-8') as f:
+            pid = int(f.read())
+    except (OSError, ValueError):
+        return True
+    return _process_alive(pid)
+
+
+def running_jobs(directory: str) -> int:
+    """
+    Функция, возвращающая количество выполняющихся задач пакетного анализа
+
+    Parameters
+    ----------
+    directory: str
+        Каталог отчётов задач
+
+    Returns
+    -------
+    int
+        Количество задач
+
+    """
+    if not os.path.isdir(directory):
+        return 0
+    return sum(is_running(os.path.join(directory, name[:-len('.checkpoint')]))
+               for name in os.listdir(directory) if name.endswith('.checkpoint'))
+
+
+def _process_alive(pid: int) -> bool:
+    """Проверка, что процесс с заданным PID существует и не завершён"""
+    try:
+        # завершившийся дочерний процесс этого же процесса остаётся зомби до вызова waitpid
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,484 @@
+"""Общий для рабочих процессов кэш данных VK API"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional
+from array import array
+from hashlib import sha1
+from threading import local, Lock
+from time import time
+import os
+import pickle
+import sqlite3
+import struct
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .single_flight import single_flight
+
+DEFAULT_CACHE = {
+    'BACKEND': 'vkapi.cache.SQLiteCache',
+    'LOCATION': 'vkapi_cache.sqlite3',
+    'MAX_SIZE': 256 * 1024 * 1024,
+    'TIMEOUT': 3600
+}
+
+
+class _PackedInts(bytes):
+    """Список целых чисел, упакованный в массив int64"""
+
+
+def _pack(value: Any) -> Any:
+    """
+    Функция, заменяющая списки целых чисел (ID друзей, подписок,
+    даты постов) на упакованные массивы int64
+
+    Parameters
+    ----------
+    value: Any
+        Сериализуемое значение
+
+    Returns
+    -------
+    Any
+        Значение с упакованными списками
+
+    """
+    if isinstance(value, list):
+        if value and all(type(item) is int for item in value):
+            try:
+                return _PackedInts(array('q', value).tobytes())
+            except OverflowError:
+                return value
+        return [_pack(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_pack(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _pack(item) for key, item in value.items()}
+    return value
+
+
+def _unpack(value: Any) -> Any:
+    """
+    Функция, обратная _pack
+
+    Parameters
+    ----------
+    value: Any
+        Десериализованное значение
+
+    Returns
+    -------
+    Any
+        Значение со списками целых чисел
+
+    """
+    if isinstance(value, _PackedInts):
+        ints = array('q')
+        ints.frombytes(value)
+        return ints.tolist()
+    if isinstance(value, list):
+        return [_unpack(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_unpack(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _unpack(item) for key, item in value.items()}
+    return value
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Компактная бинарная сериализация значения кэша
+
+    Parameters
+    ----------
+    value: Any
+        Значение
+
+    Returns
+    -------
+    bytes
+        Сжатое бинарное представление
+
+    """
+    return zlib.compress(pickle.dumps(_pack(value), protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def loads(data: bytes) -> Any:
+    """
+    Десериализация значения кэша
+
+    Parameters
+    ----------
+    data: bytes
+        Бинарное представление
+
+    Returns
+    -------
+    Any
+        Значение
+
+    """
+    return _unpack(pickle.loads(zlib.decompress(data)))
+
+
+class BaseCache(ABC):
+    """
+    Базовый класс кэша с ограничением по размеру и вытеснением
+    давно не использованных записей (LRU)
+
+    Attributes
+    ----------
+    location: str
+        Расположение хранилища
+    max_size: int
+        Максимальный суммарный размер записей в байтах
+    timeout: int
+        Время жизни записи по умолчанию в секундах
+    ACCESS_RESOLUTION: int
+        Точность времени последнего обращения к записи в секундах
+        (чаще оно не обновляется, чтобы чтение не было записью)
+
+    Methods
+    -------
+    get(key, default)
+        Получение значения по ключу
+    set(key, value, timeout)
+        Сохранение значения
+    delete(key)
+        Удаление значения
+    clear()
+        Удаление всех значений
+    get_or_set(key, func, timeout)
+        Получение значения или его вычисление и сохранение
+
+    """
+
+    ACCESS_RESOLUTION = 60
+
+    def __init__(self, location: str, max_size: int, timeout: int) -> None:
+        """
+        Инициализация кэша
+
+        Parameters
+        ----------
+        location: str
+            Расположение хранилища
+        max_size: int
+            Максимальный суммарный размер записей в байтах
+        timeout: int
+            Время жизни записи по умолчанию в секундах
+
+        """
+        self.location = str(location)
+        self.max_size = max_size
+        self.timeout = timeout
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Метод, возвращающий значение по ключу или default,
+        если записи нет или она устарела
+
+        Parameters
+        ----------
+        key: str
+            Ключ
+        default: Any
+            Значение по умолчанию
+
+        Returns
+        -------
+        Any
+            Значение из кэша
+
+        """
+        data = self._get(key)
+        return default if data is None else loads(data)
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        """
+        Метод, сохраняющий значение в кэше
+
+        Parameters
+        ----------
+        key: str
+            Ключ
+        value: Any
+            Значение
+        timeout: Optional[int]
+            Время жизни записи в секундах
+
+        """
+        self._set(key, dumps(value), time() + (self.timeout if timeout is None else timeout))
+
+    def delete(self, key: str) -> None:
+        """
+        Метод, удаляющий значение из кэша
+
+        Parameters
+        ----------
+        key: str
+            Ключ
+
+        """
+        self._delete(key)
+
+    def clear(self) -> None:
+        """Метод, удаляющий все значения из кэша"""
+        self._clear()
+
+    def get_or_set(self, key: str, func: Callable[[], Any], timeout: Optional[int] = None) -> Any:
+        """
+        Метод, возвращающий значение из кэша, а при его
+        отсутствии вычисляющий и сохраняющий его. Одновременные
+        вычисления одного ключа в процессе объединяются в одно.
+        Значение None не кэшируется
+
+        Parameters
+        ----------
+        key: str
+            Ключ
+        func: Callable[[], Any]
+            Функция вычисления значения
+        timeout: Optional[int]
+            Время жизни записи в секундах
+
+        Returns
+        -------
+        Any
+            Значение
+
+        """
+        data = self._get(key)
+        if data is not None:
+            return loads(data)
+
+        def compute() -> Any:
+            # значение могло быть сохранено, пока вызов ждал своей очереди
+            data = self._get(key)
+            if data is not None:
+                return loads(data)
+            value = func()
+            if value is not None:
+                self.set(key, value, timeout)
+            return value
+
+        return single_flight.do((self.location, key), compute)
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        """Чтение сериализованного значения (None, если записи нет или она устарела)"""
+
+    @abstractmethod
+    def _set(self, key: str, data: bytes, expires: float) -> None:
+        """Запись сериализованного значения с моментом устаревания expires"""
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        """Удаление записи"""
+
+    @abstractmethod
+    def _clear(self) -> None:
+        """Удаление всех записей"""
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кэш в файле базы данных SQLite, общий для всех рабочих процессов.
+    Суммарный размер записей поддерживается триггерами в таблице
+    cache_size, время обращения к записи обновляется не чаще раза
+    в ACCESS_RESOLUTION секунд, поэтому чтение почти никогда
+    не требует блокировки на запись
+    """
+
+    def __init__(self, location: str, max_size: int, timeout: int) -> None:
+        super().__init__(location, max_size, timeout)
+        self.__local = local()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение с базой данных (своё для каждого потока)"""
+        if not hasattr(self.__local, 'connection'):
+            connection = sqlite3.connect(self.location, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # INSERT OR REPLACE вызывает триггер удаления заменяемой записи
+            connection.execute('PRAGMA recursive_triggers=ON')
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                                   'size INTEGER NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)')
+                connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+                connection.execute('CREATE TABLE IF NOT EXISTS cache_size (total INTEGER NOT NULL)')
+                connection.execute('INSERT INTO cache_size SELECT COALESCE(SUM(size), 0) FROM cache '
+                                   'WHERE NOT EXISTS (SELECT 1 FROM cache_size)')
+                connection.execute('CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache '
+                                   'BEGIN UPDATE cache_size SET total = total + NEW.size; END')
+                connection.execute('CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache '
+                                   'BEGIN UPDATE cache_size SET total = total - OLD.size; END')
+                connection.execute('COMMIT')
+            except sqlite3.Error:
+                connection.execute('ROLLBACK')
+                raise
+            self.__local.connection = connection
+        return self.__local.connection
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._connection.execute('SELECT value, expires, accessed FROM cache WHERE key = ?',
+                                       (key,)).fetchone()
+        if row is None:
+            return
+        now = time()
+        if row[1] < now:
+            self._delete(key)
+            return
+        if now - row[2] > self.ACCESS_RESOLUTION:
+            self._connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def _set(self, key: str, data: bytes, expires: float) -> None:
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+                               (key, data, len(data), expires, time()))
+            if self.__total() > self.max_size:
+                connection.execute('DELETE FROM cache WHERE expires < ?', (time(),))
+                excess = self.__total() - self.max_size
+                for old_key, size in connection.execute('SELECT key, size FROM cache WHERE key != ? '
+                                                        'ORDER BY accessed', (key,)).fetchall():
+                    if excess <= 0:
+                        break
+                    connection.execute('DELETE FROM cache WHERE key = ?', (old_key,))
+                    excess -= size
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+
+    def __total(self) -> int:
+        """Суммарный размер записей"""
+        return self._connection.execute('SELECT total FROM cache_size').fetchone()[0]
+
+    def _delete(self, key: str) -> None:
+        self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def _clear(self) -> None:
+        self._connection.execute('DELETE FROM cache')
+
+
+class FileCache(BaseCache):
+    """
+    Кэш в каталоге файловой системы, общий для всех рабочих процессов.
+    Каждая запись - отдельный файл, время последнего обращения
+    хранится во времени изменения файла
+    """
+
+    HEADER = struct.Struct('<d')
+
+    def __init__(self, location: str, max_size: int, timeout: int) -> None:
+        super().__init__(location, max_size, timeout)
+        os.makedirs(self.location, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.location, sha1(key.encode()).hexdigest() + '.cache')
+
+    def _get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires, = self.HEADER.unpack(f.read(self.HEADER.size))
+                data = f.read()
+                accessed = os.fstat(f.fileno()).st_mtime
+            now = time()
+            if expires < now:
+                self._delete(key)
+                return
+            if now - accessed > self.ACCESS_RESOLUTION:
+                os.utime(path)
+            return data
+        except (OSError, struct.error):
+            return
+
+    def _set(self, key: str, data: bytes, expires: float) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.HEADER.pack(expires))
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._evict(self._path(key))
+
+    def _delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _clear(self) -> None:
+        for name in os.listdir(self.location):
+            if name.endswith('.cache'):
+                try:
+                    os.remove(os.path.join(self.location, name))
+                except OSError:
+                    pass
+
+    def _evict(self, keep: str) -> None:
+        """
+        Удаление давно не использованных файлов
+        при превышении максимального размера кэша
+
+        Parameters
+        ----------
+        keep: str
+            Путь к только что записанному файлу, который удалять нельзя
+
+        """
+        entries = []
+        with os.scandir(self.location) as it:
+            for entry in it:
+                if entry.name.endswith('.cache'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        excess = sum(size for _, size, _ in entries) - self.max_size
+        for _, size, path in sorted(entries):
+            if excess <= 0:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            excess -= size
+
+
+_cache = None
+_cache_lock = Lock()
+
+
+def get_cache() -> BaseCache:
+    """
+    Функция, возвращающая объект кэша, настроенный
+    параметром VKAPI_CACHE в настройках проекта
+
+    Returns
+    -------
+    BaseCache
+        Объект кэша
+
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            options = {**DEFAULT_CACHE, **getattr(settings, 'VKAPI_CACHE', {})}
+            _cache = import_string(options['BACKEND'])(
+                location=options['LOCATION'],
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT']
+            )
+    return _cache
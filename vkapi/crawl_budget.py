@@ -0,0 +1,145 @@
+"""Класс, распределяющий бюджет запросов к API при сборе комментариев"""
+
+from collections import OrderedDict
+from typing import Dict, List
+from threading import Lock
+
+
+class CrawlBudget:
+    """
+    Бюджет вызовов VK API на один анализ активности аккаунта.
+    Хранит статистику попаданий (найденных комментариев пользователя)
+    по стенам и ранжирует стены так, чтобы бюджет в первую очередь
+    тратился на самые перспективные из них
+
+    Attributes
+    ----------
+    user_id: int
+        ID анализируемого пользователя
+    remaining: int
+        Оставшееся количество вызовов API
+    PRIOR_WEIGHT: int
+        Вес априорной оценки стены в числе вызовов
+    MAX_USERS: int
+        Количество пользователей, статистика которых хранится в процессе
+    _stats: OrderedDict[int, Dict[int, List[int]]]
+        Общая для процесса статистика: ID пользователя -> ID стены ->
+        [число найденных комментариев, число вызовов API]; статистика
+        давно не анализировавшихся пользователей вытесняется (LRU)
+
+    Methods
+    -------
+    spend(calls)
+        Списание вызовов из бюджета
+    rank(candidates)
+        Ранжирование стен по ожидаемой доле попаданий
+    record(owner_id, calls, hits)
+        Сохранение результатов обхода стены
+    reset_stats()
+        Очистка статистики попаданий
+
+    """
+
+    PRIOR_WEIGHT = 2
+    MAX_USERS = 1000
+
+    _stats: OrderedDict[int, Dict[int, List[int]]] = OrderedDict()
+    _lock = Lock()
+
+    def __init__(self, user_id: int, calls: int) -> None:
+        """
+        Инициализация бюджета
+
+        Parameters
+        ----------
+        user_id: int
+            ID анализируемого пользователя
+        calls: int
+            Допустимое количество вызовов API
+
+        """
+        self.user_id = user_id
+        self.remaining = calls
+
+    def spend(self, calls: int = 1) -> bool:
+        """
+        Метод, списывающий вызовы из бюджета. Возвращает False,
+        если бюджета на них не хватает
+
+        Parameters
+        ----------
+        calls: int
+            Количество вызовов
+
+        Returns
+        -------
+        bool
+            Удалось ли списать вызовы?
+
+        """
+        if self.remaining < calls:
+            return False
+        self.remaining -= calls
+        return True
+
+    def rank(self, candidates: List[int]) -> List[int]:
+        """
+        Метод, упорядочивающий стены по убыванию ожидаемого числа
+        комментариев пользователя на один вызов API.
+        Априорная оценка берётся из порядка кандидатов (порядок hints
+        из friends.get), затем уточняется результатами прошлых обходов
+
+        Parameters
+        ----------
+        candidates: List[int]
+            ID стен в порядке убывания априорной значимости
+
+        Returns
+        -------
+        List[int]
+            ID стен в порядке обхода
+
+        """
+        with self._lock:
+            if self.user_id in self._stats:
+                self._stats.move_to_end(self.user_id)
+            stats = dict(self._stats.get(self.user_id, {}))
+
+        scores = {}
+        for position, owner_id in enumerate(candidates):
+            prior = 1 / (position + 2)
+            hits, calls = stats.get(owner_id, (0, 0))
+            scores[owner_id] = (hits + self.PRIOR_WEIGHT * prior) / (calls + self.PRIOR_WEIGHT)
+
+        return sorted(dict.fromkeys(candidates), key=lambda owner_id: -scores[owner_id])
+
+    def record(self, owner_id: int, calls: int, hits: int) -> None:
+        """
+        Метод, сохраняющий результаты обхода стены
+
+        Parameters
+        ----------
+        owner_id: int
+            ID стены
+        calls: int
+            Количество вызовов API (закрытая стена - один вызов без попаданий)
+        hits: int
+            Количество найденных комментариев пользователя
+
+        """
+        if not calls:
+            return
+        with self._lock:
+            if self.user_id in self._stats:
+                self._stats.move_to_end(self.user_id)
+            elif len(self._stats) >= self.MAX_USERS:
+                self._stats.popitem(last=False)
+            stats = self._stats.setdefault(self.user_id, {}).setdefault(owner_id, [0, 0])
+            stats[0] += hits
+            stats[1] += calls
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        """Метод, очищающий общую статистику попаданий (обход снова идёт по априорной оценке)"""
+        with cls._lock:
+            cls._stats.clear()
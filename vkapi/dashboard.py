@@ -0,0 +1,100 @@
+"""Потоковая выдача разделов страницы анализа аккаунта по мере готовности"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from json import dumps
+from typing import Callable, Dict, Iterator
+import logging
+import os
+
+from django.template.loader import render_to_string
+
+from .visualization import Visualization
+from .vk_tools import Vk, UserInfo
+
+logger = logging.getLogger(__name__)
+
+
+def _subscriptions(visualization: Visualization) -> str:
+    """Первая страница подписок пользователя"""
+    user_subscriptions, users_next = visualization.get_user_subscriptions()
+    group_subscriptions, groups_next = visualization.get_group_subscriptions()
+    return render_to_string('vkapi/subscriptions.html', {
+        'link': visualization.link,
+        'user_subscriptions': user_subscriptions,
+        'group_subscriptions': group_subscriptions,
+        'users_after': '',
+        'groups_after': '',
+        'users_next': users_next,
+        'groups_next': groups_next
+    })
+
+
+def _toxicity(visualization: Visualization) -> str:
+    """Сведения о токсичности пользователя"""
+    return render_to_string('vkapi/toxicity.html', {'toxicity': visualization.get_toxicity()})
+
+
+def _acquaintances(visualization: Visualization) -> str:
+    """Рекомендации по знакомствам от GigaChat"""
+    return render_to_string('vkapi/acquaintances.html', {
+        'recommendations': visualization.vk.analyse_acquaintances(visualization.user_info)
+    })
+
+
+def _demographics(visualization: Visualization) -> str:
+    """Демография друзей пользователя"""
+    return render_to_string('vkapi/demographics.html', {
+        'demographics': visualization.vk.get_friends_demographics(visualization.link)
+    })
+
+
+SECTIONS: Dict[str, Callable[[Visualization], str]] = {
+    'subscriptions': _subscriptions,
+    'friends-graph': Visualization.get_mutual_friends_graph_html,
+    'activity': Visualization.get_activity_graph_html,
+    'toxicity': _toxicity,
+    'acquaintances': _acquaintances,
+    'demographics': _demographics
+}
+
+
+def iter_dashboard_events(link: str, info: UserInfo) -> Iterator[str]:
+    """
+    Генератор событий server-sent events с HTML разделов страницы анализа.
+    Все разделы рассчитываются параллельно по одним и тем же данным
+    об аккаунте (у каждого потока свой объект Vk, частота запросов
+    ограничена общим лимитом токена) и отправляются по мере готовности
+
+    Parameters
+    ----------
+    link: str
+        Ссылка на аккаунт
+    info: UserInfo
+        Данные об аккаунте
+
+    Returns
+    -------
+    Iterator[str]
+        События section с полями id и html, в конце - событие done
+        (в том числе после ошибок, чтобы клиент не переподключался
+        и не запускал анализ заново)
+
+    """
+    def build(section: str) -> str:
+        visualization = Visualization(link, vk=Vk(token=os.environ['VK_TOKEN']), user_info=info)
+        return SECTIONS[section](visualization)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(SECTIONS)) as executor:
+            futures = {executor.submit(build, section): section for section in SECTIONS}
+            for future in as_completed(futures):
+                try:
+                    html = future.result()
+                except Exception:
+                    logger.exception('Ошибка раздела %s страницы анализа %s', futures[future], link)
+                    html = render_to_string('vkapi/section-error.html')
+                yield f'event: section\ndata: {dumps({"id": futures[future], "html": html})}\n\n'
+    except Exception:
+        logger.exception('Ошибка потока разделов страницы анализа %s', link)
+
+    yield 'event: done\ndata: {}\n\n'
@@ -0,0 +1,77 @@
+"""Функции агрегирования демографии друзей пользователя"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .vk_tools_models import FriendDemographics
+
+
+def friends_frame(raw_users: List[Dict]) -> pd.DataFrame:
+    """
+    Функция, переводящая ответы users.get в компактную таблицу:
+    страна, город и университет хранятся как категории,
+    год рождения - как целое число с пропусками
+
+    Parameters
+    ----------
+    raw_users: List[Dict]
+        Ответы users.get с полями country, city, bdate и education
+
+    Returns
+    -------
+    pd.DataFrame
+        Таблица с колонками country, city, birth_year, university
+
+    """
+    def titles(field: str) -> pd.Categorical:
+        return pd.Categorical([(user.get(field) or {}).get('title') for user in raw_users])
+
+    bdates = pd.Series([user.get('bdate') for user in raw_users], dtype='string')
+    return pd.DataFrame({
+        'country': titles('country'),
+        'city': titles('city'),
+        # год указан только в датах вида Д.М.ГГГГ
+        'birth_year': bdates.str.extract(r'\.(\d{4})$', expand=False).astype('Int16'),
+        'university': pd.Categorical([user.get('university_name') or None for user in raw_users])
+    })
+
+
+def _top(column: pd.Series, top: int) -> List[Tuple[str, int]]:
+    """Самые частые известные значения категориальной колонки"""
+    counts = column.value_counts(sort=True)
+    return [(str(value), int(count)) for value, count in counts[counts > 0].head(top).items()]
+
+
+def aggregate_demographics(frame: pd.DataFrame, top: int = 10) -> FriendDemographics:
+    """
+    Функция, рассчитывающая распределения друзей по странам, городам,
+    годам рождения и университетам (группировки по категориям
+    выполняются векторно, без обхода словарей)
+
+    Parameters
+    ----------
+    frame: pd.DataFrame
+        Таблица, построенная функцией friends_frame
+    top: int
+        Количество самых частых значений в распределениях
+
+    Returns
+    -------
+    FriendDemographics
+        Распределения и доля друзей, указавших каждое поле
+
+    """
+    total = len(frame)
+    years = frame['birth_year'].dropna().to_numpy(dtype=np.int64)
+    year_values, year_counts = np.unique(years, return_counts=True)
+
+    return FriendDemographics(
+        total=total,
+        countries=_top(frame['country'], top),
+        cities=_top(frame['city'], top),
+        birth_years=list(zip(year_values.tolist(), year_counts.tolist())),
+        universities=_top(frame['university'], top),
+        filled={column: int(frame[column].notna().sum()) for column in frame.columns}
+    )
@@ -0,0 +1,544 @@
+"""Работа с VK API без доступа к VK: синтетическая сеть, запись и воспроизведение ответов"""
+
+from json import JSONDecoder, dump, dumps, load
+from random import Random
+from threading import Lock
+from time import sleep, time
+from typing import Any, Dict, List, Optional
+import re
+
+import numpy as np
+from requests import Session
+
+_API_CALL = re.compile(r'API\.([\w.]+)\(')
+
+
+class FakeApiError(Exception):
+    """Ошибка вызова метода синтетической сети в терминах VK API"""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class SyntheticNetwork:
+    """
+    Детерминированная синтетическая сеть VK: пользователи со случайным
+    графом дружбы, подписками и стенами, сообщества. Все данные
+    определяются зерном, поэтому ответы не зависят от порядка вызовов.
+    ID пользователей - 1..users, ID сообществ - 1..groups
+
+    Attributes
+    ----------
+    users: int
+        Количество пользователей
+    groups: int
+        Количество сообществ
+    now: int
+        Момент времени, относительно которого датируются записи
+    indptr, indices: np.ndarray
+        Граф дружбы в формате CSR (индексы пользователей с нуля)
+    private: np.ndarray
+        Признаки закрытых профилей
+    TOXIC_WORDS: Tuple[str]
+        Слова синтетического словаря нецензурной лексики, которые
+        с вероятностью TOXIC_SHARE добавляются в тексты записей и комментариев
+
+    Methods
+    -------
+    call(method, params)
+        Ответ на вызов метода API
+    write_obscene_corpus(path)
+        Запись синтетического словаря нецензурной лексики
+
+    """
+
+    FIRST_NAMES = ('Александр', 'Мария', 'Дмитрий', 'Анна', 'Иван', 'Елена', 'Сергей', 'Ольга')
+    LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов')
+    CITIES = (
+        ('Россия', ('Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск')),
+        ('Беларусь', ('Минск', 'Гомель')),
+        ('Казахстан', ('Алматы', 'Астана'))
+    )
+    UNIVERSITIES = ('МГУ', 'СПбГУ', 'МАИ', 'БГУ', None)
+    WORDS = ('привет', 'отличный', 'пост', 'согласен', 'спасибо', 'интересно', 'фото', 'когда', 'встреча')
+    TOXIC_WORDS = ('бранное', 'ругательное')
+    TOXIC_SHARE = 0.05
+    PHOTO = 'https://vk.com/images/camera_50.png'
+
+    def __init__(self, users: int = 2000, groups: int = 300, average_friends: int = 60,
+                 private_share: float = 0.1, posts: int = 20, seed: int = 0) -> None:
+        """
+        Построение сети
+
+        Parameters
+        ----------
+        users: int
+            Количество пользователей
+        groups: int
+            Количество сообществ
+        average_friends: int
+            Среднее количество друзей
+        private_share: float
+            Доля закрытых профилей
+        posts: int
+            Среднее количество записей на стене
+        seed: int
+            Зерно генератора случайных чисел
+
+        """
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.seed = seed
+        self.now = int(time())
+
+        rng = np.random.default_rng(seed)
+        pairs = rng.integers(0, users, size=(users * average_friends // 2, 2))
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        keys = np.unique(np.concatenate([pairs[:, 0] * users + pairs[:, 1], pairs[:, 1] * users + pairs[:, 0]]))
+        self.indices = keys % users
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(keys // users, minlength=users))])
+        self.private = rng.random(users) < private_share
+
+    def call(self, method: str, params: Dict[str, Any]) -> Any:
+        """
+        Метод, возвращающий ответ на вызов метода API
+
+        Parameters
+        ----------
+        method: str
+            Название метода
+        params: Dict[str, Any]
+            Параметры вызова (значения - строки или числа)
+
+        Returns
+        -------
+        Any
+            Содержимое поля response ответа VK
+
+        Raises
+        ------
+        FakeApiError
+            Если метод не поддерживается или вызов завершился ошибкой
+
+        """
+        handler = self.__handlers().get(method)
+        if handler is None:
+            raise FakeApiError(3, f'Unknown method passed: {method}')
+        return handler(params)
+
+    def __handlers(self) -> Dict[str, Any]:
+        """Обработчики поддерживаемых методов API"""
+        return {
+            'users.get': self.__users_get,
+            'friends.get': self.__friends_get,
+            'friends.getMutual': self.__friends_get_mutual,
+            'users.getSubscriptions': self.__get_subscriptions,
+            'groups.getById': self.__groups_get_by_id,
+            'wall.get': self.__wall_get,
+            'wall.getComments': self.__wall_get_comments,
+            'utils.resolveScreenName': self.__resolve_screen_name
+        }
+
+    def __rng(self, *key: int) -> Random:
+        """Генератор, определяемый зерном сети и ключом объекта"""
+        return Random('-'.join(map(str, (self.seed, *key))))
+
+    def __user_index(self, value: Any) -> int:
+        """Индекс пользователя по ID из параметров вызова"""
+        _id = int(value)
+        if not 1 <= _id <= self.users:
+            raise FakeApiError(113, 'Invalid user id')
+        return _id - 1
+
+    def __friends(self, index: int) -> np.ndarray:
+        """ID друзей пользователя с данным индексом"""
+        return self.indices[self.indptr[index]:self.indptr[index + 1]] + 1
+
+    def __check_access(self, index: int) -> None:
+        """Ошибка доступа к закрытому профилю"""
+        if self.private[index]:
+            raise FakeApiError(30, 'This profile is private')
+
+    def __user(self, index: int, counters: bool) -> Dict[str, Any]:
+        """Данные пользователя в формате users.get"""
+        rng = self.__rng(1, index)
+        country, cities = rng.choice(self.CITIES)
+        user = {
+            'id': index + 1,
+            'first_name': rng.choice(self.FIRST_NAMES),
+            'last_name': rng.choice(self.LAST_NAMES),
+            'is_closed': bool(self.private[index]),
+            'can_access_closed': not bool(self.private[index]),
+            'photo_50': self.PHOTO,
+            'bdate': f'{rng.randint(1, 28)}.{rng.randint(1, 12)}.{rng.randint(1960, 2008)}',
+            'country': {'id': self.CITIES.index((country, cities)) + 1, 'title': country},
+            'city': {'id': index % 100 + 1, 'title': rng.choice(cities)},
+            'interests': ', '.join(rng.sample(self.WORDS, 2)),
+            'books': '', 'games': '', 'movies': '', 'music': '', 'activities': ''
+        }
+        university = rng.choice(self.UNIVERSITIES)
+        if university is not None:
+            user.update(university_name=university, faculty_name='Факультет',
+                        education_form='Очное отделение', graduation=rng.randint(2000, 2030))
+        if counters:
+            subscriptions = self.__subscriptions(index)
+            user['counters'] = {
+                'friends': len(self.__friends(index)),
+                'followers': rng.randint(0, 500),
+                'groups': len(subscriptions['groups']['items']),
+                'pages': 0,
+                'subscriptions': len(subscriptions['users']['items'])
+            }
+        return user
+
+    def __users_get(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ids = str(params.get('user_ids') or params.get('user_id', '')).replace(' ', '').split(',')
+        indices = [self.__user_index(_id) for _id in ids if _id]
+        # счётчики VK возвращает только при запросе одного пользователя
+        return [self.__user(index, len(indices) == 1 and 'counters' in str(params.get('fields', '')))
+                for index in indices]
+
+    def __friends_get(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        index = self.__user_index(params['user_id'])
+        self.__check_access(index)
+        friends = self.__friends(index).tolist()
+        offset = int(params.get('offset') or 0)
+        count = int(params.get('count') or 5000)
+        return {'count': len(friends), 'items': friends[offset:offset + count]}
+
+    def __friends_get_mutual(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        source = self.__friends(self.__user_index(params['source_uid']))
+        result = []
+        for target in str(params['target_uids']).split(','):
+            common = np.intersect1d(source, self.__friends(self.__user_index(target))).tolist()
+            result.append({'id': int(target), 'common_friends': common, 'common_count': len(common)})
+        return result
+
+    def __subscriptions(self, index: int) -> Dict[str, Any]:
+        """Подписки пользователя в формате users.getSubscriptions"""
+        rng = self.__rng(2, index)
+        users = sorted(rng.sample(range(1, self.users + 1), min(self.users, rng.randint(0, 10))))
+        groups = sorted(rng.sample(range(1, self.groups + 1), min(self.groups, rng.randint(0, 30))))
+        return {'users': {'count': len(users), 'items': users}, 'groups': {'count': len(groups), 'items': groups}}
+
+    def __get_subscriptions(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        index = self.__user_index(params['user_id'])
+        self.__check_access(index)
+        return self.__subscriptions(index)
+
+    def __groups_get_by_id(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ids = [int(_id) for _id in str(params.get('group_ids') or params.get('group_id', '')).split(',') if _id]
+        return [{'id': _id, 'name': f'Сообщество {_id}', 'screen_name': f'club{_id}', 'photo_50': self.PHOTO}
+                for _id in ids if 1 <= _id <= self.groups]
+
+    def __text(self, rng: Random, words: int) -> str:
+        """Текст записи или комментария из не более чем words слов"""
+        text = rng.choices(self.WORDS, k=rng.randint(1, words))
+        if rng.random() < self.TOXIC_SHARE:
+            text.append(rng.choice(self.TOXIC_WORDS))
+        return ' '.join(text)
+
+    @classmethod
+    def write_obscene_corpus(cls, path: str) -> None:
+        """
+        Метод, записывающий синтетический словарь нецензурной лексики
+        в формате онлайн-базы (по слову в строке), чтобы анализ
+        токсичности выполнялся без доступа к сети
+
+        Parameters
+        ----------
+        path: str
+            Путь к файлу словаря
+
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(f'{word}\n' for word in cls.TOXIC_WORDS)
+
+    def __wall(self, owner_id: int) -> List[Dict[str, Any]]:
+        """Записи на стене (от новых к старым)"""
+        rng = self.__rng(3, owner_id)
+        count = rng.randint(0, 2 * self.posts)
+        dates = sorted((self.now - rng.randint(0, 60 * 24 * 60 * 60) for _ in range(count)), reverse=True)
+        return [{
+            'id': count - number,
+            'owner_id': owner_id,
+            'from_id': owner_id,
+            'date': date,
+            'text': self.__text(rng, 8),
+            'comments': {'count': rng.choice((0, 0, 1, 3, 10, 40))}
+        } for number, date in enumerate(dates)]
+
+    def __wall_get(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        owner_id = int(params['owner_id'])
+        if owner_id > 0:
+            self.__check_access(self.__user_index(owner_id))
+        elif not 1 <= -owner_id <= self.groups:
+            raise FakeApiError(100, 'One of the parameters specified was missing or invalid: owner_id')
+        posts = self.__wall(owner_id)
+        offset = int(params.get('offset') or 0)
+        count = int(params.get('count') or 20)
+        return {'count': len(posts), 'items': posts[offset:offset + count]}
+
+    def __wall_get_comments(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        owner_id, post_id = int(params['owner_id']), int(params['post_id'])
+        post = next((post for post in self.__wall(owner_id) if post['id'] == post_id), None)
+        if post is None:
+            raise FakeApiError(100, 'One of the parameters specified was missing or invalid: post_id')
+
+        rng = self.__rng(4, owner_id, post_id)
+        authors = self.__friends(owner_id - 1).tolist() if owner_id > 0 else []
+        authors = authors or list(range(1, self.users + 1))
+        comments = [{
+            'id': number + 1,
+            'from_id': rng.choice(authors),
+            'date': post['date'] + rng.randint(60, 24 * 60 * 60),
+            'text': self.__text(rng, 6)
+        } for number in range(post['comments']['count'])]
+        count = int(params.get('count') or 10)
+        return {'count': len(comments), 'items': comments[:count]}
+
+    def __resolve_screen_name(self, params: Dict[str, Any]) -> Dict[str, Any] | List:
+        name = str(params['screen_name']).lower()
+        for prefix, kind, limit in (('id', 'user', self.users), ('user', 'user', self.users),
+                                    ('club', 'group', self.groups)):
+            number = name[len(prefix):]
+            if name.startswith(prefix) and number.isdigit() and 1 <= int(number) <= limit:
+                return {'type': kind, 'object_id': int(number)}
+        return []
+
+
+class _FakeResponse:
+    """Ответ FakeVkSession с интерфейсом requests.Response, используемым vk_api"""
+
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self.ok = True
+        self.status_code = 200
+        self.__payload = payload
+
+    def json(self) -> Dict[str, Any]:
+        return self.__payload
+
+
+def _fixture_key(method: str, params: Dict[str, Any]) -> str:
+    """Ключ записанного ответа: метод и параметры без токена и версии API"""
+    return dumps([method, {key: str(value) for key, value in params.items() if key not in ('access_token', 'v')}],
+                 ensure_ascii=False, sort_keys=True)
+
+
+def load_fixtures(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Функция чтения записанных ответов VK API (файл RecordingSession)
+
+    Parameters
+    ----------
+    path: str
+        Путь к файлу JSON
+
+    Returns
+    -------
+    Dict[str, Dict[str, Any]]
+        Ответы по ключам вызовов
+
+    """
+    with open(path, encoding='utf-8') as f:
+        return {_fixture_key(item['method'], item['params']): item['response'] for item in load(f)}
+
+
+class FakeVkSession:
+    """
+    HTTP-сессия для vk_api, отвечающая на запросы к VK API без сети:
+    сначала записанными ответами, затем по синтетической сети. Имитирует
+    задержку ответа и ошибку 6 (слишком много запросов в секунду),
+    которую vk_api обрабатывает повтором запроса через полсекунды.
+    Передаётся в Vk(token, session=...)
+
+    Attributes
+    ----------
+    fixtures: Dict[str, Dict[str, Any]]
+        Записанные ответы по ключам вызовов
+    network: Optional[SyntheticNetwork]
+        Синтетическая сеть для вызовов без записанного ответа
+    latency: float
+        Задержка каждого ответа в секундах
+    jitter: float
+        Максимальная случайная добавка к задержке в секундах
+    error_rate: float
+        Вероятность ответа ошибкой 6
+    stats: Dict[str, int]
+        Количество запросов, ошибок 6 и вызовов по методам
+
+    Methods
+    -------
+    post(url, data, headers)
+        Ответ на запрос к методу API
+    reset_stats()
+        Обнуление статистики
+
+    """
+
+    def __init__(self, fixtures: Optional[Dict[str, Dict[str, Any]]] = None,
+                 network: Optional[SyntheticNetwork] = None, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0) -> None:
+        """
+        Инициализация сессии
+
+        Parameters
+        ----------
+        fixtures: Optional[Dict[str, Dict[str, Any]]]
+            Записанные ответы (см. load_fixtures)
+        network: Optional[SyntheticNetwork]
+            Синтетическая сеть
+        latency: float
+            Задержка каждого ответа в секундах
+        jitter: float
+            Максимальная случайная добавка к задержке в секундах
+        error_rate: float
+            Вероятность ответа ошибкой 6
+        seed: int
+            Зерно генератора задержек и ошибок
+
+        """
+        self.fixtures = fixtures or {}
+        self.network = network
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.headers = {}
+        self.stats: Dict[str, int] = {}
+        self.__random = Random(seed)
+        self.__lock = Lock()
+
+    def reset_stats(self) -> None:
+        """Метод, обнуляющий статистику запросов"""
+        with self.__lock:
+            self.stats = {}
+
+    def post(self, url: str, data: Optional[Dict[str, Any]] = None, headers: Optional[Dict] = None) -> _FakeResponse:
+        """
+        Метод, возвращающий ответ на запрос к методу API
+
+        Parameters
+        ----------
+        url: str
+            Адрес метода (https://api.vk.ru/method/<метод>)
+        data: Optional[Dict[str, Any]]
+            Параметры вызова
+        headers: Optional[Dict]
+            Заголовки запроса (не используются)
+
+        Returns
+        -------
+        _FakeResponse
+            Ответ в формате VK API
+
+        """
+        method = url.rsplit('/', 1)[-1]
+        params = data or {}
+        with self.__lock:
+            delay = self.latency + self.__random.uniform(0, self.jitter)
+            throttled = self.__random.random() < self.error_rate
+            self.__count('requests')
+            self.__count(f'method:{method}')
+            if throttled:
+                self.__count('errors:6')
+        sleep(delay)
+
+        if throttled:
+            return _FakeResponse({'error': {'error_code': 6, 'error_msg': 'Too many requests per second',
+                                            'request_params': []}})
+        fixture = self.fixtures.get(_fixture_key(method, params))
+        if fixture is not None:
+            return _FakeResponse(fixture)
+        if method == 'execute':
+            return _FakeResponse(self.__execute(str(params.get('code', ''))))
+        try:
+            return _FakeResponse({'response': self.__call(method, params)})
+        except FakeApiError as error:
+            return _FakeResponse({'error': {'error_code': error.code, 'error_msg': error.message,
+                                            'request_params': []}})
+
+    def __count(self, key: str) -> None:
+        """Увеличение счётчика статистики (под блокировкой)"""
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    def __call(self, method: str, params: Dict[str, Any]) -> Any:
+        """Ответ на вызов по записанным ответам или синтетической сети"""
+        fixture = self.fixtures.get(_fixture_key(method, params))
+        if fixture is not None:
+            if 'error' in fixture:
+                raise FakeApiError(fixture['error']['error_code'], fixture['error']['error_msg'])
+            return fixture['response']
+        if self.network is None:
+            raise FakeApiError(100, f'No recorded response for {method}')
+        return self.network.call(method, params)
+
+    def __execute(self, code: str) -> Dict[str, Any]:
+        """
+        Выполнение кода execute: вызовы API.<метод>({...}) выполняются
+        по порядку. Код вида return [...] возвращает список ответов
+        (False для неудавшихся вызовов), иначе ответы-списки объединяются
+        """
+        decoder = JSONDecoder()
+        results, errors = [], []
+        for match in _API_CALL.finditer(code):
+            params, _ = decoder.raw_decode(code, match.end())
+            try:
+                results.append(self.__call(match.group(1), params))
+            except FakeApiError as error:
+                results.append(False)
+                errors.append({'method': match.group(1), 'error_code': error.code, 'error_msg': error.message})
+
+        if not code.lstrip().startswith('return ['):
+            results = [item for result in results if result for item in result]
+        payload = {'response': results}
+        if errors:
+            payload['execute_errors'] = errors
+        return payload
+
+
+class RecordingSession(Session):
+    """
+    HTTP-сессия для vk_api, записывающая ответы VK API для последующего
+    воспроизведения через FakeVkSession
+
+    Methods
+    -------
+    save(path)
+        Сохранение записанных ответов в файл JSON
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__records: Dict[str, Dict[str, Any]] = {}
+        self.__lock = Lock()
+
+    def post(self, url: str, data: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        response = super().post(url, data, **kwargs)
+        # ошибка 6 не записывается: при воспроизведении vk_api повторял бы запрос бесконечно
+        if response.ok and response.json().get('error', {}).get('error_code') != 6:
+            method = url.rsplit('/', 1)[-1]
+            params = {key: value for key, value in (data or {}).items() if key not in ('access_token', 'v')}
+            with self.__lock:
+                self.__records[_fixture_key(method, params)] = {
+                    'method': method, 'params': params, 'response': response.json()
+                }
+        return response
+
+    def save(self, path: str) -> None:
+        """
+        Метод, сохраняющий записанные ответы в файл JSON (формат load_fixtures)
+
+        Parameters
+        ----------
+        path: str
+            Путь к файлу
+
+        """
+        with self.__lock:
+            records = list(self.__records.values())
+        with open(path, 'w', encoding='utf-8') as f:
+            dump(records, f, ensure_ascii=False)
@@ -0,0 +1,170 @@
+"""Класс графа дружеских связей между друзьями пользователя"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+
+class FriendGraph:
+    """
+    Граф дружеских связей между друзьями пользователя. Друзья
+    отображаются в плотные индексы 0..n-1 (в порядке hints),
+    смежность хранится в формате CSR (массивы indptr и indices)
+
+    Attributes
+    ----------
+    owner_id: int
+        ID пользователя, чьи друзья образуют граф
+    ids: np.ndarray
+        ID друзей VK по плотным индексам (int64)
+    indptr: np.ndarray
+        Границы строк смежности в indices
+    indices: np.ndarray
+        Индексы соседей, отсортированные внутри каждой строки
+
+    Methods
+    -------
+    from_edges(owner_id, ids, sources, targets)
+        Построение графа по списку рёбер в терминах ID VK
+    index_of(vk_ids)
+        Плотные индексы по ID VK
+    neighbours(i)
+        Индексы друзей, общих для пользователя и друга i
+    degree()
+        Количество связей каждого друга внутри графа
+    edges()
+        Массивы концов рёбер (каждое ребро один раз)
+
+    """
+
+    def __init__(self, owner_id: int, ids: np.ndarray, indptr: np.ndarray, indices: np.ndarray) -> None:
+        """
+        Инициализация графа по готовым массивам CSR
+
+        Parameters
+        ----------
+        owner_id: int
+            ID пользователя
+        ids: np.ndarray
+            ID друзей VK по плотным индексам
+        indptr: np.ndarray
+            Границы строк смежности
+        indices: np.ndarray
+            Индексы соседей
+
+        """
+        self.owner_id = owner_id
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self._order = np.argsort(self.ids, kind='stable')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_edges(cls, owner_id: int, ids: Iterable[int], sources: Iterable[int],
+                   targets: Iterable[int]) -> 'FriendGraph':
+        """
+        Построение неориентированного графа по списку рёбер.
+        Рёбра с концами вне списка друзей и петли отбрасываются,
+        повторяющиеся рёбра объединяются
+
+        Parameters
+        ----------
+        owner_id: int
+            ID пользователя
+        ids: Iterable[int]
+            ID друзей VK
+        sources: Iterable[int]
+            ID VK начал рёбер
+        targets: Iterable[int]
+            ID VK концов рёбер
+
+        Returns
+        -------
+        FriendGraph
+            Граф дружеских связей
+
+        """
+        graph = cls(owner_id, np.fromiter(ids, dtype=np.int64), np.zeros(1), np.zeros(0))
+        n = len(graph)
+        rows = graph.index_of(np.fromiter(sources, dtype=np.int64))
+        cols = graph.index_of(np.fromiter(targets, dtype=np.int64))
+
+        valid = (rows >= 0) & (cols >= 0) & (rows != cols)
+        rows, cols = rows[valid], cols[valid]
+        rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+
+        keys = np.unique(rows.astype(np.int64) * max(n, 1) + cols)
+        rows, cols = keys // max(n, 1), keys % max(n, 1)
+
+        graph.indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))]).astype(np.int64)
+        graph.indices = cols.astype(np.int32)
+        return graph
+
+    def index_of(self, vk_ids: np.ndarray | Iterable[int]) -> np.ndarray:
+        """
+        Метод, возвращающий плотные индексы для ID VK
+        (-1 для ID, которых нет в графе)
+
+        Parameters
+        ----------
+        vk_ids: np.ndarray | Iterable[int]
+            ID VK
+
+        Returns
+        -------
+        np.ndarray
+            Плотные индексы
+
+        """
+        vk_ids = np.asarray(vk_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(vk_ids.shape, -1, dtype=np.int64)
+        sorted_ids = self.ids[self._order]
+        positions = np.clip(np.searchsorted(sorted_ids, vk_ids), 0, len(sorted_ids) - 1)
+        return np.where(sorted_ids[positions] == vk_ids, self._order[positions], -1)
+
+    def neighbours(self, i: int) -> np.ndarray:
+        """
+        Метод, возвращающий индексы друзей, связанных с другом i
+
+        Parameters
+        ----------
+        i: int
+            Плотный индекс друга
+
+        Returns
+        -------
+        np.ndarray
+            Отсортированные индексы соседей
+
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def degree(self) -> np.ndarray:
+        """
+        Метод, возвращающий количество связей каждого друга внутри графа
+
+        Returns
+        -------
+        np.ndarray
+            Степени вершин
+
+        """
+        return np.diff(self.indptr)
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Метод, возвращающий концы рёбер графа (каждое ребро один раз)
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Массивы начал и концов рёбер
+
+        """
+        rows = np.repeat(np.arange(len(self), dtype=np.int32), self.degree())
+        upper = rows < self.indices
+        return rows[upper], self.indices[upper]
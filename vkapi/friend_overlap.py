@@ -0,0 +1,48 @@
+"""Функции попарного сравнения списков друзей нескольких пользователей"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def overlap_matrix(friend_lists: List[Optional[np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Функция, рассчитывающая попарные пересечения списков друзей
+    и коэффициенты Жаккара. Списки переводятся в плотные номера
+    по объединению всех ID, и пересечения для всех пар получаются
+    одним произведением матрицы принадлежности M на M^T
+
+    Parameters
+    ----------
+    friend_lists: List[Optional[np.ndarray]]
+        Отсортированные массивы ID друзей (None - список скрыт)
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Матрицы k x k количества общих друзей и коэффициентов Жаккара
+        (для скрытых списков строки и столбцы заполнены NaN)
+
+    """
+    k = len(friend_lists)
+    known = [i for i, friends in enumerate(friend_lists) if friends is not None]
+    intersection = np.full((k, k), np.nan)
+    jaccard = np.full((k, k), np.nan)
+    if not known:
+        return intersection, jaccard
+
+    arrays = [friend_lists[i] for i in known]
+    _, columns = np.unique(np.concatenate(arrays), return_inverse=True)
+    rows = np.repeat(np.arange(len(arrays)), [len(friends) for friends in arrays])
+    membership = np.zeros((len(arrays), int(columns.max(initial=-1)) + 1), dtype=np.float32)
+    membership[rows, columns] = 1
+
+    # float32 точно представляет целые числа до 2^24, что с запасом больше лимита друзей VK
+    common = (membership @ membership.T).astype(np.float64)
+    sizes = np.diag(common)
+    union = sizes[:, None] + sizes[None, :] - common
+
+    index = np.ix_(known, known)
+    intersection[index] = common
+    jaccard[index] = np.divide(common, union, out=np.zeros_like(common), where=union > 0)
+    return intersection, jaccard
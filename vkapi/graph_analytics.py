@@ -0,0 +1,196 @@
+"""Функции анализа графа дружеских связей: сообщества, центральность, мосты"""
+
+import numpy as np
+
+from .friend_graph import FriendGraph
+from .vk_tools_models import GraphAnalytics
+
+
+def spmv(graph: FriendGraph, x: np.ndarray) -> np.ndarray:
+    """
+    Функция умножения матрицы смежности графа (CSR) на вектор
+    или матрицу: для каждой вершины суммируются строки x её соседей
+    (как разность накопленных сумм на границах строк CSR)
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    x: np.ndarray
+        Вектор длины n или матрица n x p
+
+    Returns
+    -------
+    np.ndarray
+        Результат умножения той же формы, что и x
+
+    """
+    if x.ndim == 2:
+        # по столбцам: накопленная сумма по оси 0 матрицы n x p плохо ложится в кэш
+        return np.stack([spmv(graph, column) for column in x.T], axis=1)
+
+    cumulative = np.zeros(len(graph.indices) + 1)
+    np.cumsum(x[graph.indices], out=cumulative[1:])
+    return cumulative[graph.indptr[1:]] - cumulative[graph.indptr[:-1]]
+
+
+def label_propagation(graph: FriendGraph, iterations: int = 30, seed: int = 0) -> np.ndarray:
+    """
+    Функция поиска сообществ методом распространения меток.
+    На каждой итерации вершина принимает метку, самую частую среди
+    соседей и её самой (при равенстве - случайную из лучших);
+    голосование по всем рёбрам выполняется векторно сортировкой пар
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    iterations: int
+        Максимальное количество итераций
+    seed: int
+        Зерно генератора случайных чисел
+
+    Returns
+    -------
+    np.ndarray
+        Номера сообществ вершин (0 - самое крупное)
+
+    """
+    n = len(graph)
+    rng = np.random.default_rng(seed)
+    labels = np.arange(n)
+    rows = np.concatenate([np.repeat(np.arange(n), graph.degree()), np.arange(n)])
+    cols = np.concatenate([graph.indices, np.arange(n)])
+
+    for _ in range(iterations):
+        keys, counts = np.unique(rows * n + labels[cols], return_counts=True)
+        voters, votes = keys // n, keys % n
+        order = np.lexsort((rng.random(len(keys)), -counts, voters))
+        first = np.concatenate([[True], voters[order][1:] != voters[order][:-1]])
+        new_labels = labels.copy()
+        new_labels[voters[order][first]] = votes[order][first]
+        if (new_labels == labels).all():
+            break
+        labels = new_labels
+
+    _, communities, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty_like(sizes)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+    return rank[communities]
+
+
+def betweenness(graph: FriendGraph, pivots: int = 64, seed: int = 0) -> np.ndarray:
+    """
+    Функция приближённого расчёта нормированной центральности по
+    посредничеству (алгоритм Брандеса по случайной выборке опорных
+    вершин). Поиск в ширину и обратное накопление зависимостей
+    ведутся по уровням для всех опорных вершин сразу через умножение
+    разреженной матрицы смежности на матрицу n x pivots
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    pivots: int
+        Количество опорных вершин
+    seed: int
+        Зерно генератора случайных чисел
+
+    Returns
+    -------
+    np.ndarray
+        Центральность по посредничеству каждой вершины
+
+    """
+    n = len(graph)
+    if n < 3:
+        return np.zeros(n)
+
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(n, size=min(n, pivots), replace=False)
+    p = len(sources)
+
+    sigma = np.zeros((n, p))
+    sigma[sources, np.arange(p)] = 1
+    distance = np.full((n, p), -1)
+    distance[sources, np.arange(p)] = 0
+    frontier = sigma.copy()
+
+    level = 0
+    while frontier.any():
+        paths = spmv(graph, frontier)
+        # число путей целое, порог 0.5 отсекает погрешность накопленных сумм
+        new = (paths > 0.5) & (distance < 0)
+        level += 1
+        distance[new] = level
+        sigma[new] = paths[new]
+        frontier = np.where(new, sigma, 0)
+
+    delta = np.zeros((n, p))
+    for current in range(level, 0, -1):
+        coefficient = np.where(distance == current, (1 + delta) / np.maximum(sigma, 1), 0)
+        delta += np.where(distance == current - 1, sigma * spmv(graph, coefficient), 0)
+
+    delta[sources, np.arange(p)] = 0
+    return delta.sum(axis=1) * (n / p) / ((n - 1) * (n - 2))
+
+
+def participation(graph: FriendGraph, communities: np.ndarray) -> np.ndarray:
+    """
+    Функция расчёта коэффициента участия вершин: 1 - сумма квадратов
+    долей связей вершины с каждым сообществом. Близок к нулю у вершин,
+    все связи которых внутри одного сообщества, и растёт у "мостов"
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    communities: np.ndarray
+        Номера сообществ вершин
+
+    Returns
+    -------
+    np.ndarray
+        Коэффициенты участия
+
+    """
+    n, count = len(graph), int(communities.max(initial=-1)) + 1
+    degree = graph.degree()
+    rows = np.repeat(np.arange(n), degree)
+    links = np.bincount(rows * count + communities[graph.indices], minlength=n * count).reshape(n, count)
+    shares = links / np.maximum(degree, 1)[:, None]
+    return np.where(degree > 0, 1 - (shares ** 2).sum(axis=1), 0)
+
+
+def analyse_graph(graph: FriendGraph, bridges: int = 10) -> GraphAnalytics:
+    """
+    Функция, рассчитывающая показатели графа дружеских связей
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    bridges: int
+        Количество друзей-мостов в результате
+
+    Returns
+    -------
+    GraphAnalytics
+        Сообщества, степени, центральность, коэффициенты участия
+        и индексы друзей-мостов
+
+    """
+    communities = label_propagation(graph)
+    centrality = betweenness(graph)
+    shares = participation(graph, communities)
+
+    candidates = np.flatnonzero((shares > 0) & (graph.degree() > 1))
+    top = candidates[np.argsort(-centrality[candidates], kind='stable')][:bridges]
+
+    return GraphAnalytics(
+        communities=communities.tolist(),
+        degree=graph.degree().tolist(),
+        betweenness=centrality.tolist(),
+        participation=shares.tolist(),
+        bridges=top.tolist()
+    )
@@ -0,0 +1,253 @@
+"""Потоковый экспорт графа дружеских связей в GEXF, GraphML и списки рёбер"""
+
+from typing import Callable, Dict, Iterator, List
+from xml.sax.saxutils import escape, quoteattr
+import zlib
+
+from .friend_graph import FriendGraph
+from .vk_tools import Vk
+
+EXPORT_FORMATS = {
+    'gexf': ('application/gexf+xml', 'gexf'),
+    'graphml': ('application/graphml+xml', 'graphml'),
+    'csv': ('application/gzip', 'csv.gz')
+}
+
+CHUNK_ROWS = 500
+
+
+def _iter_labels(graph: FriendGraph, labels: Callable[[List[int]], Dict[int, str]]) -> Iterator[tuple]:
+    """
+    Генератор вершин графа порциями: (индекс, ID VK, подпись, степень).
+    Подписи запрашиваются по CHUNK_ROWS вершин за раз
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    labels: Callable[[List[int]], Dict[int, str]]
+        Функция получения подписей для списка ID VK
+
+    """
+    degree = graph.degree()
+    for start in range(0, len(graph), CHUNK_ROWS):
+        ids = graph.ids[start:start + CHUNK_ROWS].tolist()
+        names = labels(ids)
+        for offset, vk_id in enumerate(ids):
+            yield start + offset, vk_id, names.get(vk_id, str(vk_id)), int(degree[start + offset])
+
+
+def _iter_edges(graph: FriendGraph) -> Iterator[tuple]:
+    """
+    Генератор рёбер графа (каждое ребро один раз) в терминах ID VK.
+    Рёбра читаются из CSR построчно
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+
+    """
+    for i in range(len(graph)):
+        neighbours = graph.neighbours(i)
+        source = int(graph.ids[i])
+        for target in graph.ids[neighbours[neighbours > i]].tolist():
+            yield source, target
+
+
+def iter_gexf(graph: FriendGraph, labels: Callable[[List[int]], Dict[int, str]]) -> Iterator[bytes]:
+    """
+    Генератор документа GEXF 1.3 по частям
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    labels: Callable[[List[int]], Dict[int, str]]
+        Функция получения подписей для списка ID VK
+
+    Returns
+    -------
+    Iterator[bytes]
+        Части документа
+
+    """
+    yield (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+           b'<gexf xmlns="http://gexf.net/1.3" version="1.3">\n'
+           b'<graph defaultedgetype="undirected">\n'
+           b'<attributes class="node"><attribute id="degree" title="degree" type="integer"/></attributes>\n'
+           b'<nodes>\n')
+    for _, vk_id, label, degree in _iter_labels(graph, labels):
+        yield (f'<node id="{vk_id}" label={quoteattr(label)}><attvalues>'
+               f'<attvalue for="degree" value="{degree}"/></attvalues></node>\n').encode()
+    yield b'</nodes>\n<edges>\n'
+    for number, (source, target) in enumerate(_iter_edges(graph)):
+        yield f'<edge id="{number}" source="{source}" target="{target}"/>\n'.encode()
+    yield b'</edges>\n</graph>\n</gexf>\n'
+
+
+def iter_graphml(graph: FriendGraph, labels: Callable[[List[int]], Dict[int, str]]) -> Iterator[bytes]:
+    """
+    Генератор документа GraphML по частям
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    labels: Callable[[List[int]], Dict[int, str]]
+        Функция получения подписей для списка ID VK
+
+    Returns
+    -------
+    Iterator[bytes]
+        Части документа
+
+    """
+    yield (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+           b'<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+           b'<key id="label" for="node" attr.name="label" attr.type="string"/>\n'
+           b'<key id="degree" for="node" attr.name="degree" attr.type="int"/>\n'
+           b'<graph edgedefault="undirected">\n')
+    for _, vk_id, label, degree in _iter_labels(graph, labels):
+        yield (f'<node id="{vk_id}"><data key="label">{escape(label)}</data>'
+               f'<data key="degree">{degree}</data></node>\n').encode()
+    for source, target in _iter_edges(graph):
+        yield f'<edge source="{source}" target="{target}"/>\n'.encode()
+    yield b'</graph>\n</graphml>\n'
+
+
+def iter_csv_gz(graph: FriendGraph) -> Iterator[bytes]:
+    """
+    Генератор сжатого gzip списка рёбер в формате CSV (source,target)
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+
+    Returns
+    -------
+    Iterator[bytes]
+        Части сжатого файла
+
+    """
+    compressor = zlib.compressobj(wbits=31)
+    yield compressor.compress(b'source,target\n')
+    lines = []
+    for source, target in _iter_edges(graph):
+        lines.append(f'{source},{target}\n')
+        if len(lines) == 10000:
+            yield compressor.compress(''.join(lines).encode())
+            lines = []
+    yield compressor.compress(''.join(lines).encode())
+    yield compressor.flush()
+
+
+def export_graph(graph: FriendGraph, export_format: str,
+                 labels: Callable[[List[int]], Dict[int, str]]) -> Iterator[bytes]:
+    """
+    Функция, возвращающая генератор экспорта графа в заданном формате
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    export_format: str
+        Формат (gexf, graphml или csv)
+    labels: Callable[[List[int]], Dict[int, str]]
+        Функция получения подписей для списка ID VK
+
+    Returns
+    -------
+    Iterator[bytes]
+        Части файла
+
+    Raises
+    ------
+    ValueError
+        Если формат не поддерживается
+
+    """
+    if export_format == 'gexf':
+        return _buffered(iter_gexf(graph, labels))
+    if export_format == 'graphml':
+        return _buffered(iter_graphml(graph, labels))
+    if export_format == 'csv':
+        return iter_csv_gz(graph)
+    raise ValueError(f'Неподдерживаемый формат: {export_format}')
+
+
+def vk_labels(vk: Vk) -> Callable[[List[int]], Dict[int, str]]:
+    """
+    Функция, возвращающая функцию получения подписей вершин (имён друзей) через VK API
+
+    Parameters
+    ----------
+    vk: Vk
+        Объект доступа к API VK
+
+    Returns
+    -------
+    Callable[[List[int]], Dict[int, str]]
+        Функция получения подписей для списка ID VK
+
+    """
+    return lambda ids: {
+        user['id']: f'{user.get("first_name")} {user.get("last_name")}' for user in vk.get_users_list_info(ids)
+    }
+
+
+def _buffered(chunks: Iterator[bytes], size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Генератор, объединяющий мелкие части документа в блоки не меньше size байт
+
+    Parameters
+    ----------
+    chunks: Iterator[bytes]
+        Части документа
+    size: int
+        Минимальный размер блока
+
+    """
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    yield b''.join(buffer)
+
+
+def write_parquet(graph: FriendGraph, path: str) -> None:
+    """
+    Функция, записывающая список рёбер в файл Parquet порциями
+    (требуется пакет pyarrow)
+
+    Parameters
+    ----------
+    graph: FriendGraph
+        Граф дружеских связей
+    path: str
+        Путь к файлу
+
+    Raises
+    ------
+    ImportError
+        Если pyarrow не установлен
+
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([('source', pa.int64()), ('target', pa.int64())])
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        sources, targets = [], []
+        for source, target in _iter_edges(graph):
+            sources.append(source)
+            targets.append(target)
+            if len(sources) == 100000:
+                writer.write_table(pa.table([sources, targets], schema=schema))
+                sources, targets = [], []
+        writer.write_table(pa.table([sources, targets], schema=schema))
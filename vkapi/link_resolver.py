@@ -0,0 +1,196 @@
+"""Класс, определяющий ID пользователей VK по ссылкам"""
+
+from typing import Callable, Dict, List, Optional
+import re
+
+from vk_api.vk_api import VkApiMethod
+
+from .cache import BaseCache
+
+# самые частые формы ссылок разбираются без общего выражения
+_NUMERIC = re.compile(r'-?\d+')
+_PROFILE = re.compile(r'(?:https?://)?(?:m\.)?vk\.com/(?:id(\d+)|([a-zA-Z][\w.]*))/?(?:[?#].*)?')
+_SERVICE_PATH = re.compile(r'(?:im|feed)$|(?:wall|id|club|public|photo|videos|albums|audios|topic)-?\d')
+_LINK = re.compile(r'(^-?[\d]+)|(?:feed\?\w?=)?(?:wall|im\?sel='
+                   r'|id=*|photo|videos|albums|audios|topic)(-?'
+                   r'[\d]+)|(?:club|public)([\d]*)|(?<=\.com/)('
+                   r'[a-zA-Z\d._]*)')
+
+
+class LinkResolver:
+    """
+    Определение ID пользователей по ссылкам на профили.
+    ID из ссылки извлекается регулярными выражениями, а короткие
+    имена разрешаются через utils.resolveScreenName; результаты
+    разрешения хранятся в общем кэше SCREEN_NAME_TIMEOUT секунд,
+    ненайденные имена - NOT_FOUND_TIMEOUT секунд (имя может быть занято позже)
+
+    Attributes
+    ----------
+    __vk: VkApiMethod
+        Объект для доступа к методам VkAPI
+    __cache: BaseCache
+        Общий для рабочих процессов кэш
+    __execute: Callable[[str, List[Dict]], List]
+        Функция пакетного вызова метода API через execute
+    SCREEN_NAME_TIMEOUT: int
+        Время хранения разрешённого короткого имени в секундах
+    NOT_FOUND_TIMEOUT: int
+        Время хранения ненайденного короткого имени в секундах
+
+    Methods
+    -------
+    parse(link)
+        Извлечение ID или короткого имени из ссылки
+    resolve(link)
+        Получение ID пользователя по ссылке
+    resolve_many(links)
+        Получение ID пользователей по списку ссылок
+
+    """
+
+    SCREEN_NAME_TIMEOUT = 7 * 24 * 3600
+    NOT_FOUND_TIMEOUT = 60 * 60
+
+    def __init__(self, vk: VkApiMethod, cache: BaseCache, execute: Callable[[str, List[Dict]], List]) -> None:
+        """
+        Инициализация
+
+        Parameters
+        ----------
+        vk: VkApiMethod
+            Объект для доступа к методам VkAPI
+        cache: BaseCache
+            Общий для рабочих процессов кэш
+        execute: Callable[[str, List[Dict]], List]
+            Функция пакетного вызова метода API через execute
+
+        """
+        self.__vk = vk
+        self.__cache = cache
+        self.__execute = execute
+
+    @staticmethod
+    def parse(link: str) -> int | str:
+        """
+        Метод, извлекающий из ссылки ID или короткое имя
+
+        Parameters
+        ----------
+        link: str
+            Ссылка на аккаунт VK
+
+        Returns
+        -------
+        int | str
+            ID или короткое имя, требующее разрешения
+
+        Raises
+        ------
+        TypeError
+            В случае некорректности ссылки на аккаунт
+
+        """
+        if _NUMERIC.fullmatch(link):
+            return int(link)
+
+        match = _PROFILE.fullmatch(link)
+        if match and match[1]:
+            return int(match[1])
+        if match and not _SERVICE_PATH.match(match[2]):
+            return match[2]
+
+        find_results = _LINK.findall(link)
+        if not find_results:
+            raise TypeError
+        id_or_name = [el for el in find_results[0] if el]
+        if not id_or_name:
+            raise TypeError
+        try:
+            return int(id_or_name[0])
+        except ValueError:
+            return id_or_name[0]
+
+    def resolve(self, link: str) -> int:
+        """
+        Метод, возвращающий ID пользователя по ссылке на его профиль
+
+        Parameters
+        ----------
+        link: str
+            Ссылка на аккаунт VK
+
+        Returns
+        -------
+        int
+            ID пользователя
+
+        Raises
+        ------
+        TypeError
+            В случае некорректности ссылки на аккаунт
+
+        """
+        id_or_name = self.parse(link)
+        if isinstance(id_or_name, int):
+            return id_or_name
+
+        resolved = self.__cache.get(self.__key(id_or_name))
+        if resolved is None:
+            resolved = self.__vk.utils.resolveScreenName(screen_name=id_or_name) or {}
+            self.__cache.set(self.__key(id_or_name), resolved, self.__timeout(resolved))
+        user_id = self.__user_id(resolved)
+        if user_id is None:
+            raise TypeError
+        return user_id
+
+    def resolve_many(self, links: List[str]) -> List[Optional[int]]:
+        """
+        Метод, возвращающий ID пользователей по списку ссылок.
+        Короткие имена, которых нет в кэше, разрешаются пакетами через execute
+
+        Parameters
+        ----------
+        links: List[str]
+            Ссылки на аккаунты VK
+
+        Returns
+        -------
+        List[Optional[int]]
+            ID пользователей (None для некорректных ссылок и ссылок не на пользователей)
+
+        """
+        parsed = []
+        for link in links:
+            try:
+                parsed.append(self.parse(link))
+            except TypeError:
+                parsed.append(None)
+
+        names = {name for name in parsed if isinstance(name, str)}
+        resolved = {name: self.__cache.get(self.__key(name)) for name in names}
+        missing = [name for name, value in resolved.items() if value is None]
+        responses = self.__execute('utils.resolveScreenName', [{'screen_name': name} for name in missing])
+        for name, response in zip(missing, responses):
+            # False - ошибка вызова, такое имя не кэшируется
+            if response is not False:
+                resolved[name] = response or {}
+                self.__cache.set(self.__key(name), resolved[name], self.__timeout(resolved[name]))
+
+        return [self.__user_id(resolved.get(value)) if isinstance(value, str) else value for value in parsed]
+
+    @staticmethod
+    def __key(name: str) -> str:
+        """Ключ кэша для короткого имени"""
+        return f'screen_name:{name.lower()}'
+
+    def __timeout(self, resolved: Dict) -> int:
+        """Время хранения результата разрешения имени (ненайденные имена хранятся меньше)"""
+        return self.SCREEN_NAME_TIMEOUT if resolved else self.NOT_FOUND_TIMEOUT
+
+    @staticmethod
+    def __user_id(resolved: Optional[Dict]) -> Optional[int]:
+        """ID пользователя из ответа utils.resolveScreenName"""
+        if resolved and resolved.get('type') == 'user':
+            return int(resolved['object_id'])
+        return None
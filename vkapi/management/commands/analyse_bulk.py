@@ -0,0 +1,45 @@
+"""Команда пакетного анализа списка аккаунтов VK"""
+
+from importlib.util import find_spec
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from vkapi.bulk import run_bulk
+
+
+class Command(BaseCommand):
+    """
+    Пакетный анализ аккаунтов VK из файла со ссылками (по одной
+    в строке): данные профиля, активность и токсичность. Прогресс
+    сохраняется в контрольной точке, прерванный запуск продолжается
+    с места остановки
+    """
+
+    help = 'Пакетный анализ аккаунтов VK с записью отчёта в CSV или Parquet'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('input', help='Файл со ссылками на аккаунты (по одной в строке)')
+        parser.add_argument('--output', default='bulk-report.csv',
+                            help='Файл отчёта (.csv или .parquet)')
+        parser.add_argument('--workers', type=int, default=4, help='Количество потоков')
+
+    def handle(self, *args, **options) -> None:
+        output = options['output']
+        if output.endswith('.parquet') and find_spec('pyarrow') is None:
+            raise CommandError('Для отчёта в Parquet установите пакет pyarrow')
+
+        try:
+            with open(options['input'], encoding='utf-8') as f:
+                links = [line.strip() for line in f]
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл со ссылками: {error}')
+
+        def progress(done: int, total: int, speed: float) -> None:
+            if done % 10 == 0 or done == total:
+                self.stdout.write(f'{done}/{total} ({speed:.1f} профилей/мин)')
+
+        stats = run_bulk(links, output, options['workers'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано {stats["processed"]} профилей за {stats["seconds"]:.0f} с '
+            f'({stats["profiles_per_minute"]:.1f} профилей/мин), отчёт сохранён в {output}'
+        ))
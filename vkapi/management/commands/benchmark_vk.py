@@ -0,0 +1,104 @@
+"""Команда воспроизводимого замера производительности методов Vk и Visualization"""
+
+import os
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.test.utils import setup_databases, teardown_databases
+
+from vkapi.benchmark import SCENARIOS, run_benchmark
+from vkapi.fake_api import FakeVkSession, RecordingSession, SyntheticNetwork, load_fixtures
+from vkapi.rate_limit import PRIORITIES
+from vkapi.vk_tools import Vk
+
+
+class Command(BaseCommand):
+    """
+    Замер времени работы методов Vk и Visualization без доступа к VK:
+    ответы API берутся из записанного файла или синтетической сети
+    с заданной задержкой и долей ошибок 6. С --record сценарии
+    выполняются с настоящим API (VK_TOKEN), а ответы записываются
+    для последующего воспроизведения. Данные сохраняются во временных
+    БД и кэше, токсичность без --record проверяется по синтетическому
+    словарю SyntheticNetwork.TOXIC_WORDS
+    """
+
+    help = 'Замер производительности методов Vk и Visualization на записанных или синтетических ответах VK API'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--link', help='Ссылка на аккаунт (по умолчанию - синтетический с наибольшим '
+                                           'количеством друзей)')
+        parser.add_argument('--only', nargs='+', choices=list(SCENARIOS), help='Сценарии (по умолчанию все)')
+        parser.add_argument('--repeat', type=int, default=3, help='Количество запусков каждого сценария')
+        parser.add_argument('--warm', action='store_true', help='Не очищать кэш между запусками')
+        parser.add_argument('--fixtures', help='Файл записанных ответов VK API')
+        parser.add_argument('--record', help='Выполнить сценарии с настоящим API и записать ответы в файл')
+        parser.add_argument('--users', type=int, default=2000, help='Количество пользователей синтетической сети')
+        parser.add_argument('--average-friends', type=int, default=60, help='Среднее количество друзей')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно синтетической сети, задержек и ошибок')
+        parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа в секундах')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Случайная добавка к задержке в секундах')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Доля ответов с ошибкой 6')
+        parser.add_argument('--corpus', help='Файл словаря нецензурной лексики (по умолчанию без --record - '
+                                             'синтетический словарь)')
+        parser.add_argument('--rate', type=int, help='Лимит запросов в секунду (по умолчанию VKAPI_RATE_LIMIT)')
+
+    def handle(self, *args, **options) -> None:
+        if options['rate']:
+            settings.VKAPI_RATE_LIMIT = options['rate']
+            settings.VKAPI_PRIORITY_QUOTAS = {level: options['rate'] for level in PRIORITIES}
+        directory = tempfile.mkdtemp(prefix='vkapi-benchmark-')
+        settings.VKAPI_CACHE = {**getattr(settings, 'VKAPI_CACHE', {}), 'LOCATION': os.path.join(directory, 'cache')}
+        if options['corpus']:
+            settings.VKAPI_OBSCENE_CORPUS = options['corpus']
+        elif not options['record']:
+            # без доступа к сети токсичность проверяется по синтетическому словарю
+            settings.VKAPI_OBSCENE_CORPUS = os.path.join(directory, 'obscene_corpus.txt')
+            SyntheticNetwork.write_obscene_corpus(settings.VKAPI_OBSCENE_CORPUS)
+
+        link = options['link']
+        if options['record']:
+            if not link:
+                raise CommandError('Для записи ответов укажите --link')
+            session = RecordingSession()
+            fake = None
+            vk = Vk(token=os.environ['VK_TOKEN'], session=session)
+        else:
+            fixtures = {}
+            if options['fixtures']:
+                try:
+                    fixtures = load_fixtures(options['fixtures'])
+                except (OSError, ValueError, KeyError) as error:
+                    raise CommandError(f'Не удалось прочитать файл ответов: {error}')
+            network = None
+            if not fixtures or not link:
+                network = SyntheticNetwork(users=options['users'], average_friends=options['average_friends'],
+                                           seed=options['seed'])
+            if not link:
+                degree = np.where(network.private, -1, np.diff(network.indptr))
+                link = f'https://vk.com/id{int(np.argmax(degree)) + 1}'
+            session = fake = FakeVkSession(fixtures, network, options['latency'], options['jitter'],
+                                           options['error_rate'], options['seed'])
+            vk = Vk(token='benchmark', session=session)
+
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = run_benchmark(vk, link, options['only'], options['repeat'], options['warm'], fake)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        self.stdout.write(f'Аккаунт: {link}')
+        self.stdout.write(f'{"сценарий":<36} {"мин, с":>8} {"медиана, с":>11} {"запросы":>8} {"ошибки 6":>9}  хэши')
+        for row in results:
+            if row['error']:
+                self.stdout.write(self.style.ERROR(f'{row["name"]:<36} {row["error"]}'))
+                continue
+            self.stdout.write(f'{row["name"]:<36} {row["min"]:>8.3f} {row["median"]:>11.3f} '
+                              f'{row["requests"] if row["requests"] is not None else "-":>8} {row["errors"]:>9}  '
+                              f'{" ".join(dict.fromkeys(row["digests"]))}')
+
+        if options['record']:
+            session.save(options['record'])
+            self.stdout.write(self.style.SUCCESS(f'Ответы VK API сохранены в {options["record"]}'))
@@ -0,0 +1,46 @@
+"""Команда экспорта графа дружеских связей в файл"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from vkapi.graph_export import EXPORT_FORMATS, export_graph, vk_labels, write_parquet
+from vkapi.vk_tools import Vk
+
+
+class Command(BaseCommand):
+    """
+    Экспорт графа дружеских связей аккаунта VK в GEXF, GraphML,
+    сжатый CSV или Parquet (список рёбер). Вершины и рёбра
+    записываются в файл по мере формирования
+    """
+
+    help = 'Экспорт графа дружеских связей аккаунта VK в файл'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('link', help='Ссылка на аккаунт VK')
+        parser.add_argument('--format', dest='export_format', default='gexf',
+                            choices=[*EXPORT_FORMATS, 'parquet'], help='Формат файла')
+        parser.add_argument('--output', help='Путь к файлу (по умолчанию friends-<ID>.<расширение>)')
+
+    def handle(self, *args, **options) -> None:
+        vk = Vk(token=os.environ['VK_TOKEN'])
+        graph = vk.get_friend_graph(options['link'])
+        if graph is None:
+            raise CommandError('Список друзей пользователя скрыт')
+
+        export_format = options['export_format']
+        extension = 'parquet' if export_format == 'parquet' else EXPORT_FORMATS[export_format][1]
+        output = options['output'] or f'friends-{graph.owner_id}.{extension}'
+
+        if export_format == 'parquet':
+            try:
+                write_parquet(graph, output)
+            except ImportError:
+                raise CommandError('Для экспорта в Parquet установите пакет pyarrow')
+        else:
+            with open(output, 'wb') as f:
+                for chunk in export_graph(graph, export_format, vk_labels(vk)):
+                    f.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Граф ({len(graph)} вершин) сохранён в {output}'))
@@ -0,0 +1,53 @@
+"""Команда периодической синхронизации отслеживаемых аккаунтов"""
+
+from time import sleep
+import logging
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from vkapi.rate_limit import priority, BACKGROUND
+from vkapi.vk_tools import Vk
+from vkapi.watch import sync_watchlist
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Периодическая синхронизация отслеживаемых аккаунтов VK: сначала
+    проверяются счётчики, полностью запрашиваются только изменившиеся
+    разделы. Изменения друзей, подписок и записей на стене сохраняются
+    в БД. Ошибка цикла (API VK или БД) записывается в журнал,
+    синхронизация продолжается в следующем цикле
+    """
+
+    help = 'Периодическая синхронизация отслеживаемых аккаунтов VK'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--interval', type=int, default=settings.VKAPI_WATCH['INTERVAL'],
+                            help='Пауза между циклами в секундах')
+        parser.add_argument('--budget', type=int, default=settings.VKAPI_WATCH['BUDGET'],
+                            help='Допустимое количество вызовов API за цикл')
+        parser.add_argument('--once', action='store_true', help='Выполнить один цикл и завершиться')
+
+    def handle(self, *args, **options) -> None:
+        vk = Vk(token=os.environ['VK_TOKEN'])
+        while True:
+            try:
+                with priority(BACKGROUND):
+                    stats = sync_watchlist(vk, options['budget'])
+            except Exception as error:
+                logger.exception('Ошибка синхронизации отслеживаемых аккаунтов')
+                if options['once']:
+                    raise CommandError(f'Ошибка синхронизации: {error}')
+                self.stderr.write(f'Ошибка синхронизации: {error}')
+            else:
+                self.stdout.write(
+                    f'Проверено {stats["checked"]}/{stats["watched"]}, синхронизировано {stats["synced"]}, '
+                    f'закрыто {stats["closed"]}, изменений {stats["changes"]}, вызовов API {stats["calls"]}'
+                )
+            if options['once']:
+                break
+            sleep(options['interval'])
@@ -0,0 +1,259 @@
+"""Общий для всех потоков и процессов планировщик запросов к VK API с классами приоритета"""
+
+from contextlib import contextmanager
+from hashlib import sha1
+from threading import Condition, Lock, local
+from time import monotonic, sleep, time
+from typing import Dict, Iterator, Optional
+import sqlite3
+
+from django.conf import settings
+import vk_api
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+_context = local()
+
+
+@contextmanager
+def priority(level: str) -> Iterator[None]:
+    """
+    Контекстный менеджер, задающий класс приоритета запросов
+    к VK API, выполняемых в текущем потоке
+
+    Parameters
+    ----------
+    level: str
+        Класс приоритета (INTERACTIVE или BACKGROUND)
+
+    """
+    previous = current_priority()
+    _context.priority = level
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def current_priority() -> str:
+    """Класс приоритета текущего потока (по умолчанию INTERACTIVE)"""
+    return getattr(_context, 'priority', INTERACTIVE)
+
+
+class SharedSchedule:
+    """
+    Расписание запросов, общее для всех процессов: моменты, с которых
+    разрешены следующие запросы токена (в целом и для каждого класса
+    приоритета), хранятся в файле SQLite и резервируются в транзакции.
+    Так лимит соблюдается и при нескольких рабочих процессах сервера,
+    и при запущенных рядом процессах пакетного анализа
+
+    Attributes
+    ----------
+    location: str
+        Путь к файлу базы данных
+    MAX_AHEAD: float
+        Насколько секунд вперёд может быть зарезервирован запрос;
+        более поздние моменты считаются оставшимися от перевода часов
+
+    Methods
+    -------
+    reserve(key, level, rate, quota)
+        Резервирование момента следующего запроса
+
+    """
+
+    MAX_AHEAD = 60
+
+    def __init__(self, location: str) -> None:
+        """
+        Инициализация расписания
+
+        Parameters
+        ----------
+        location: str
+            Путь к файлу базы данных
+
+        """
+        self.location = location
+        self.__local = local()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение с базой данных (своё для каждого потока)"""
+        if not hasattr(self.__local, 'connection'):
+            connection = sqlite3.connect(self.location, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS rate_limit (key TEXT PRIMARY KEY, next REAL NOT NULL)')
+            self.__local.connection = connection
+        return self.__local.connection
+
+    def reserve(self, key: str, level: str, rate: float, quota: float) -> float:
+        """
+        Метод, резервирующий ближайший момент, когда запрос класса
+        level не нарушит ни общий лимит, ни квоту класса
+
+        Parameters
+        ----------
+        key: str
+            Ключ токена
+        level: str
+            Класс приоритета
+        rate: float
+            Общее количество запросов в секунду
+        quota: float
+            Количество запросов в секунду для класса приоритета
+
+        Returns
+        -------
+        float
+            Сколько секунд осталось до зарезервированного момента
+
+        """
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time()
+            keys = (key, f'{key}:{level}')
+            reserved = [row[0] for row in connection.execute('SELECT next FROM rate_limit WHERE key IN (?, ?)', keys)]
+            slot = max([now] + [moment for moment in reserved if moment <= now + self.MAX_AHEAD])
+            connection.executemany('INSERT OR REPLACE INTO rate_limit VALUES (?, ?)',
+                                   [(keys[0], slot + 1 / rate), (keys[1], slot + 1 / quota)])
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+        return slot - now
+
+
+class PriorityScheduler:
+    """
+    Планировщик запросов одного токена: не больше rate запросов
+    в секунду в целом и не больше квоты каждого класса приоритета.
+    Пока ждут запросы более приоритетного класса, менее приоритетные
+    не выполняются, поэтому интерактивные запросы обгоняют фоновые.
+    Если передано общее расписание, лимиты дополнительно соблюдаются
+    суммарно по всем процессам (очерёдность классов - внутри процесса)
+
+    Attributes
+    ----------
+    rate: float
+        Общее количество запросов в секунду
+    quotas: Dict[str, float]
+        Количество запросов в секунду для каждого класса приоритета
+    shared: Optional[SharedSchedule]
+        Общее для процессов расписание
+    key: str
+        Ключ токена в общем расписании
+
+    Methods
+    -------
+    acquire(level)
+        Ожидание разрешения на запрос
+
+    """
+
+    def __init__(self, rate: float, quotas: Dict[str, float], shared: Optional[SharedSchedule] = None,
+                 key: str = '') -> None:
+        """
+        Инициализация планировщика
+
+        Parameters
+        ----------
+        rate: float
+            Общее количество запросов в секунду
+        quotas: Dict[str, float]
+            Количество запросов в секунду для каждого класса приоритета
+        shared: Optional[SharedSchedule]
+            Общее для процессов расписание (None - лимиты только внутри процесса)
+        key: str
+            Ключ токена в общем расписании
+
+        """
+        self.rate = rate
+        self.quotas = {level: min(rate, quotas.get(level, rate)) for level in PRIORITIES}
+        self.shared = shared
+        self.key = key
+        now = monotonic()
+        # момент, с которого разрешён следующий запрос: в целом и для каждого класса
+        self.__next = now
+        self.__next_by_level = {level: now for level in PRIORITIES}
+        self.__waiting = {level: 0 for level in PRIORITIES}
+        self.__condition = Condition(Lock())
+
+    def acquire(self, level: str = INTERACTIVE) -> None:
+        """
+        Метод, ожидающий разрешения на запрос заданного класса приоритета
+
+        Parameters
+        ----------
+        level: str
+            Класс приоритета
+
+        """
+        higher = PRIORITIES[:PRIORITIES.index(level)]
+        with self.__condition:
+            self.__waiting[level] += 1
+            try:
+                while True:
+                    now = monotonic()
+                    ready = max(self.__next, self.__next_by_level[level])
+                    if not any(self.__waiting[other] for other in higher) and ready <= now:
+                        self.__next = max(self.__next, now - 1 / self.rate) + 1 / self.rate
+                        self.__next_by_level[level] = (max(self.__next_by_level[level], now - 1 / self.quotas[level]) +
+                                                       1 / self.quotas[level])
+                        break
+                    self.__condition.wait(max(ready - now, 0.01) if ready > now else None)
+            finally:
+                self.__waiting[level] -= 1
+                self.__condition.notify_all()
+
+        if self.shared is not None:
+            sleep(self.shared.reserve(self.key, level, self.rate, self.quotas[level]))
+
+
+_schedulers: Dict[str, PriorityScheduler] = {}
+_schedulers_lock = Lock()
+
+
+def get_scheduler(token: str) -> PriorityScheduler:
+    """
+    Функция, возвращающая общий для процесса планировщик запросов токена
+    (лимит VK API действует на токен, а не на объект VkApi). Если задан
+    VKAPI_RATE_LIMIT_LOCATION, лимит согласуется между процессами
+
+    Parameters
+    ----------
+    token: str
+        API-ключ VK
+
+    Returns
+    -------
+    PriorityScheduler
+        Планировщик запросов
+
+    """
+    with _schedulers_lock:
+        if token not in _schedulers:
+            location = getattr(settings, 'VKAPI_RATE_LIMIT_LOCATION', None)
+            _schedulers[token] = PriorityScheduler(getattr(settings, 'VKAPI_RATE_LIMIT', 3),
+                                                   getattr(settings, 'VKAPI_PRIORITY_QUOTAS', {}),
+                                                   SharedSchedule(str(location)) if location else None,
+                                                   sha1(token.encode()).hexdigest())
+        return _schedulers[token]
+
+
+class RateLimitedVkApi(vk_api.VkApi):
+    """
+    VkApi, ограничивающий частоту запросов общим для всех объектов
+    планировщиком токена (с учётом класса приоритета потока)
+    вместо задержки внутри каждого объекта
+    """
+
+    RPS_DELAY = 0
+
+    def method(self, method, values=None, **kwargs):
+        get_scheduler(self.token['access_token']).acquire(current_priority())
+        return super().method(method, values, **kwargs)
@@ -0,0 +1,47 @@
+"""Фоновое обновление устаревших данных в кэше"""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Hashable, Set
+
+from .rate_limit import priority, BACKGROUND
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vkapi-refresh')
+_scheduled: Set[Hashable] = set()
+_lock = Lock()
+
+
+def schedule_refresh(key: Hashable, func: Callable[[], None]) -> bool:
+    """
+    Функция, ставящая обновление в очередь фонового потока.
+    Запросы к VK API в нём выполняются с фоновым приоритетом;
+    обновление с ключом, уже стоящим в очереди, не добавляется
+
+    Parameters
+    ----------
+    key: Hashable
+        Ключ обновления
+    func: Callable[[], None]
+        Функция обновления
+
+    Returns
+    -------
+    bool
+        Поставлено ли обновление в очередь
+
+    """
+    with _lock:
+        if key in _scheduled:
+            return False
+        _scheduled.add(key)
+
+    def run() -> None:
+        try:
+            with priority(BACKGROUND):
+                func()
+        finally:
+            with _lock:
+                _scheduled.discard(key)
+
+    _executor.submit(run)
+    return True
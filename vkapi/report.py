@@ -0,0 +1,164 @@
+"""Потоковый экспорт отчёта об аккаунте из сохранённых данных анализа"""
+
+from json import dumps
+from typing import Iterator
+
+from django.utils.html import escape
+from vk_api.exceptions import ApiError
+
+from .cache import get_cache
+from .graph_layout import graph_version
+from .vk_tools import Vk
+from .vk_tools_models import ProfileReport
+
+REPORT_FORMATS = {
+    'html': ('text/html; charset=utf-8', 'html'),
+    'json': ('application/json', 'json')
+}
+
+INFO_FIELDS = (
+    ('birthday', 'Дата рождения'), ('country', 'Страна'), ('city', 'Город'),
+    ('interests', 'Интересы'), ('books', 'Любимые книги'), ('games', 'Любимые игры'),
+    ('movies', 'Любимые фильмы'), ('music', 'Любимая музыка'), ('activities', 'Деятельность'),
+    ('friends_count', 'Количество друзей'), ('followers_count', 'Количество подписчиков')
+)
+
+
+def collect_report(vk: Vk, link: str) -> ProfileReport | None:
+    """
+    Функция, собирающая отчёт об аккаунте. Данные профиля берутся
+    из кэша или последнего снимка в БД (запрашиваются у VK, только
+    если их нет), результаты анализа (описание, токсичность, графики) -
+    только из кэша: не составленные или устаревшие разделы пропускаются
+
+    Parameters
+    ----------
+    vk: Vk
+        Объект доступа к API VK
+    link: str
+        Ссылка на аккаунт
+
+    Returns
+    -------
+    ProfileReport | None
+        Отчёт или None, если ссылка некорректна или данные об аккаунте недоступны
+
+    """
+    try:
+        info = vk.get_info(link)
+    except (TypeError, IndexError, ApiError):
+        return
+
+    cache = get_cache()
+    _id = info['id']
+    graph = cache.get(f'friend_graph:{_id}')
+    return ProfileReport(
+        link=link,
+        info=info,
+        summary=cache.get(f'summary:{_id}'),
+        toxicity=cache.get(f'toxicity:{_id}'),
+        analytics=None if graph is None else cache.get(f'analytics:{graph_version(graph)}'),
+        activity_graph=cache.get(f'activity_graph:{_id}'),
+        mutual_graph=cache.get(f'mutual_graph:{_id}')
+    )
+
+
+def iter_html_report(report: ProfileReport) -> Iterator[str]:
+    """
+    Генератор HTML-документа отчёта по частям. Графики встраиваются
+    во фреймы через srcdoc и передаются отдельными частями
+
+    Parameters
+    ----------
+    report: ProfileReport
+        Отчёт об аккаунте
+
+    Returns
+    -------
+    Iterator[str]
+        Части документа
+
+    """
+    info = report['info']
+    name = escape(f'{info.get("first_name")} {info.get("last_name")}')
+    yield ('<!DOCTYPE html>\n<html lang="ru">\n<head>\n<meta charset="UTF-8">\n'
+           f'<title>{name} — отчёт VkAnalyser</title>\n'
+           '<link href="https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css" rel="stylesheet">\n'
+           '</head>\n<body class="container" style="padding: 20px">\n'
+           f'<h3><a href="https://vk.com/id{info.get("id")}">{name}</a> — анализ аккаунта</h3><hr>\n')
+
+    yield '<h5>Общие сведения</h5>\n' + ''.join(
+        f'<p>{title}: {escape(info[field])}</p>\n' for field, title in INFO_FIELDS if info.get(field)
+    )
+    if report.get('summary'):
+        yield f'<h5>Краткое описание пользователя (GigaChat)</h5>\n<p>{escape(report["summary"])}</p>\n'
+
+    if report.get('toxicity'):
+        coefficient, _, toxic_posts = report['toxicity']
+        yield (f'<h5>Токсичность</h5>\n<p>Коэффициент токсичности: {escape(coefficient)}</p>\n' +
+               ''.join(f'<p><a href="{escape(post)}">{escape(post)}</a></p>\n' for post in toxic_posts))
+
+    for key, title, width, height in (('mutual_graph', 'Граф дружеских связей', '1000px', '610px'),
+                                      ('activity_graph', 'График активности', '1170px', '600px')):
+        if report.get(key):
+            yield f'<h5>{title}</h5>\n<iframe width="{width}" height="{height}" srcdoc="'
+            yield escape(report[key])
+            yield '"></iframe>\n'
+
+    yield '</body>\n</html>\n'
+
+
+def iter_json_report(report: ProfileReport) -> Iterator[str]:
+    """
+    Генератор JSON-документа отчёта по частям (по одному разделу).
+    HTML графиков в JSON не включается, граф представлен показателями analytics
+
+    Parameters
+    ----------
+    report: ProfileReport
+        Отчёт об аккаунте
+
+    Returns
+    -------
+    Iterator[str]
+        Части документа
+
+    """
+    separator = '{'
+    for key, value in report.items():
+        if key in ('activity_graph', 'mutual_graph'):
+            continue
+        if key == 'toxicity' and value:
+            value = {'coefficient': value[0], 'toxic_posts': value[2]}
+        yield f'{separator}{dumps(key)}: {dumps(value, ensure_ascii=False)}'
+        separator = ', '
+    yield '}\n'
+
+
+def export_report(report: ProfileReport, export_format: str) -> Iterator[bytes]:
+    """
+    Функция, возвращающая генератор отчёта в заданном формате
+
+    Parameters
+    ----------
+    report: ProfileReport
+        Отчёт об аккаунте
+    export_format: str
+        Формат (html или json)
+
+    Returns
+    -------
+    Iterator[bytes]
+        Части файла
+
+    Raises
+    ------
+    ValueError
+        Если формат не поддерживается
+
+    """
+    if export_format == 'html':
+        return (chunk.encode() for chunk in iter_html_report(report))
+    if export_format == 'json':
+        return (chunk.encode() for chunk in iter_json_report(report))
+    raise ValueError(f'Неподдерживаемый формат: {export_format}')
@@ -0,0 +1,137 @@
+"""Функции статистической выборки и доверительных интервалов"""
+
+from typing import Dict, List, Tuple, Sequence
+from math import sqrt
+from random import Random
+
+from .vk_tools_models import Estimate
+
+
+def stratified_sample(strata: Dict[str, Sequence[int]], size: int,
+                      rng: Random) -> Dict[str, List[int]]:
+    """
+    Функция, выбирающая случайную стратифицированную выборку
+    с пропорциональным размещением (не менее двух элементов
+    из каждой страты, в которой их хотя бы два, чтобы по каждой
+    страте можно было оценить дисперсию)
+
+    Parameters
+    ----------
+    strata: Dict[str, Sequence[int]]
+        Словарь страт: название -> элементы генеральной совокупности
+    size: int
+        Общий размер выборки
+    rng: Random
+        Генератор случайных чисел
+
+    Returns
+    -------
+    Dict[str, List[int]]
+        Словарь выборок по стратам
+
+    """
+    total = sum(len(items) for items in strata.values())
+    sample = {}
+
+    for name, items in strata.items():
+        if not items:
+            sample[name] = []
+            continue
+        n = min(len(items), max(2, round(size * len(items) / total)))
+        sample[name] = rng.sample(list(items), n)
+
+    return sample
+
+
+def stratified_total(observations: Dict[str, List[float]], sizes: Dict[str, int],
+                     z: float = 1.96) -> Estimate:
+    """
+    Функция, оценивающая сумму показателя по генеральной совокупности
+    по стратифицированной выборке. Дисперсия считается по первой
+    ступени отбора (оценка "конечных кластеров"). Для страт, в которых
+    наблюдение одно (например, часть стен оказалась недоступна),
+    используется объединённая внутристратовая дисперсия остальных страт,
+    а если её не по чему оценить - дисперсия всех наблюдений вместе
+
+    Parameters
+    ----------
+    observations: Dict[str, List[float]]
+        Значения показателя у выбранных элементов по стратам
+    sizes: Dict[str, int]
+        Размеры страт
+    z: float
+        Квантиль нормального распределения для доверительного интервала
+
+    Returns
+    -------
+    Estimate
+        Оценка суммы с доверительным интервалом
+
+    """
+    total = variance = 0.0
+    sample_size = 0
+    squares = freedom = 0.0
+    singletons = []
+
+    for name, values in observations.items():
+        n, size = len(values), sizes[name]
+        if not n:
+            continue
+        mean = sum(values) / n
+        total += size * mean
+        sample_size += n
+        if n == 1:
+            if size > 1:
+                singletons.append(size)
+            continue
+        s2 = sum((value - mean) ** 2 for value in values) / (n - 1)
+        squares += (n - 1) * s2
+        freedom += n - 1
+        variance += size ** 2 * (1 - n / size) * s2 / n
+
+    if singletons:
+        variance += sum(size ** 2 * (1 - 1 / size) for size in singletons) * _pooled_variance(
+            observations, squares, freedom)
+
+    margin = z * sqrt(variance)
+    return Estimate(value=total, low=max(0.0, total - margin), high=total + margin, sample_size=sample_size)
+
+
+def _pooled_variance(observations: Dict[str, List[float]], squares: float, freedom: float) -> float:
+    """Объединённая внутристратовая дисперсия или, если её нельзя оценить, дисперсия всех наблюдений"""
+    if freedom:
+        return squares / freedom
+    values = [value for stratum in observations.values() for value in stratum]
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+
+
+def wilson_interval(successes: int, n: int, z: float = 1.96) -> Tuple[float, float]:
+    """
+    Функция, возвращающая доверительный интервал Уилсона для доли
+
+    Parameters
+    ----------
+    successes: int
+        Количество "успехов" в выборке
+    n: int
+        Размер выборки
+    z: float
+        Квантиль нормального распределения
+
+    Returns
+    -------
+    Tuple[float, float]
+        Нижняя и верхняя границы интервала
+
+    """
+    if not n:
+        return 0.0, 1.0
+
+    p = successes / n
+    denominator = 1 + z ** 2 / n
+    center = (p + z ** 2 / (2 * n)) / denominator
+    margin = z * sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
@@ -0,0 +1,80 @@
+"""Объединение одновременных одинаковых вычислений в одно (single-flight)"""
+
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """Выполняющееся вычисление и его результат"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Объединение одновременных вызовов с одинаковым ключом: первый
+    вызов выполняет функцию, остальные ждут его завершения и получают
+    тот же результат (или то же исключение). Завершённые вызовы
+    не запоминаются - для этого служит кэш
+
+    Methods
+    -------
+    do(key, func)
+        Выполнение функции или ожидание уже выполняющегося вызова с тем же ключом
+
+    """
+
+    def __init__(self) -> None:
+        """Инициализация пустого набора выполняющихся вызовов"""
+        self.__calls: Dict[Hashable, _Call] = {}
+        self.__lock = Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Метод, выполняющий функцию, если вызов с таким ключом
+        ещё не выполняется, иначе ожидающий его результата.
+        Результат общий для всех ожидавших, его нельзя изменять
+
+        Parameters
+        ----------
+        key: Hashable
+            Ключ вызова, например (операция, ID пользователя)
+        func: Callable[[], Any]
+            Функция вычисления
+
+        Returns
+        -------
+        Any
+            Результат функции
+
+        """
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+        return call.result
+
+
+single_flight = SingleFlight()
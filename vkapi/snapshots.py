@@ -0,0 +1,124 @@
+"""Сохранение данных об аккаунтах VK в БД в виде версий (снимков)"""
+
+from array import array
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from main.models import ProfileSnapshot
+from .vk_tools_models import UserInfo, Subscriptions
+
+PACKED_FIELDS = ('friends', 'subscribed_users', 'subscribed_groups', 'post_dates')
+
+
+def snapshot_max_age() -> int:
+    """Возраст снимка в секундах, после которого данные запрашиваются у VK заново"""
+    return getattr(settings, 'VKAPI_SNAPSHOT_MAX_AGE', 60 * 60)
+
+
+def pack_ids(values: Optional[Iterable[int]]) -> Optional[bytes]:
+    """Упаковка списка ID в массив int64 (None сохраняется)"""
+    return None if values is None else array('q', values).tobytes()
+
+
+def unpack_ids(data: Optional[bytes]) -> Optional[List[int]]:
+    """Распаковка массива int64 в список ID (None сохраняется)"""
+    if data is None:
+        return None
+    values = array('q')
+    values.frombytes(bytes(data))
+    return values.tolist()
+
+
+def _same_ids(data: Optional[memoryview | bytes], packed: Optional[bytes]) -> bool:
+    """
+    Сравнение упакованных списков ID без учёта порядка (друзья
+    возвращаются VK в порядке подсказок, который меняется между запросами)
+    """
+    if data is None or packed is None:
+        return data is None and packed is None
+    return bytes(data) == packed or sorted(unpack_ids(data)) == sorted(unpack_ids(packed))
+
+
+def _packed(info: UserInfo) -> dict:
+    """Упакованные списки ID аккаунта по полям снимка"""
+    subscriptions = info.get('subscriptions') or {}
+    return {
+        'friends': pack_ids(info.get('friends')),
+        'subscribed_users': pack_ids(subscriptions.get('users')),
+        'subscribed_groups': pack_ids(subscriptions.get('groups')),
+        'post_dates': pack_ids(info.get('post_dates'))
+    }
+
+
+def save_snapshot(info: UserInfo) -> ProfileSnapshot:
+    """
+    Функция, сохраняющая данные об аккаунте новой версией снимка.
+    Если данные не изменились с последней версии (списки ID сравниваются
+    без учёта порядка), у неё обновляется только дата получения
+
+    Parameters
+    ----------
+    info: UserInfo
+        Словарь с данными об аккаунте VK
+
+    Returns
+    -------
+    ProfileSnapshot
+        Сохранённый снимок
+
+    """
+    fields = {
+        'info': {key: value for key, value in info.items() if key not in ('friends', 'subscriptions', 'post_dates')},
+        **_packed(info)
+    }
+
+    while True:
+        latest = ProfileSnapshot.objects.filter(vk_id=info['id']).order_by('-version').first()
+        if latest is not None and latest.info == fields['info'] and all(
+                _same_ids(getattr(latest, name), fields[name]) for name in PACKED_FIELDS):
+            latest.fetched_at = timezone.now()
+            latest.save(update_fields=['fetched_at'])
+            return latest
+
+        try:
+            with transaction.atomic():
+                return ProfileSnapshot.objects.create(
+                    vk_id=info['id'], version=latest.version + 1 if latest else 1,
+                    fetched_at=timezone.now(), **fields
+                )
+        except IntegrityError:
+            # ту же версию одновременно сохранил другой процесс
+            continue
+
+
+def load_snapshot(_id: int) -> Optional[Tuple[UserInfo, float]]:
+    """
+    Функция, возвращающая данные об аккаунте из последней версии снимка
+
+    Parameters
+    ----------
+    _id: int
+        ID пользователя
+
+    Returns
+    -------
+    Optional[Tuple[UserInfo, float]]
+        Данные об аккаунте и возраст снимка в секундах
+        или None, если снимков нет
+
+    """
+    snapshot = ProfileSnapshot.objects.filter(vk_id=_id).order_by('-version').first()
+    if snapshot is None:
+        return None
+
+    info = UserInfo(**snapshot.info)
+    info['friends'] = unpack_ids(snapshot.friends)
+    info['subscriptions'] = Subscriptions(
+        users=unpack_ids(snapshot.subscribed_users),
+        groups=unpack_ids(snapshot.subscribed_groups)
+    )
+    info['post_dates'] = unpack_ids(snapshot.post_dates)
+    return info, (timezone.now() - snapshot.fetched_at).total_seconds()
@@ -0,0 +1,85 @@
+"""Фоновое составление краткого описания пользователя через GigaChat"""
+
+from threading import Lock, Thread
+from typing import Optional, Set
+import logging
+
+from .cache import get_cache
+from .gigachat_tools import get_written_squeeze
+from .vk_tools_models import UserInfo
+
+logger = logging.getLogger(__name__)
+
+# время в секундах, в течение которого после ошибки описание не составляется повторно
+SUMMARY_RETRY_TIMEOUT = 5 * 60
+
+_pending: Set[int] = set()
+_lock = Lock()
+
+
+def get_summary(info: UserInfo) -> Optional[str]:
+    """
+    Функция, возвращающая готовое описание пользователя из кэша
+
+    Parameters
+    ----------
+    info: UserInfo
+        Данные об аккаунте
+
+    Returns
+    -------
+    Optional[str]
+        Описание или None, если оно ещё не составлено
+
+    """
+    return get_cache().get(f'summary:{info["id"]}')
+
+
+def get_summary_error(info: UserInfo) -> Optional[str]:
+    """
+    Функция, возвращающая ошибку последней попытки составить описание
+    пользователя, если с неё прошло меньше SUMMARY_RETRY_TIMEOUT секунд
+
+    Parameters
+    ----------
+    info: UserInfo
+        Данные об аккаунте
+
+    Returns
+    -------
+    Optional[str]
+        Текст ошибки или None
+
+    """
+    return get_cache().get(f'summary_error:{info["id"]}')
+
+
+def start_summary(info: UserInfo) -> None:
+    """
+    Функция, запускающая составление описания пользователя в фоновом
+    потоке, если его нет в кэше, оно ещё не составляется в этом процессе
+    и недавняя попытка не завершилась ошибкой
+
+    Parameters
+    ----------
+    info: UserInfo
+        Данные об аккаунте
+
+    """
+    with _lock:
+        if info['id'] in _pending or get_summary(info) is not None or get_summary_error(info) is not None:
+            return
+        _pending.add(info['id'])
+
+    def build() -> None:
+        try:
+            get_cache().get_or_set(f'summary:{info["id"]}', lambda: get_written_squeeze(info))
+        except Exception as error:
+            logger.exception('Не удалось составить описание пользователя %s', info['id'])
+            get_cache().set(f'summary_error:{info["id"]}', f'{type(error).__name__}: {error}',
+                            SUMMARY_RETRY_TIMEOUT)
+        finally:
+            with _lock:
+                _pending.discard(info['id'])
+
+    Thread(target=build, daemon=True).start()
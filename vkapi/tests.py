@@ -0,0 +1,283 @@
+"""Тесты аналитики vkapi на синтетической сети без доступа к VK"""
+
+from math import sqrt
+from random import Random
+import shutil
+import tempfile
+
+import numpy as np
+from django.test import TestCase, override_settings
+
+from . import cache, rate_limit
+from .fake_api import FakeVkSession, SyntheticNetwork
+from .friend_graph import FriendGraph
+from .friend_overlap import overlap_matrix
+from .graph_analytics import betweenness, label_propagation
+from .hyperloglog import HyperLogLog
+from .link_resolver import LinkResolver
+from .sampling import stratified_sample, stratified_total, wilson_interval
+from .visualization import Visualization
+from .vk_tools import Vk
+
+
+class FakeVkTestCase(TestCase):
+    """
+    Базовый класс тестов, работающих с Vk поверх синтетической сети:
+    отдельный временный кэш и лимит запросов без ожидания
+    """
+
+    USERS = 200
+    AVERAGE_FRIENDS = 20
+
+    def setUp(self) -> None:
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(
+            VKAPI_CACHE={'BACKEND': 'vkapi.cache.SQLiteCache', 'LOCATION': f'{directory}/cache.sqlite3',
+                         'MAX_SIZE': 64 * 1024 * 1024, 'TIMEOUT': 60 * 60},
+            VKAPI_RATE_LIMIT=10000,
+            VKAPI_PRIORITY_QUOTAS={level: 10000 for level in rate_limit.PRIORITIES},
+            VKAPI_RATE_LIMIT_LOCATION=None
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # кэш и планировщики создаются один раз на процесс, поэтому сбрасываются на время теста
+        self.addCleanup(self.__reset)
+        self.__reset()
+
+        self.network = SyntheticNetwork(users=self.USERS, average_friends=self.AVERAGE_FRIENDS)
+        self.session = FakeVkSession(network=self.network)
+        self.vk = Vk(token='test', session=self.session)
+
+    @staticmethod
+    def __reset() -> None:
+        """Сброс общего кэша и планировщиков запросов"""
+        cache._cache = None
+        rate_limit._schedulers.clear()
+
+    def friends_of(self, _id: int) -> set:
+        """Точный список друзей пользователя по графу синтетической сети"""
+        index = _id - 1
+        return set((self.network.indices[self.network.indptr[index]:self.network.indptr[index + 1]] + 1).tolist())
+
+    def public_user(self) -> int:
+        """ID первого пользователя с открытым профилем и друзьями"""
+        return next(index + 1 for index in range(self.USERS)
+                    if not self.network.private[index] and self.friends_of(index + 1))
+
+
+class SamplingTests(TestCase):
+    """Тесты стратифицированной выборки и доверительных интервалов"""
+
+    def test_stratified_total(self) -> None:
+        estimate = stratified_total({'a': [1, 3]}, {'a': 10})
+        # среднее 2, s^2 = 2, дисперсия 10^2 * (1 - 2/10) * 2 / 2 = 80
+        self.assertEqual(estimate['value'], 20)
+        self.assertAlmostEqual(estimate['high'] - estimate['value'], 1.96 * sqrt(80))
+        self.assertEqual(estimate['sample_size'], 2)
+
+    def test_stratified_total_census_has_no_variance(self) -> None:
+        estimate = stratified_total({'own': [5], 'a': [1, 2, 3]}, {'own': 1, 'a': 3})
+        self.assertEqual(estimate['value'], 11)
+        self.assertEqual(estimate['low'], estimate['high'])
+
+    def test_stratified_total_single_observation_uses_pooled_variance(self) -> None:
+        estimate = stratified_total({'a': [1, 3], 'b': [2]}, {'a': 10, 'b': 5})
+        # страта b получает дисперсию страты a: 5^2 * (1 - 1/5) * 2 = 40
+        self.assertEqual(estimate['value'], 30)
+        self.assertAlmostEqual(estimate['high'] - estimate['value'], 1.96 * sqrt(80 + 40))
+
+    def test_stratified_sample_takes_two_per_stratum(self) -> None:
+        strata = {'own': [1], 'friends': list(range(100)), 'groups': [-1, -2, -3], 'users': []}
+        sample = stratified_sample(strata, 10, Random(0))
+        self.assertEqual(len(sample['own']), 1)
+        self.assertEqual(len(sample['friends']), 10)
+        self.assertEqual(len(sample['groups']), 2)
+        self.assertEqual(sample['users'], [])
+        self.assertTrue(set(sample['groups']) <= set(strata['groups']))
+
+    def test_wilson_interval(self) -> None:
+        low, high = wilson_interval(5, 10)
+        self.assertAlmostEqual(low, 0.2366, places=4)
+        self.assertAlmostEqual(high, 0.7634, places=4)
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+        self.assertEqual(wilson_interval(0, 10)[0], 0.0)
+
+
+class HyperLogLogTests(TestCase):
+    """Тесты скетча HyperLogLog"""
+
+    def test_estimate_small_set(self) -> None:
+        sketch = HyperLogLog()
+        sketch.add(range(1, 101))
+        sketch.add(range(1, 51))
+        # для малых множеств используется линейный подсчёт по пустым регистрам
+        self.assertAlmostEqual(sketch.count(), 100, delta=5)
+
+    def test_estimate_interval(self) -> None:
+        sketch = HyperLogLog()
+        sketch.add(range(100000, 120000))
+        estimate = sketch.estimate()
+        self.assertLessEqual(estimate['low'], 20000)
+        self.assertGreaterEqual(estimate['high'], 20000)
+        self.assertAlmostEqual(estimate['value'], 20000, delta=20000 * 0.05)
+
+    def test_merge_equals_union(self) -> None:
+        first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        first.add(range(0, 3000))
+        second.add(range(2000, 5000))
+        union.add(range(0, 5000))
+        first.merge(second)
+        np.testing.assert_array_equal(first.registers, union.registers)
+
+    def test_bytes_round_trip(self) -> None:
+        sketch = HyperLogLog(10)
+        sketch.add([1, 2, 3])
+        restored = HyperLogLog.from_bytes(sketch.to_bytes())
+        self.assertEqual(restored.precision, 10)
+        np.testing.assert_array_equal(restored.registers, sketch.registers)
+
+
+class FriendGraphTests(TestCase):
+    """Тесты построения графа дружеских связей в формате CSR"""
+
+    def test_from_edges(self) -> None:
+        # повторное и обратное ребро объединяются, петля и ребро к не-другу отбрасываются
+        graph = FriendGraph.from_edges(1, [10, 20, 30, 40], [10, 20, 20, 30, 30], [20, 10, 30, 30, 99])
+        self.assertEqual(graph.indptr.tolist(), [0, 1, 3, 4, 4])
+        self.assertEqual(graph.indices.tolist(), [1, 0, 2, 1])
+        self.assertEqual(graph.degree().tolist(), [1, 2, 1, 0])
+        self.assertEqual(graph.neighbours(1).tolist(), [0, 2])
+        self.assertEqual([array.tolist() for array in graph.edges()], [[0, 1], [1, 2]])
+        self.assertEqual(graph.index_of([30, 99, 10]).tolist(), [2, -1, 0])
+
+    def test_empty_graph(self) -> None:
+        graph = FriendGraph.from_edges(1, [], [], [])
+        self.assertEqual(len(graph), 0)
+        self.assertEqual(graph.index_of([5]).tolist(), [-1])
+
+
+class GraphAnalyticsTests(TestCase):
+    """Тесты центральности и поиска сообществ на небольших графах с известным ответом"""
+
+    def test_betweenness_path(self) -> None:
+        graph = FriendGraph.from_edges(0, [1, 2, 3], [1, 2], [2, 3])
+        np.testing.assert_allclose(betweenness(graph), [0, 1, 0])
+
+    def test_betweenness_star(self) -> None:
+        graph = FriendGraph.from_edges(0, [1, 2, 3, 4, 5], [1, 1, 1, 1], [2, 3, 4, 5])
+        np.testing.assert_allclose(betweenness(graph), [1, 0, 0, 0, 0])
+
+    def test_label_propagation_separates_cliques(self) -> None:
+        large, small = [1, 2, 3, 4, 5], [6, 7, 8]
+        sources, targets = [], []
+        for clique in (large, small):
+            for i, source in enumerate(clique):
+                sources += [source] * (len(clique) - i - 1)
+                targets += clique[i + 1:]
+        communities = label_propagation(FriendGraph.from_edges(0, large + small, sources, targets))
+        self.assertEqual(communities.tolist(), [0] * 5 + [1] * 3)
+
+
+class FriendOverlapTests(TestCase):
+    """Тесты попарного сравнения списков друзей"""
+
+    def test_overlap_matrix(self) -> None:
+        intersection, jaccard = overlap_matrix([np.array([1, 2, 3]), None, np.array([2, 3, 4, 5])])
+        self.assertEqual(intersection[0, 2], 2)
+        self.assertEqual(intersection[0, 0], 3)
+        self.assertAlmostEqual(jaccard[0, 2], 2 / 5)
+        self.assertEqual(jaccard[2, 2], 1)
+        self.assertTrue(np.isnan(intersection[1]).all() and np.isnan(jaccard[:, 1]).all())
+
+    def test_overlap_matrix_hidden_only(self) -> None:
+        intersection, _ = overlap_matrix([None, None])
+        self.assertTrue(np.isnan(intersection).all())
+
+
+class LinkResolverParseTests(TestCase):
+    """Тесты разбора ссылок на аккаунты"""
+
+    def test_parse(self) -> None:
+        cases = {
+            '123': 123,
+            'https://vk.com/id123': 123,
+            'vk.com/durov': 'durov',
+            'https://m.vk.com/durov?w=1': 'durov',
+            'https://vk.com/club42': 42,
+            'https://vk.com/im?sel=77': 77,
+            'https://vk.com/feed?w=wall55_1': 55
+        }
+        for link, expected in cases.items():
+            with self.subTest(link=link):
+                self.assertEqual(LinkResolver.parse(link), expected)
+
+    def test_parse_invalid(self) -> None:
+        with self.assertRaises(TypeError):
+            LinkResolver.parse('not a link')
+
+
+class VkSyntheticNetworkTests(FakeVkTestCase):
+    """Тесты методов Vk, сверяющие результат с точным ответом по графу синтетической сети"""
+
+    def test_friend_graph(self) -> None:
+        owner = self.public_user()
+        friends = self.friends_of(owner)
+        graph = self.vk.get_friend_graph(f'https://vk.com/id{owner}')
+        self.assertEqual(set(graph.ids.tolist()), friends)
+        for index, friend in enumerate(graph.ids.tolist()):
+            neighbours = set(graph.ids[graph.neighbours(index)].tolist())
+            self.assertEqual(neighbours, self.friends_of(friend) & friends)
+
+    def test_compare_friends(self) -> None:
+        first = self.public_user()
+        second = next(_id for _id in range(first + 1, self.USERS + 1) if not self.network.private[_id - 1])
+        overlap = self.vk.compare_friends(f'https://vk.com/id{first}', str(second))
+        common = self.friends_of(first) & self.friends_of(second)
+        union = self.friends_of(first) | self.friends_of(second)
+        self.assertEqual(overlap['ids'], [first, second])
+        self.assertEqual(overlap['intersection'][0][1], len(common))
+        self.assertAlmostEqual(overlap['jaccard'][0][1], len(common) / len(union))
+
+    def test_two_hop_reach(self) -> None:
+        owner = self.public_user()
+        reach = set(self.friends_of(owner))
+        for friend in self.friends_of(owner):
+            if not self.network.private[friend - 1]:
+                reach |= self.friends_of(friend)
+        estimate = self.vk.estimate_two_hop_reach(f'https://vk.com/id{owner}')
+        self.assertAlmostEqual(estimate['value'], len(reach), delta=len(reach) * 0.05)
+
+        # при повторной сборке скетчи друзей берутся из кэша, заново запрашиваются только скрытые списки
+        cache.get_cache().delete(f'two_hop_sketch:{owner}')
+        self.session.reset_stats()
+        self.assertEqual(self.vk.estimate_two_hop_reach(f'https://vk.com/id{owner}'), estimate)
+        hidden = any(self.network.private[friend - 1] for friend in self.friends_of(owner))
+        self.assertEqual(self.session.stats.get('method:execute', 0), int(hidden))
+
+
+class SubscriptionPageTests(FakeVkTestCase):
+    """Тесты постраничной выдачи подписок по курсору"""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.ids = list(range(1000, 1000 + 2 * Visualization.SUBSCRIPTIONS_PAGE_SIZE + 5))
+        info = {'id': 1, 'first_name': 'Тест', 'last_name': 'Тестов', 'subscriptions': {'users': self.ids}}
+        self.visualization = Visualization('https://vk.com/id1', vk=self.vk, user_info=info)
+
+    def test_pages_follow_cursor(self) -> None:
+        pages, cursor = [], None
+        while True:
+            page, cursor = self.visualization._get_page('users', cursor)
+            pages.append(page)
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in pages], [Visualization.SUBSCRIPTIONS_PAGE_SIZE] * 2 + [5])
+        self.assertEqual(sum(pages, []), self.ids)
+
+    def test_empty_kind(self) -> None:
+        self.assertEqual(self.visualization._get_page('groups', None), ([], None))
+
+    def test_unknown_cursor(self) -> None:
+        with self.assertRaises(ValueError):
+            self.visualization._get_page('users', 1)
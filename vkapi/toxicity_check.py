@@ -2,13 +2,36 @@
 
 from typing import List, Tuple, Optional
 
+from django.conf import settings
 from requests import get
 
+OBSCENE_CORPUS_URL = 'https://raw.githubusercontent.com/odaykhovskaya/obscene_words_ru/master/obscene_corpus.txt'
+
+
+def load_obscene_dictionary() -> List[str]:
+    """
+    Функция, загружающая словарь нецензурной лексики: из файла
+    VKAPI_OBSCENE_CORPUS, если он задан в настройках, иначе из онлайн-базы
+
+    Returns
+    -------
+    List[str]
+        Слова словаря в нижнем регистре
+
+    """
+    path = getattr(settings, 'VKAPI_OBSCENE_CORPUS', None)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            corpus = f.read()
+    else:
+        corpus = get(OBSCENE_CORPUS_URL).text
+    return corpus.lower().split('\n')[:-1]
+
 
 def check_obscene_vocabulary(data: List[Tuple[str, str]]) -> List[Optional[str]]:
     """
     Проверка списка входящих строк на предмет наличия нецензурной
-    или оскорбительной лексики по онлайн-базе. Возврат ссылок на посты,
+    или оскорбительной лексики по словарю load_obscene_dictionary. Возврат ссылок на посты,
     в которых она была найдена
 
     Parameters
@@ -22,9 +45,7 @@ def check_obscene_vocabulary(data: List[Tuple[str, str]]) -> List[Optional[str]]
         Список со ссылками на тексты с нецензурной лексикой
 
     """
-    dictionary = get(
-        'https://raw.githubusercontent.com/odaykhovskaya/obscene_words_ru/master/obscene_corpus.txt'
-    ).text.lower().split('\n')[:-1]
+    dictionary = load_obscene_dictionary()
 
     all_texts = ' ' + ''.join([elem[0] for elem in data]).lower() + ' '
 
@@ -6,11 +6,20 @@ from . import views
 
 urlpatterns = [
     path('', views.user_info_view, name='user_info'),
+    path('summary', views.summary_view, name='summary'),
+    path('dashboard', views.dashboard_view, name='dashboard'),
     path('mutual-friends', views.mutual_friends_view, name='mutual_friends'),
+    path('friends-overlap', views.friends_overlap_view, name='friends_overlap'),
+    path('graph-export', views.graph_export_view, name='graph_export'),
+    path('reach', views.reach_view, name='reach'),
+    path('report', views.report_view, name='report'),
     path('activity', views.activity_view, name='activity'),
     path('subscriptions', views.subscriptions_view, name='subscriptions'),
     path('change-theme', views.change_theme, name='vkapi_change_theme'),
     path('toxicity', views.toxicity_view, name='toxicity'),
     path('acquaintances', views.acquaintances_view, name='acquaintances'),
+    path('demographics', views.demographics_view, name='demographics'),
+    path('bulk', views.bulk_view, name='bulk'),
+    path('bulk-report', views.bulk_report_view, name='bulk_report'),
     path('loader', views.loader_view, name='loader')
 ]
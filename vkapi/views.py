@@ -1,14 +1,27 @@
 """Обработка страниц приложения vkapi"""
 
+from uuid import uuid4
 import os
+import re
+import subprocess
+import sys
 
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.conf import settings
+from django.http import (HttpRequest, HttpResponse, HttpResponseRedirect, HttpResponseBadRequest, JsonResponse,
+                         HttpResponseNotFound, StreamingHttpResponse, FileResponse)
 from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.utils.html import escape
+from vk_api.exceptions import ApiError
 
-from main.models import VkAccount
+from main.history import get_history_page, record_history
 from .visualization import Visualization
-from .gigachat_tools import get_written_squeeze
 from .vk_tools import Vk
+from .graph_export import EXPORT_FORMATS, export_graph, vk_labels
+from .bulk import read_checkpoint, read_failure, mark_failed, is_running, running_jobs
+from .report import REPORT_FORMATS, collect_report, export_report
+from .summary import get_summary, get_summary_error, start_summary
+from .dashboard import iter_dashboard_events
 
 
 def user_info_view(request: HttpRequest) -> HttpResponse | HttpResponseRedirect:
@@ -40,18 +53,15 @@ def user_info_view(request: HttpRequest) -> HttpResponse | HttpResponseRedirect:
             'vkapi/user-info.html',
             {
                 'info': info,
-                'text': get_written_squeeze(info),
+                'text': get_summary(info),
                 'link': link,
                 'theme': request.COOKIES['theme']
             })
 
-        if (not VkAccount.objects.filter(link=link, creator=request.COOKIES['login']).exists() and
-                not request.GET.get('save')):
-            VkAccount(
-                link=link, first_name=info.get('first_name'), last_name=info.get('last_name'),
-                creator=request.COOKIES['login']
-            ).save()
+        if not request.GET.get('save'):
+            record_history(request.COOKIES['login'], link, info.get('first_name'), info.get('last_name'))
 
+        start_summary(info)
         return response
 
     except (TypeError, IndexError):
@@ -61,14 +71,41 @@ def user_info_view(request: HttpRequest) -> HttpResponse | HttpResponseRedirect:
             {
                 'error': True,
                 'login': request.COOKIES['login'],
-                'links': [{
-                    'name': f'{elem.first_name} {elem.last_name}',
-                    'link': elem.link
-                } for elem in VkAccount.objects.filter(creator=request.COOKIES['login'])]
+                'links': get_history_page(request.COOKIES['login'])[0]
             }
         )
 
 
+def summary_view(request: HttpRequest) -> JsonResponse:
+    """
+    Возвращает краткое описание пользователя от GigaChat, если оно
+    уже составлено, иначе запускает его составление в фоне
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    JsonResponse
+        Признак готовности, текст описания и ошибка последней попытки
+        его составить
+
+    """
+    try:
+        info = Vk(token=os.environ['VK_TOKEN']).get_info(request.GET.get('link'))
+    except (TypeError, IndexError):
+        return JsonResponse({'ready': False, 'text': None, 'error': None}, status=404)
+
+    text = get_summary(info)
+    error = None
+    if text is None:
+        error = get_summary_error(info)
+        start_summary(info)
+    return JsonResponse({'ready': text is not None, 'text': text, 'error': error})
+
+
 def change_theme(request: HttpRequest) -> HttpResponseRedirect:
     """
     Установка темы страницы с помощью cookie
@@ -96,6 +133,36 @@ def change_theme(request: HttpRequest) -> HttpResponseRedirect:
     return response
 
 
+def dashboard_view(request: HttpRequest) -> StreamingHttpResponse:
+    """
+    Поток server-sent events с HTML всех разделов страницы анализа
+    аккаунта. Данные об аккаунте запрашиваются один раз, разделы
+    рассчитываются параллельно и отправляются по мере готовности
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    StreamingHttpResponse
+        Поток событий section и завершающее событие done
+
+    """
+    link = request.GET.get('link')
+    try:
+        info = Vk(token=os.environ['VK_TOKEN']).get_info(link)
+        events = iter_dashboard_events(link, info)
+    except (TypeError, IndexError, ApiError):
+        events = iter(['event: done\ndata: {}\n\n'])
+
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def mutual_friends_view(request: HttpRequest) -> HttpResponse:
     """
     Возвращает фрейм с графом дружеских связей
@@ -112,8 +179,130 @@ def mutual_friends_view(request: HttpRequest) -> HttpResponse:
 
     """
     visualization = Visualization(request.GET.get('link'))
-    visualization.create_mutual_friends_graph('vkapi/templates/vkapi/mutual-friends-graph.html')
-    return render(request, 'vkapi/mutual-friends-graph.html')
+    return HttpResponse(visualization.get_mutual_friends_graph_html())
+
+
+def friends_overlap_view(request: HttpRequest) -> HttpResponse:
+    """
+    Возвращает страницу с попарным сравнением списков друзей
+    нескольких пользователей (параметры link повторяются)
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    HttpResponse
+        Страница с матрицей общих друзей
+
+    """
+    links = [link for link in request.GET.getlist('link') if link]
+    if len(links) < 2:
+        return HttpResponseBadRequest('Укажите хотя бы две ссылки')
+    if len(links) > Vk.COMPARE_MAX_LINKS:
+        return HttpResponseBadRequest(f'Можно сравнить не больше {Vk.COMPARE_MAX_LINKS} пользователей')
+
+    vk = Vk(token=os.environ['VK_TOKEN'])
+    try:
+        invalid = [link for link, _id in zip(links, vk.resolve_links(links)) if _id is None]
+        if invalid:
+            return HttpResponseBadRequest(f'Некорректная ссылка на пользователя: {escape(invalid[0])}')
+        overlap = vk.compare_friends(*links)
+    except (TypeError, ApiError) as error:
+        return HttpResponseBadRequest(f'Не удалось сравнить списки друзей: {escape(error)}')
+
+    rows = [
+        (link, count, list(zip(intersection, jaccard)))
+        for link, count, intersection, jaccard in zip(overlap['links'], overlap['friends_count'],
+                                                      overlap['intersection'], overlap['jaccard'])
+    ]
+    return render(request, 'vkapi/friends-overlap.html', {'links': links, 'rows': rows})
+
+
+def graph_export_view(request: HttpRequest) -> StreamingHttpResponse | HttpResponse:
+    """
+    Потоковая выгрузка графа дружеских связей в формате
+    GEXF, GraphML или сжатого CSV-списка рёбер
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    StreamingHttpResponse | HttpResponse
+        Файл с графом или сообщение об ошибке
+
+    """
+    export_format = request.GET.get('format', 'gexf')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Неподдерживаемый формат')
+
+    vk = Vk(token=os.environ['VK_TOKEN'])
+    graph = vk.get_friend_graph(request.GET.get('link'))
+    if graph is None:
+        return HttpResponseNotFound('Список друзей пользователя скрыт')
+
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(export_graph(graph, export_format, vk_labels(vk)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="friends-{graph.owner_id}.{extension}"'
+    return response
+
+
+def reach_view(request: HttpRequest) -> JsonResponse:
+    """
+    Возвращает оценку количества друзей и друзей друзей
+    пользователя (охвата на расстоянии двух шагов)
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    JsonResponse
+        Оценка с доверительным интервалом или null,
+        если список друзей скрыт
+
+    """
+    vk = Vk(token=os.environ['VK_TOKEN'])
+    return JsonResponse({'reach': vk.estimate_two_hop_reach(request.GET.get('link'))})
+
+
+def report_view(request: HttpRequest) -> StreamingHttpResponse | HttpResponse:
+    """
+    Потоковая выгрузка отчёта об аккаунте в формате HTML или JSON.
+    Отчёт собирается из сохранённых данных, без повторного
+    анализа и запросов к GigaChat; разделы, которые ещё не
+    составлены, в отчёт не входят
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    StreamingHttpResponse | HttpResponse
+        Файл отчёта или сообщение об ошибке
+
+    """
+    export_format = request.GET.get('format', 'html')
+    if export_format not in REPORT_FORMATS:
+        return HttpResponseBadRequest('Неподдерживаемый формат')
+
+    report = collect_report(Vk(token=os.environ['VK_TOKEN']), request.GET.get('link', ''))
+    if report is None:
+        return HttpResponseNotFound('Данные об аккаунте недоступны')
+
+    content_type, extension = REPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(export_report(report, export_format), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="report-{report["info"]["id"]}.{extension}"'
+    return response
 
 
 def activity_view(request: HttpRequest) -> HttpResponse:
@@ -132,8 +321,7 @@ def activity_view(request: HttpRequest) -> HttpResponse:
 
     """
     visualization = Visualization(request.GET.get('link'))
-    visualization.create_activity_graph('vkapi/templates/vkapi/activity-graph.html')
-    return render(request, 'vkapi/activity-graph.html')
+    return HttpResponse(visualization.get_activity_graph_html())
 
 
 def subscriptions_view(request: HttpRequest) -> HttpResponse:
@@ -148,13 +336,32 @@ def subscriptions_view(request: HttpRequest) -> HttpResponse:
     Returns
     -------
     HttpResponse | HttpResponseRedirect
-        Фрейм со списком подписок пользователя
+        Фрейм со страницей подписок пользователя
 
     """
+    users_after = request.GET.get('users_after')
+    groups_after = request.GET.get('groups_after')
+    if not (users_after or '0').lstrip('-').isdigit() or not (groups_after or '0').lstrip('-').isdigit():
+        return HttpResponseBadRequest('Некорректный курсор')
+
     visualization = Visualization(request.GET.get('link'))
+    try:
+        user_subscriptions, users_next = visualization.get_user_subscriptions(
+            int(users_after) if users_after else None
+        )
+        group_subscriptions, groups_next = visualization.get_group_subscriptions(
+            int(groups_after) if groups_after else None
+        )
+    except ValueError:
+        return HttpResponseBadRequest('Курсор не найден в списке подписок, откройте список с начала')
     return render(request, 'vkapi/subscriptions.html', {
-        'user_subscriptions': visualization.get_user_subscriptions(),
-        'group_subscriptions': visualization.get_group_subscriptions(),
+        'link': request.GET.get('link'),
+        'user_subscriptions': user_subscriptions,
+        'group_subscriptions': group_subscriptions,
+        'users_after': users_after or '',
+        'groups_after': groups_after or '',
+        'users_next': users_next,
+        'groups_next': groups_next
     })
 
 
@@ -200,6 +407,123 @@ def acquaintances_view(request: HttpRequest) -> HttpResponse:
     })
 
 
+def demographics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Возвращает фрейм с демографией друзей пользователя
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    HttpResponse
+        Фрейм с распределениями друзей по странам, городам,
+        годам рождения и университетам
+
+    """
+    vk = Vk(token=os.environ['VK_TOKEN'])
+    return render(request, 'vkapi/demographics.html', {
+        'demographics': vk.get_friends_demographics(request.GET.get('link'))
+    })
+
+
+def bulk_view(request: HttpRequest) -> HttpResponse | HttpResponseRedirect:
+    """
+    Загрузка файла со ссылками для пакетного анализа (POST)
+    и страница с состоянием задачи (GET с параметром job).
+    Анализ выполняется в отдельном процессе командой analyse_bulk,
+    поэтому не прерывается при перезапуске веб-сервера; одновременно
+    выполняется не больше VKAPI_BULK['MAX_JOBS'] задач
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    HttpResponse | HttpResponseRedirect
+        Страница загрузки или состояния задачи, перенаправление на задачу после загрузки
+
+    """
+    if request.method == 'POST':
+        upload = request.FILES.get('links')
+        if upload is None:
+            return HttpResponseBadRequest('Файл со ссылками не передан')
+
+        if running_jobs(settings.VKAPI_BULK_DIR) >= settings.VKAPI_BULK['MAX_JOBS']:
+            return HttpResponse('Выполняется слишком много задач пакетного анализа, попробуйте позже', status=503)
+
+        links = [line.strip() for line in upload.read().decode('utf-8', errors='ignore').splitlines()]
+        job = uuid4().hex
+        os.makedirs(settings.VKAPI_BULK_DIR, exist_ok=True)
+        report = _bulk_report_path(job)
+        with open(f'{report}.links', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(links))
+        # контрольная точка создаётся до запуска, чтобы задача сразу считалась выполняемой
+        open(f'{report}.checkpoint', 'w').close()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'analyse_bulk', f'{report}.links',
+             '--output', report],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, start_new_session=True
+        )
+        with open(f'{report}.pid', 'w', encoding='utf-8') as f:
+            f.write(str(process.pid))
+        return redirect(f'{reverse("bulk")}?job={job}')
+
+    job = request.GET.get('job')
+    if job is None:
+        return render(request, 'vkapi/bulk.html')
+    if not re.fullmatch(r'[0-9a-f]{32}', job):
+        return HttpResponseNotFound('Задача не найдена')
+
+    report = _bulk_report_path(job)
+    checkpoint = f'{report}.checkpoint'
+    if os.path.exists(checkpoint) and read_failure(report) is None and not is_running(report):
+        # процесс завершился, не записав ни отчёт, ни ошибку (например, не запустился)
+        mark_failed(report, 'Процесс анализа прервался, не сохранив отчёт')
+
+    error = read_failure(report)
+    if error is None and not os.path.exists(report) and not os.path.exists(checkpoint):
+        return HttpResponseNotFound('Задача не найдена')
+    return render(request, 'vkapi/bulk.html', {
+        'job': job,
+        'error': error,
+        'ready': error is None and os.path.exists(report) and not os.path.exists(checkpoint),
+        'done': len(read_checkpoint(checkpoint))
+    })
+
+
+def bulk_report_view(request: HttpRequest) -> FileResponse | HttpResponse:
+    """
+    Выгрузка отчёта пакетного анализа
+
+    Parameters
+    ----------
+    request: HttpRequest
+        Объект HTTP-запроса
+
+    Returns
+    -------
+    FileResponse | HttpResponse
+        Файл отчёта в формате CSV или сообщение об ошибке
+
+    """
+    job = request.GET.get('job', '')
+    report = _bulk_report_path(job)
+    if (not re.fullmatch(r'[0-9a-f]{32}', job) or not os.path.exists(report) or
+            os.path.exists(f'{report}.checkpoint')):
+        return HttpResponseNotFound('Отчёт не найден')
+    return FileResponse(open(report, 'rb'), as_attachment=True, filename=f'bulk-report-{job}.csv')
+
+
+def _bulk_report_path(job: str) -> str:
+    """Путь к файлу отчёта задачи пакетного анализа"""
+    return os.path.join(settings.VKAPI_BULK_DIR, f'{job}.csv')
+
+
 def loader_view(request: HttpRequest) -> HttpResponse:
     """
     Возвращает фрейм с анимацией загрузки
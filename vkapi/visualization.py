@@ -1,16 +1,21 @@
 """Класс, отвечающий за визуализацию связанной с анализом аккаунта информации"""
 
-from typing import List, Union, Tuple
+from typing import Dict, List, Union, Tuple, Optional
 from collections import Counter
 from datetime import datetime
 import os
 
 from pyvis.network import Network
-from copy import deepcopy
 import pandas as pd
 import plotly.graph_objects as go
 
 from .vk_tools import Vk, UserInfo, GroupInfo
+from .vk_tools_models import GraphAnalytics
+from .graph_analytics import analyse_graph
+from .sampling import wilson_interval
+from .toxicity_check import check_obscene_vocabulary
+from .cache import get_cache
+from .graph_layout import graph_version, force_layout
 
 
 class Visualization:
@@ -22,33 +27,61 @@ class Visualization:
     ----------
     vk: Vk
         Объект доступа к API VK
+    cache: BaseCache
+        Общий для рабочих процессов кэш построенных графов
     link: str
         Ссылка на анализируемый аккаунт
     user_info: UserInfo
         Объект с данными об аккаунте VK
-    vk_mutual_friends_info: List[Tuple[UserInfo, Optional[List[UserInfo]]]] | None
-        Массив данных об общих связях друзей пользователя
+    friend_graph: FriendGraph | None
+        Граф связей между друзьями пользователя
     mutual_graph: Network
         Граф дружеских связей пользователя
+    LARGE_ACCOUNT_THRESHOLD: int
+        Суммарное число друзей и подписчиков, начиная с которого анализ ведётся по выборке
+    SAMPLE_SIZE: int
+        Количество стен в выборке
+    SUBSCRIPTIONS_PAGE_SIZE: int
+        Количество подписок на одной странице фрейма
+    COMMUNITY_COLORS: Tuple[str]
+        Цвета вершин крупнейших сообществ графа дружеских связей
 
     Methods
     -------
     create_mutual_friends_graph(link_to_save_graph)
         Создает и сохраняет визуализацию графа1 общих друзей пользователя
+    get_mutual_friends_graph_html()
+        Возвращает HTML визуализации графа общих друзей (через кэш)
+    get_graph_analytics()
+        Рассчитывает сообщества, центральность и друзей-мостов графа
     get_toxicity()
-        Определяет коэффициент токсичности и список токсичных постов
-    _get_toxicity_coefficient()
+        Определяет коэффициент токсичности и список токсичных постов (через кэш)
+    _build_toxicity()
+        Рассчитывает коэффициент токсичности и список токсичных постов
+    _get_sample_size()
+        Определяет размер выборки для крупных аккаунтов
+    _get_toxicity_coefficient(texts, toxic_posts, sample)
         Определяет коэффициент токсичности
-    get_user_subscriptions()
-        Возвращает список подписок пользователя на других пользователей
-    get_group_subscriptions()
-        Возвращает список подписок пользователя на сообщества
+    get_user_subscriptions(after)
+        Возвращает страницу подписок пользователя на других пользователей
+    get_group_subscriptions(after)
+        Возвращает страницу подписок пользователя на сообщества
+    _get_page(kind, after)
+        Возвращает страницу списка подписок по курсору
     create_activity_graph(link_to_save_graph)
         Создание графика активности пользователя
+    get_activity_graph_html()
+        Возвращает HTML графика активности пользователя (через кэш)
 
     """
 
-    def __init__(self, link: str):
+    LARGE_ACCOUNT_THRESHOLD = 1000
+    SAMPLE_SIZE = 30
+    SUBSCRIPTIONS_PAGE_SIZE = 20
+    COMMUNITY_COLORS = ('#e6194b', '#3cb44b', '#ffe119', '#4363d8', '#f58231',
+                        '#911eb4', '#42d4f4', '#f032e6', '#bfef45', '#fabed4')
+
+    def __init__(self, link: str, vk: Optional[Vk] = None, user_info: Optional[UserInfo] = None):
         """
         Инициализирует объект Visualization для визуализации данных VK
 
@@ -56,15 +89,21 @@ class Visualization:
         ----------
         link : str
             Ссылка на профиль пользователя во ВКонтакте
+        vk : Optional[Vk]
+            Объект доступа к API VK (по умолчанию создаётся новый)
+        user_info : Optional[UserInfo]
+            Уже полученные данные об аккаунте (по умолчанию запрашиваются по ссылке)
 
         """
         if not os.path.exists('vkapi/templates/vkapi/friends-graph.html'):
             open('vkapi/templates/vkapi/friends-graph.html', 'w').close()
 
-        self.vk = Vk(token=os.environ['VK_TOKEN'])
+        self.vk = vk or Vk(token=os.environ['VK_TOKEN'])
+        self.cache = get_cache()
         self.link = link
-        self.user_info = self.vk.get_info(link)
-        self.vk_mutual_friends_info = None
+        self.user_info = user_info or self.vk.get_info(link)
+        self.friend_graph = None
+        self.__positions: Dict[str, Dict[int, int]] = {}
         self.mutual_graph = Network(height='590px', width='980px', bgcolor='#222222', font_color='white')
 
     def create_mutual_friends_graph(self, link_to_save_graph: str) -> None:
@@ -77,45 +116,109 @@ class Visualization:
             Ссылка, по которой будет сохранен граф
 
         """
-        self.vk_mutual_friends_info = self.vk.get_common_connections(self.link)
+        with open(link_to_save_graph, 'w') as f:
+            f.write(self.get_mutual_friends_graph_html())
+
+    def get_mutual_friends_graph_html(self) -> str:
+        """
+        Возвращает HTML визуализации сети общих друзей пользователя
+        из общего кэша, строя её при отсутствии
+
+        Returns
+        -------
+        str
+            HTML-документ с графом
+
+        """
+        return self.cache.get_or_set(f'mutual_graph:{self.user_info["id"]}', self._build_mutual_friends_graph)
+
+    def _build_mutual_friends_graph(self) -> str:
+        """
+        Строит визуализацию сети общих друзей пользователя
+
+        Returns
+        -------
+        str
+            HTML-документ с графом
+
+        """
+        self.friend_graph = self.vk.get_friend_graph(self.link)
+
+        # Укладка рассчитывается на сервере, физика в браузере отключается
+        self.mutual_graph.toggle_physics(False)
+        self.mutual_graph.options.edges.smooth.enabled = False
 
         self.mutual_graph.add_node(n_id=-1,
                                    label=f'{self.user_info["first_name"]} {self.user_info["last_name"]}',
                                    shape='circularImage',
-                                   image=self.user_info['icon'], font={'size': 10}, size=25)
-
-        if self.vk_mutual_friends_info is None:
-            self.mutual_graph.save_graph(link_to_save_graph)
-            return
-
-        cur_id = 0
-        id_dict = dict()
-        for friend_info in self.vk_mutual_friends_info:
-            self.mutual_graph.add_node(n_id=cur_id,
-                                       label=f'{friend_info[0].get("first_name")} {friend_info[0].get("last_name")}',
+                                   image=self.user_info['icon'], font={'size': 10}, size=25,
+                                   x=0, y=0, physics=False)
+
+        if self.friend_graph is None:
+            return self.mutual_graph.generate_html()
+
+        version = graph_version(self.friend_graph)
+        positions = self.cache.get_or_set(f'layout:{version}', lambda: force_layout(self.friend_graph))
+        analytics = self.get_graph_analytics()
+        max_betweenness = max(analytics['betweenness'], default=0) or 1
+        bridges = set(analytics['bridges'])
+
+        friends = {friend['id']: friend for friend in self.vk.get_users_list_info(self.friend_graph.ids.tolist())}
+        for i, friend_id in enumerate(self.friend_graph.ids.tolist()):
+            friend = friends.get(friend_id, {})
+            community = analytics['communities'][i]
+            color = self.COMMUNITY_COLORS[community] if community < len(self.COMMUNITY_COLORS) else '#888888'
+            title = (f'Сообщество: {community + 1}\n'
+                     f'Связей среди друзей: {analytics["degree"][i]}\n'
+                     f'Посредничество: {round(analytics["betweenness"][i], 4)}')
+            if i in bridges:
+                title += '\nМост между сообществами'
+            self.mutual_graph.add_node(n_id=i,
+                                       label=f'{friend.get("first_name")} {friend.get("last_name")}',
                                        shape='circularImage',
-                                       image=friend_info[0].get('icon'),
+                                       image=friend.get('icon'),
                                        font={'size': 10},
-                                       size=15)
-            friend_id = deepcopy(cur_id)
-            id_dict[friend_info[0].get('id')] = friend_id
-            self.mutual_graph.add_edge(-1, cur_id)
-            cur_id += 1
-
-        for friend_info in self.vk_mutual_friends_info:
-            if friend_info[1] is not None:
-                for friend_friend in friend_info[1]:
-                    self.mutual_graph.add_edge(
-                        id_dict[friend_friend.get('id')],
-                        id_dict[friend_info[0].get('id')]
-                    )
-
-        # saving graph
-        self.mutual_graph.save_graph(link_to_save_graph)
+                                       size=10 + 20 * analytics['betweenness'][i] / max_betweenness,
+                                       color={'border': '#ffffff' if i in bridges else color, 'background': color},
+                                       borderWidth=5 if i in bridges else 3,
+                                       title=title,
+                                       x=float(positions[i, 0]),
+                                       y=float(positions[i, 1]),
+                                       physics=False)
+
+        # Рёбра графа FriendGraph уникальны, поэтому добавляются напрямую,
+        # минуя квадратичную проверку на дубликаты в Network.add_edge
+        sources, targets = self.friend_graph.edges()
+        self.mutual_graph.edges += [{'from': -1, 'to': i} for i in range(len(self.friend_graph))]
+        self.mutual_graph.edges += [{'from': int(source), 'to': int(target)}
+                                    for source, target in zip(sources, targets)]
+
+        return self.mutual_graph.generate_html()
+
+    def get_graph_analytics(self) -> GraphAnalytics | None:
+        """
+        Рассчитывает показатели графа дружеских связей пользователя
+        (сообщества, центральность, друзей-мостов). Результат кэшируется
+        по версии графа
+
+        Returns
+        -------
+        GraphAnalytics | None
+            Показатели графа или None, если список друзей скрыт
+
+        """
+        if self.friend_graph is None:
+            self.friend_graph = self.vk.get_friend_graph(self.link)
+            if self.friend_graph is None:
+                return
+
+        return self.cache.get_or_set(f'analytics:{graph_version(self.friend_graph)}',
+                                     lambda: analyse_graph(self.friend_graph))
 
     def get_toxicity(self) -> Tuple[str, Union[List[str], None], List[str]]:
         """
         Определяет коэффициент токсичности и возвращает список токсичных постов пользователя
+        из общего кэша, рассчитывая их при отсутствии
 
         Returns
         -------
@@ -124,18 +227,60 @@ class Visualization:
             список токсичных постов. Если у пользователя нет постов или
             ограничен доступ, возвращается соответствующее сообщение и пустой список
 
+        """
+        return self.cache.get_or_set(f'toxicity:{self.user_info["id"]}', self._build_toxicity)
+
+    def _build_toxicity(self) -> Tuple[str, Union[List[str], None], List[str]]:
+        """
+        Рассчитывает коэффициент токсичности и список токсичных постов пользователя.
+        Для крупных аккаунтов анализ ведётся по выборке стен
+
+        Returns
+        -------
+        Tuple[str, List[str]]
+            Кортеж, содержащий коэффициент токсичности в виде строки и
+            список токсичных постов
+
         """
         try:
-            toxic_posts = self.vk.check_toxicity(self.user_info)
-            toxicity_coeff = self._get_toxicity_coefficient()
+            sample = self._get_sample_size()
+            # тексты собираются один раз: и список токсичных постов, и коэффициент считаются по ним
+            texts = self.vk.get_activity(self.user_info, times=False, sample=sample)
+            toxic_posts = check_obscene_vocabulary(texts)
+            toxicity_coeff = self._get_toxicity_coefficient(texts, toxic_posts, sample=sample)
             all_posts = self.user_info.get('post_dates')
             return toxicity_coeff, all_posts, toxic_posts
         except TypeError:
             return 'У пользователя нет постов или он ограничил доступ к своим записям', [], []
 
-    def _get_toxicity_coefficient(self) -> str:
+    def _get_sample_size(self) -> Optional[int]:
         """
-        Рассчитывает коэффициент токсичности постов пользователя
+        Определяет, нужно ли анализировать аккаунт по выборке
+
+        Returns
+        -------
+        Optional[int]
+            Количество стен в выборке или None для полного анализа
+
+        """
+        size = (self.user_info.get('friends_count') or 0) + (self.user_info.get('followers_count') or 0)
+        return self.SAMPLE_SIZE if size > self.LARGE_ACCOUNT_THRESHOLD else None
+
+    def _get_toxicity_coefficient(self, texts: List[Tuple[str, str]], toxic_posts: List[Optional[str]],
+                                  sample: Optional[int] = None) -> str:
+        """
+        Рассчитывает коэффициент токсичности постов пользователя.
+        В режиме выборки коэффициент - доля токсичных текстов в выборке
+        с 95% доверительным интервалом Уилсона
+
+        Parameters
+        ----------
+        texts : List[Tuple[str, str]]
+            Тексты постов и комментариев пользователя со ссылками на них
+        toxic_posts : List[Optional[str]]
+            Ссылки на тексты с нецензурной лексикой
+        sample : Optional[int]
+            Количество стен в выборке (режим выборочного анализа)
 
         Returns
         -------
@@ -143,53 +288,108 @@ class Visualization:
             Строка с коэффициентом токсичности или сообщением об отсутствии доступных постов
 
         """
+        if sample:
+            if not texts:
+                return 'У пользователя нет постов или он ограничил доступ к своим записям'
+            toxic = len(toxic_posts)
+            low, high = wilson_interval(toxic, len(texts))
+            return f'{round(toxic / len(texts), 2)} (95% ДИ: {round(low, 2)}–{round(high, 2)}, по выборке)'
+
         all_posts = self.vk.get_activity(self.user_info, times=True)
 
         if all_posts is None or len(all_posts) == 0:
             return 'У пользователя нет постов или он ограничил доступ к своим записям'
 
-        return str(round((len(self.vk.check_toxicity(self.user_info)) /
-                          len(all_posts)), 2))
+        return str(round(len(toxic_posts) / len(all_posts), 2))
 
-    def get_user_subscriptions(self) -> List[UserInfo]:
+    def get_user_subscriptions(self, after: Optional[int] = None) -> Tuple[List[UserInfo], Optional[int]]:
         """
-        Возвращает список подписок пользователя на других пользователей (не более пяти)
+        Возвращает страницу подписок пользователя на других пользователей.
+        Данные запрашиваются только для ID на странице
+
+        Parameters
+        ----------
+        after: Optional[int]
+            ID последнего пользователя предыдущей страницы
 
         Returns
         -------
-        List[UserInfo]
-            Список объектов с информацией о пользователях, на которых подписан исследуемый пользователь
+        Tuple[List[UserInfo], Optional[int]]
+            Список объектов с информацией о пользователях, на которых подписан
+            исследуемый пользователь, и курсор следующей страницы (None, если страница последняя)
+
+        Raises
+        ------
+        ValueError
+            Если пользователя after нет в списке подписок
 
         """
-        subscriptions = self.user_info.get('subscriptions')
-        user_subscriptions = subscriptions.get('users')
+        page, cursor = self._get_page('users', after)
+        return self.vk.get_users_list_info(page), cursor
 
-        if user_subscriptions is not None:
-            if len(user_subscriptions) > 5:
-                user_subscriptions = user_subscriptions[:5]
-            return self.vk.get_users_list_info(user_subscriptions)
+    def get_group_subscriptions(self, after: Optional[int] = None) -> Tuple[List[GroupInfo], Optional[int]]:
+        """
+        Возвращает страницу подписок пользователя на группы.
+        Данные запрашиваются только для ID на странице
+
+        Parameters
+        ----------
+        after: Optional[int]
+            ID последней группы предыдущей страницы
+
+        Returns
+        -------
+        Tuple[List[GroupInfo], Optional[int]]
+            Список объектов с информацией о группах, на которые подписан
+            исследуемый пользователь, и курсор следующей страницы (None, если страница последняя)
 
-        return []
+        Raises
+        ------
+        ValueError
+            Если группы after нет в списке подписок
 
-    def get_group_subscriptions(self) -> List[GroupInfo]:
         """
-        Возвращает список подписок пользователя на группы (не более пяти)
+        page, cursor = self._get_page('groups', after)
+        return self.vk.get_groups_list_info(page), cursor
+
+    def _get_page(self, kind: str, after: Optional[int]) -> Tuple[List[int], Optional[int]]:
+        """
+        Возвращает страницу списка подписок (в порядке VK), следующую за ID after.
+        Курсором служит сам ID, поэтому появление новых подписок в начале
+        списка не сдвигает страницы. Позиции ID в списке вычисляются
+        один раз для объекта
+
+        Parameters
+        ----------
+        kind: str
+            Вид подписок: users или groups
+        after: Optional[int]
+            ID последнего элемента предыдущей страницы
 
         Returns
         -------
-        List[GroupInfo]
-            Список объектов с информацией о группах, на которые подписан исследуемый пользователь
+        Tuple[List[int], Optional[int]]
+            ID на странице и курсор следующей страницы
+
+        Raises
+        ------
+        ValueError
+            Если ID after нет в списке (например, подписка была отменена)
 
         """
-        subscriptions = self.user_info.get('subscriptions')
-        group_subscriptions = subscriptions.get('groups')
+        ids = (self.user_info.get('subscriptions') or {}).get(kind) or []
+        if kind not in self.__positions:
+            self.__positions[kind] = {_id: position for position, _id in enumerate(ids)}
 
-        if group_subscriptions is not None:
-            if len(group_subscriptions) > 5:
-                group_subscriptions = group_subscriptions[:5]
-            return self.vk.get_groups_list_info(group_subscriptions)
+        start = 0
+        if after is not None:
+            if after not in self.__positions[kind]:
+                raise ValueError(after)
+            start = self.__positions[kind][after] + 1
 
-        return []
+        page = ids[start:start + self.SUBSCRIPTIONS_PAGE_SIZE]
+        has_next = start + self.SUBSCRIPTIONS_PAGE_SIZE < len(ids)
+        return page, page[-1] if has_next else None
 
     def create_activity_graph(self, link_to_save_graph: str) -> None:
         """
@@ -201,8 +401,41 @@ class Visualization:
             Ссылка, по которой будет сохранен HTML-файл с графиком
 
         """
-        # Загрузка данных активности пользователя
-        post_dates_raw = self.vk.get_activity(self.user_info, times=True)
+        with open(link_to_save_graph, 'w') as f:
+            f.write(self.get_activity_graph_html())
+
+    def get_activity_graph_html(self) -> str:
+        """
+        Возвращает HTML графика активности пользователя
+        из общего кэша, строя его при отсутствии
+
+        Returns
+        -------
+        str
+            HTML-документ с графиком
+
+        """
+        return self.cache.get_or_set(f'activity_graph:{self.user_info["id"]}', self._build_activity_graph)
+
+    def _build_activity_graph(self) -> str:
+        """
+        Строит интерактивный график активности пользователя
+
+        Returns
+        -------
+        str
+            HTML-документ с графиком (библиотека plotly.js подключается с CDN)
+
+        """
+        # Загрузка данных активности пользователя (для крупных аккаунтов - по выборке)
+        sample = self._get_sample_size()
+        title = 'График активности'
+        if sample:
+            post_dates_raw, rate = self.vk.sample_activity(self.user_info, sample=sample, times=True)
+            title += (f' (по выборке; ≈{round(rate["value"], 2)} публикаций в сутки, '
+                      f'95% ДИ: {round(rate["low"], 2)}–{round(rate["high"], 2)})')
+        else:
+            post_dates_raw = self.vk.get_activity(self.user_info, times=True)
 
         # Преобразование дат в формат даты
         post_dates = pd.to_datetime(post_dates_raw).date
@@ -239,7 +472,7 @@ class Visualization:
 
         # Задание заголовка графика
         fig.update_layout(
-            title_text='График активности'
+            title_text=title
         )
 
         # Добавление ползунка выбора диапазона
@@ -261,5 +494,4 @@ class Visualization:
             )
         )
 
-        # Сохранение графика в HTML-файл по указанному пути
-        fig.write_html(link_to_save_graph)
+        return fig.to_html(include_plotlyjs='cdn')
@@ -1,18 +1,32 @@
 """Класс, отвечающий за доступ к VK API"""
 
 from typing import List, Optional, Tuple, Dict
-from json import dump, load
-from random import shuffle
+from json import dump, dumps, load
+from random import shuffle, Random
 from datetime import datetime
 from time import time
-import re
+from hashlib import sha1
 
-import vk_api
+import numpy as np
+from requests import Session
 from vk_api.exceptions import ApiError
 
 from .toxicity_check import check_obscene_vocabulary
 from .gigachat_tools import check_acquaintances, get_written_squeeze
-from .vk_tools_models import UserInfo, University, Subscriptions, GroupInfo
+from .vk_tools_models import UserInfo, University, Subscriptions, GroupInfo, Estimate, CompactUserInfo, \
+    FriendOverlap, FriendDemographics
+from .crawl_budget import CrawlBudget
+from .cache import get_cache
+from .single_flight import single_flight
+from .refresh import schedule_refresh
+from .snapshots import save_snapshot, load_snapshot, snapshot_max_age
+from .link_resolver import LinkResolver
+from .rate_limit import RateLimitedVkApi, priority, BACKGROUND
+from .friend_graph import FriendGraph
+from .hyperloglog import HyperLogLog
+from .friend_overlap import overlap_matrix
+from .demographics import friends_frame, aggregate_demographics
+from .sampling import stratified_sample, stratified_total
 
 
 class Vk:
@@ -23,29 +37,69 @@ class Vk:
     ----------
     __vk: VkApiMethod
         Объект для доступа к методам VkAPI
+    __cache: BaseCache
+        Общий для рабочих процессов кэш ответов VK API
+    __resolver: LinkResolver
+        Определение ID пользователей по ссылкам
+    SAMPLE_POSTS_PER_WALL: int
+        Количество постов, выбираемых на каждой стене в режиме выборки
+    USERS_GET_BATCH: int
+        Максимальное количество ID в одном вызове users.get
+    GROUPS_GET_BATCH: int
+        Максимальное количество ID в одном вызове groups.getById
+    EXECUTE_BATCH: int
+        Максимальное количество вызовов API в одном execute
+    MUTUAL_TARGETS_BATCH: int
+        Максимальное количество друзей в одном вызове friends.getMutual
+    STALE_TIMEOUT: int
+        Срок, в течение которого устаревшие данные об аккаунте отдаются до обновления
+    WATCH_POSTS: int
+        Количество последних записей на стене, сравниваемых при синхронизации
+    COMPARE_MAX_LINKS: int
+        Максимальное количество пользователей в одном сравнении списков друзей
 
     Methods
     -------
     get_id_from_link(link)
         Получение ID пользователя по ссылке
+    resolve_links(links)
+        Получение ID пользователей по списку ссылок
     convert_time(times)
         Преобразование формата моментов времени
-    get_info(link)
+    get_info(link, compact)
         Получение информации об аккаунте
+    prefetch_info(links, budget)
+        Фоновое обновление устаревшей информации о нескольких аккаунтах
     get_info_short(link)
         Получение краткой информации об аккаунте
     get_users_list_info(users_ids_list)
         Получение краткой информации о нескольких аккаунтах
     get_groups_list_info(groups_ids_list)
         Получение краткой информации о нескольких сообществах
-    get_activity(user_data, count, time_limit, times)
+    get_friends_demographics(link)
+        Получение распределений друзей по странам, городам, годам рождения и университетам
+    get_activity(user_data, budget, time_limit, times, sample, seed)
         Получение данных об активности аккаунта
-    check_toxicity(user_data)
+    sample_activity(user_data, sample, time_limit, times, seed)
+        Выборочная оценка активности аккаунта с доверительным интервалом
+    check_toxicity(user_data, sample)
         Анализ публикация аккаунта на ненормативную лексику
     get_mutual_friends(*links)
         Получение информации об общих друзьях нескольких пользователей
+    compare_friends(*links)
+        Попарное сравнение полных списков друзей нескольких пользователей
     get_common_connections(link)
         Получение информации о друзьях пользователя и связях между ними
+    get_friend_graph(link)
+        Получение графа связей между всеми друзьями пользователя
+    get_two_hop_sketch(link)
+        Получение скетча HyperLogLog друзей и друзей друзей
+    estimate_two_hop_reach(link)
+        Оценка количества друзей и друзей друзей пользователя
+    get_counters(ids)
+        Получение счётчиков нескольких аккаунтов
+    get_profile_sections(_id, sections)
+        Получение актуальных списков друзей, подписок и записей аккаунта
     analyse_acquaintances(user_info, count, country, city)
         Поиск потенциальных знакомств для данного пользователя
     __dump_big_users_data(k)
@@ -53,7 +107,16 @@ class Vk:
 
     """
 
-    def __init__(self, token: str) -> None:
+    SAMPLE_POSTS_PER_WALL = 5
+    USERS_GET_BATCH = 1000
+    GROUPS_GET_BATCH = 500
+    EXECUTE_BATCH = 25
+    MUTUAL_TARGETS_BATCH = 100
+    STALE_TIMEOUT = 7 * 24 * 60 * 60
+    WATCH_POSTS = 100
+    COMPARE_MAX_LINKS = 50
+
+    def __init__(self, token: str, session: Optional[Session] = None) -> None:
         """
         Инициализация токена VK
 
@@ -61,9 +124,14 @@ class Vk:
         ----------
         token: str
             API-ключ VK
+        session: Optional[Session]
+            HTTP-сессия для запросов к API (например, FakeVkSession
+            для работы без доступа к VK), по умолчанию requests.Session
 
         """
-        self.__vk = vk_api.VkApi(token=token).get_api()
+        self.__vk = RateLimitedVkApi(token=token, session=session).get_api()
+        self.__cache = get_cache()
+        self.__resolver = LinkResolver(self.__vk, self.__cache, self.__execute)
 
     def get_id_from_link(self, link: str) -> int:
         """
@@ -85,28 +153,25 @@ class Vk:
             В случае некорректности ссылки на аккаунт
 
         """
-        id_reg_expression = (r'(^-?[\d]+)|(?:feed\?\w?=)?(?:wall|im\?sel='
-                             r'|id=*|photo|videos|albums|audios|topic)(-?'
-                             r'[\d]+)|(?:club|public)([\d]*)|(?<=\.com/)('
-                             r'[a-zA-Z\d._]*)')
-        find_results = re.findall(id_reg_expression, link)
-        id_or_name = None
-        if find_results:
-            try:
-                id_or_name = [el for el in find_results[0] if el]
-                user_id = int(id_or_name[0])
-            except ValueError:
-                try:
-                    resolved_name = self.__vk.utils.resolveScreenName(
-                        screen_name=id_or_name[0])
-                    user_id = int(resolved_name['object_id']) if resolved_name['type'] == 'user' else None
-                    if user_id is None:
-                        raise TypeError
-                except KeyError:
-                    raise TypeError
-            return user_id
-        else:
-            raise TypeError
+        return self.__resolver.resolve(link)
+
+    def resolve_links(self, links: List[str]) -> List[Optional[int]]:
+        """
+        Метод, возвращающий ID пользователей по списку ссылок.
+        Короткие имена разрешаются пакетами через execute и кэшируются
+
+        Parameters
+        ----------
+        links: List[str]
+            Ссылки на аккаунты VK
+
+        Returns
+        -------
+        List[Optional[int]]
+            ID пользователей (None для некорректных ссылок)
+
+        """
+        return self.__resolver.resolve_many(links)
 
     @staticmethod
     def convert_time(times: List[int]) -> List[str]:
@@ -131,23 +196,134 @@ class Vk:
             ).strftime('%Y-%m-%d %H:%M:%S') for item in times
         ]
 
-    def get_info(self, link: str) -> UserInfo:
+    def get_info(self, link: str, compact: bool = False) -> UserInfo | CompactUserInfo:
         """
         Метод для получения подробных сведений о пользователе
-        VK и возвращения словаря с ними
+        VK и возвращения словаря с ними. При отсутствии в кэше данные
+        берутся из последнего снимка в БД. Устаревшие (старше
+        VKAPI_SNAPSHOT_MAX_AGE, но не старше STALE_TIMEOUT) данные
+        возвращаются сразу, а их обновление ставится в фоновую очередь
 
         Parameters
         ----------
         link: str
             Ссылка на аккаунт VK
+        compact: bool
+            Вернуть компактное представление (списки ID в массивах int64),
+            используется пакетным анализом
 
         Returns
         -------
-        UserInfo
+        UserInfo | CompactUserInfo
             Словарь с данными об аккаунте VK
 
         """
         _id = self.get_id_from_link(link)
+        info = self.__cache.get(f'info:{_id}')
+        if info is None:
+            # значение могло появиться, пока вызов ждал такой же выполняющийся запрос
+            info = single_flight.do(('info', _id),
+                                    lambda: self.__cache.get(f'info:{_id}') or self.__load_info(_id))
+        elif self.__cache.get(f'info_fresh:{_id}') is None:
+            schedule_refresh(('info', _id), lambda: self.__refresh_info(_id))
+        return CompactUserInfo.from_dict(info) if compact else info
+
+    def prefetch_info(self, links: List[str], budget: Optional[int] = None) -> int:
+        """
+        Метод, ставящий в фоновую очередь обновление данных об аккаунтах,
+        которых нет в кэше или которые устарели (не больше budget аккаунтов,
+        в порядке списка)
+
+        Parameters
+        ----------
+        links: List[str]
+            Ссылки на аккаунты, начиная с самых важных
+        budget: Optional[int]
+            Максимальное количество обновляемых аккаунтов
+
+        Returns
+        -------
+        int
+            Количество поставленных в очередь обновлений
+
+        """
+        queued = 0
+        for _id in dict.fromkeys(_id for _id in self.resolve_links(links) if _id is not None):
+            if budget is not None and queued >= budget:
+                break
+            if self.__cache.get(f'info_fresh:{_id}') is None and schedule_refresh(
+                    ('info', _id), lambda _id=_id: self.__refresh_info(_id)):
+                queued += 1
+        return queued
+
+    def __load_info(self, _id: int) -> UserInfo:
+        """
+        Служебный метод, возвращающий данные об аккаунте из последнего
+        снимка в БД и переносящий их в кэш. Данные запрашиваются у VK,
+        если снимка нет или он старше STALE_TIMEOUT; снимок старше
+        VKAPI_SNAPSHOT_MAX_AGE возвращается, а обновление ставится в очередь
+
+        Parameters
+        ----------
+        _id: int
+            ID пользователя
+
+        Returns
+        -------
+        UserInfo
+            Словарь с данными об аккаунте VK
+
+        """
+        snapshot = load_snapshot(_id)
+        if snapshot is None or snapshot[1] >= self.STALE_TIMEOUT:
+            return self.__refresh_info(_id)
+
+        info, age = snapshot
+        self.__cache.set(f'info:{_id}', info, int(self.STALE_TIMEOUT - age))
+        if age < snapshot_max_age():
+            self.__cache.set(f'info_fresh:{_id}', True, int(snapshot_max_age() - age))
+        else:
+            schedule_refresh(('info', _id), lambda: self.__refresh_info(_id))
+        return info
+
+    def __refresh_info(self, _id: int) -> UserInfo:
+        """
+        Служебный метод, запрашивающий данные об аккаунте, сохраняющий
+        их новым снимком в БД и в кэше на STALE_TIMEOUT секунд
+        с отметкой свежести на VKAPI_SNAPSHOT_MAX_AGE секунд
+
+        Parameters
+        ----------
+        _id: int
+            ID пользователя
+
+        Returns
+        -------
+        UserInfo
+            Словарь с данными об аккаунте VK
+
+        """
+        info = self.__fetch_info(_id)
+        save_snapshot(info)
+        self.__cache.set(f'info:{_id}', info, self.STALE_TIMEOUT)
+        self.__cache.set(f'info_fresh:{_id}', True, snapshot_max_age())
+        return info
+
+    def __fetch_info(self, _id: int) -> UserInfo:
+        """
+        Служебный метод, запрашивающий у VK API подробные сведения о пользователе
+
+        Parameters
+        ----------
+        _id: int
+            ID пользователя
+
+        Returns
+        -------
+        UserInfo
+            Словарь с данными об аккаунте VK
+
+        """
         raw_dict = self.__vk.users.get(user_id=_id, fields='first_name, last_name, bdate, '
                                                            'country, city, activities, '
                                                            'books, education, games, '
@@ -244,7 +420,10 @@ class Vk:
         if not users_ids_list:
             return []
 
-        raw = self.__vk.users.get(user_ids=users_ids_list, fields='first_name, last_name, photo_50')
+        raw = []
+        for start in range(0, len(users_ids_list), self.USERS_GET_BATCH):
+            raw += self.__vk.users.get(user_ids=list(users_ids_list[start:start + self.USERS_GET_BATCH]),
+                                       fields='first_name, last_name, photo_50')
         list_of_user_info = []
 
         for raw_user in raw:
@@ -274,7 +453,10 @@ class Vk:
         """
         if not groups_ids_list:
             return []
-        raw = self.__vk.groups.getById(group_ids=groups_ids_list)
+
+        raw = []
+        for start in range(0, len(groups_ids_list), self.GROUPS_GET_BATCH):
+            raw += self.__vk.groups.getById(group_ids=list(groups_ids_list[start:start + self.GROUPS_GET_BATCH]))
         list_of_group_info = []
 
         for group in raw:
@@ -287,8 +469,44 @@ class Vk:
 
         return list_of_group_info
 
-    def get_activity(self, user_data: UserInfo, count: Tuple[int] = (5, 5, 5), time_limit: int = 2629743,
-                     times: bool = True) -> List[str] | List[Tuple[str, str]] | None:
+    def get_friends_demographics(self, link: str) -> FriendDemographics | None:
+        """
+        Метод, возвращающий распределения друзей пользователя по странам,
+        городам, годам рождения и университетам. Данные о друзьях
+        запрашиваются через users.get (по USERS_GET_BATCH ID за вызов),
+        результат кэшируется для каждого снимка списка друзей
+
+        Parameters
+        ----------
+        link: str
+            Ссылка на аккаунт
+
+        Returns
+        -------
+        FriendDemographics | None
+            Распределения или None, если список друзей скрыт
+
+        """
+        try:
+            _id = self.get_id_from_link(link)
+            friends = self.__get_friends(_id)
+        except ApiError:
+            return
+
+        snapshot = sha1(np.sort(np.asarray(friends, dtype=np.int64)).tobytes()).hexdigest()
+
+        def build() -> FriendDemographics:
+            raw = []
+            for start in range(0, len(friends), self.USERS_GET_BATCH):
+                raw += self.__vk.users.get(user_ids=list(friends[start:start + self.USERS_GET_BATCH]),
+                                           fields='city, country, bdate, education')
+            return aggregate_demographics(friends_frame(raw))
+
+        return self.__cache.get_or_set(f'demographics:{_id}:{snapshot}', build)
+
+    def get_activity(self, user_data: UserInfo, budget: int = 100, time_limit: int = 2629743,
+                     times: bool = True, sample: Optional[int] = None,
+                     seed: Optional[int] = None) -> List[str] | List[Tuple[str, str]] | None:
         """
         Метод, принимающих словарь с данными о пользователе и
         возвращающий список с датами и временами публикаций постов
@@ -296,18 +514,27 @@ class Vk:
         друзей, пользователей или групп, на которые он подписан,
         если times = True, и список текстов этих постов в противном случае.
         Рассматриваются посты, выложенные не ранее, чем за
-        time_limit секунд дл текущего момента
+        time_limit секунд дл текущего момента.
+        Стены обходятся в порядке убывания доли найденных на них
+        комментариев пользователя, пока не будет исчерпан бюджет вызовов API.
+        Если передан размер выборки sample, вместо этого обходится
+        случайная стратифицированная выборка стен (см. sample_activity).
+        Одновременные одинаковые обходы в процессе объединяются в один
 
         Parameters
         ----------
         user_data: UserInfo
             Данные об аккаунте VK
-        count: Tuple[int]
-            Ограничители количества ссылок
+        budget: int
+            Допустимое количество вызовов wall.get и wall.getComments
         time_limit: int
             Ограничитель возраста рассматриваемых постов
         times: bool
             Режим работы (моменты времени или тексты для анализа токсичности)
+        sample: Optional[int]
+            Количество стен в выборке (режим выборочного анализа)
+        seed: Optional[int]
+            Зерно генератора случайных чисел для выборки
 
         Returns
         -------
@@ -315,35 +542,177 @@ class Vk:
             Список с моментами времени или с кортежами текстов и ссылок на посты
 
         """
+        def crawl() -> List[str] | List[Tuple[str, str]] | None:
+            if sample:
+                return self.sample_activity(user_data, sample, time_limit, times, seed)[0]
+
+            result = self.__crawl_walls(user_data, budget, time_limit, times)
+            return self.__complete_activity(user_data, result, times)
+
+        return single_flight.do(('activity', user_data['id'], budget, time_limit, times, sample, seed), crawl)
+
+    def sample_activity(self, user_data: UserInfo, sample: int = 30, time_limit: int = 2629743,
+                        times: bool = True, seed: Optional[int] = None
+                        ) -> Tuple[List[str] | List[Tuple[str, str]] | None, Estimate]:
+        """
+        Метод выборочного анализа активности для аккаунтов с большим
+        числом друзей и подписок. Из стен пользователя, друзей, пользователей
+        и сообществ из подписок (страты) извлекается случайная стратифицированная
+        выборка, на каждой стене - случайная выборка постов с комментариями.
+        Количество вызовов API ограничено sample * (SAMPLE_POSTS_PER_WALL + 1)
+        независимо от размера аккаунта
+
+        Parameters
+        ----------
+        user_data: UserInfo
+            Данные об аккаунте VK
+        sample: int
+            Количество стен в выборке
+        time_limit: int
+            Ограничитель возраста рассматриваемых постов
+        times: bool
+            Режим работы (моменты времени или тексты для анализа токсичности)
+        seed: Optional[int]
+            Зерно генератора случайных чисел (по умолчанию ID пользователя,
+            чтобы повторные вызовы для одного аккаунта видели одну выборку)
+
+        Returns
+        -------
+        Tuple[List[str] | List[Tuple[str, str]] | None, Estimate]
+            Найденные в выборке публикации (в формате get_activity) и оценка
+            активности пользователя - числа постов и комментариев в сутки
+
+        """
+        rng = Random(user_data['id'] if seed is None else seed)
+        subscriptions = user_data.get('subscriptions') or {}
+        strata = {
+            'own': [user_data['id']],
+            'friends': list(user_data.get('friends') or []),
+            'users': list(subscriptions.get('users') or []),
+            'groups': [-group for group in subscriptions.get('groups') or []]
+        }
+
         result = set()
-        objects = user_data['friends'][:count[0]] if (
-                user_data['friends'] is not None) else (
-                [] + [user_data['id']] + user_data['subscriptions']['users'][:count[1]]) if (
-                user_data['subscriptions']['users'] is not None) \
-            else [] + list(map(lambda x: -x, user_data['subscriptions']['groups'][:count[2]])) \
-            if user_data['subscriptions']['groups'] is not None else []
-
-        for account in objects:
+        observations = {name: [] for name in strata}
+
+        for name, accounts in stratified_sample(strata, sample, rng).items():
+            for account in accounts:
+                try:
+                    posts = [post for post in self.__vk.wall.get(owner_id=account, count=100)['items']
+                             if post['date'] >= time() - time_limit and post['comments']['count']]
+                except ApiError:
+                    continue
+                sampled_posts = rng.sample(posts, min(len(posts), self.SAMPLE_POSTS_PER_WALL))
+                hits = 0
+                for post in sampled_posts:
+                    try:
+                        comments = self.__vk.wall.getComments(owner_id=account, post_id=post['id'], count=100)
+                    except ApiError:
+                        continue
+                    for comment in comments['items']:
+                        if comment['from_id'] == user_data['id']:
+                            hits += 1
+                            if times:
+                                result.add(comment['date'])
+                            else:
+                                result.add((comment['text'], f'https://vk.com/wall{account}_{post["id"]}'))
+                observations[name].append(len(posts) * hits / len(sampled_posts) if sampled_posts else 0)
+
+        comments = stratified_total(observations, {name: len(accounts) for name, accounts in strata.items()})
+        own_posts = len([date for date in user_data.get('post_dates') or [] if date >= time() - time_limit])
+        days = time_limit / 86400
+        rate = Estimate(
+            value=(comments['value'] + own_posts) / days,
+            low=(comments['low'] + own_posts) / days,
+            high=(comments['high'] + own_posts) / days,
+            sample_size=comments['sample_size']
+        )
+
+        return self.__complete_activity(user_data, result, times), rate
+
+    def __crawl_walls(self, user_data: UserInfo, budget: int, time_limit: int, times: bool) -> set:
+        """
+        Служебный метод обхода стен в пределах бюджета вызовов API
+
+        Parameters
+        ----------
+        user_data: UserInfo
+            Данные об аккаунте VK
+        budget: int
+            Допустимое количество вызовов wall.get и wall.getComments
+        time_limit: int
+            Ограничитель возраста рассматриваемых постов
+        times: bool
+            Режим работы (моменты времени или тексты для анализа токсичности)
+
+        Returns
+        -------
+        set
+            Множество моментов времени или кортежей текстов и ссылок на комментарии
+
+        """
+        result = set()
+        subscriptions = user_data.get('subscriptions') or {}
+        candidates = ([user_data['id']] + list(user_data.get('friends') or []) +
+                      list(subscriptions.get('users') or []) +
+                      [-group for group in subscriptions.get('groups') or []])
+
+        crawl_budget = CrawlBudget(user_data['id'], budget)
+
+        for account in crawl_budget.rank(candidates):
+            if not crawl_budget.spend():
+                break
+            # вызов wall.get тоже учитывается: закрытая стена или стена
+            # без новых комментариев понижается в ранге как промах
+            calls, hits = 1, 0
             try:
                 posts = self.__vk.wall.get(owner_id=account, count=100)
                 for post in posts['items']:
                     if post['date'] < time() - time_limit:
                         break
                     if post['comments']['count']:
+                        if not crawl_budget.spend():
+                            break
+                        calls += 1
                         comments = self.__vk.wall.getComments(owner_id=account, post_id=post['id'], count=100)
                         for comment in comments['items']:
                             if comment['from_id'] == user_data['id']:
+                                hits += 1
                                 if times:
                                     result.add(comment['date'])
                                 else:
                                     result.add((comment['text'],
-                                                f'https://vk.com/wall{user_data["id"]}_{post["id"]}'))
+                                                f'https://vk.com/wall{account}_{post["id"]}'))
             except ApiError:
                 pass
+            crawl_budget.record(account, calls, hits)
+
+        return result
+
+    def __complete_activity(self, user_data: UserInfo, result: set,
+                            times: bool) -> List[str] | List[Tuple[str, str]] | None:
+        """
+        Служебный метод, дополняющий найденные комментарии
+        собственными постами пользователя
 
+        Parameters
+        ----------
+        user_data: UserInfo
+            Данные об аккаунте VK
+        result: set
+            Найденные комментарии
+        times: bool
+            Режим работы (моменты времени или тексты для анализа токсичности)
+
+        Returns
+        -------
+        List[str] | List[Tuple[str]] | None
+            Список с моментами времени или с кортежами текстов и ссылок на посты
+
+        """
         if times:
             if user_data['post_dates'] is not None:
-                return self.convert_time(sorted(list(result) + user_data['post_dates']))
+                return self.convert_time(sorted(list(result) + list(user_data['post_dates'])))
             return list(result)
 
         try:
@@ -354,7 +723,7 @@ class Vk:
         except ApiError:
             return
 
-    def check_toxicity(self, user_data: UserInfo) -> List[Optional[str]]:
+    def check_toxicity(self, user_data: UserInfo, sample: Optional[int] = None) -> List[Optional[str]]:
         """
         Метод, проверяющий массив постов и комментариев пользователя
         на предмет наличия нецензурной и оскорбительной лексики
@@ -364,6 +733,8 @@ class Vk:
         ----------
         user_data: UserInfo
             Данные об аккаунте VK
+        sample: Optional[int]
+            Количество стен в выборке (режим выборочного анализа)
 
         Returns
         -------
@@ -371,7 +742,7 @@ class Vk:
             Список со ссылками на тексты с нецензурной лексикой
 
         """
-        return check_obscene_vocabulary(self.get_activity(user_data, times=False))
+        return check_obscene_vocabulary(self.get_activity(user_data, times=False, sample=sample))
 
     def get_mutual_friends(self, *links: Tuple[str] | str) -> List[UserInfo] | None:
         """
@@ -391,12 +762,14 @@ class Vk:
             Список объектов данных о пользователях\
 
         """
-        _ids = [self.get_id_from_link(link) for link in links]
+        _ids = self.resolve_links(list(links))
+        if None in _ids:
+            raise TypeError
         _friends_sets = []
 
         for _id in _ids:
             try:
-                friends = set(self.__vk.friends.get(user_id=_id, count=20)['items'])
+                friends = set(self.__get_friends(_id, count=20))
                 _friends_sets.append(friends)
             except ApiError:
                 return
@@ -404,11 +777,55 @@ class Vk:
         mutual_friends = set.intersection(*_friends_sets)
         return self.get_users_list_info(list(mutual_friends))
 
+    def compare_friends(self, *links: str) -> FriendOverlap:
+        """
+        Метод, попарно сравнивающий полные списки друзей нескольких
+        пользователей: количество общих друзей и коэффициент Жаккара.
+        Списки берутся из общего с другими методами кэша друзей;
+        скрытые профили не прерывают сравнение, а получают значения None
+
+        Parameters
+        ----------
+        links: str
+            Ссылки на пользователей
+
+        Returns
+        -------
+        FriendOverlap
+            Матрицы попарного сравнения списков друзей
+
+        """
+        _ids = self.resolve_links(list(links))
+        if None in _ids:
+            raise TypeError
+        friends = {}
+        for _id in set(_ids):
+            try:
+                friends[_id] = self.__get_friends(_id)
+            except ApiError:
+                friends[_id] = None
+
+        arrays = [None if friends[_id] is None else np.unique(np.asarray(friends[_id], dtype=np.int64))
+                  for _id in _ids]
+        intersection, jaccard = overlap_matrix(arrays)
+
+        def to_list(matrix: np.ndarray, cast: type) -> List[List]:
+            return [[None if np.isnan(value) else cast(value) for value in row] for row in matrix]
+
+        return FriendOverlap(
+            links=list(links),
+            ids=_ids,
+            friends_count=[None if array is None else len(array) for array in arrays],
+            intersection=to_list(intersection, int),
+            jaccard=to_list(jaccard, float)
+        )
+
     def get_common_connections(self, link: str) -> List[Tuple[UserInfo, Optional[List[UserInfo]]]] | None:
         """
         Метод, принимающий ссылку на пользователя
         и возвращающий список кортежей, где каждый кортеж содержит
         информацию о друге пользователя и список их общих друзей с переданным пользователем.
+        Строится по графу get_friend_graph для всего списка друзей
 
         Parameters
         ----------
@@ -420,21 +837,252 @@ class Vk:
         List[Tuple[UserInfo, Optional[List[UserInfo]]]] | None
             Список кортежей с информацией о связях между аккаунтами
 
+        """
+        graph = self.get_friend_graph(link)
+        if graph is None:
+            return
+
+        friends = {friend['id']: friend for friend in self.get_users_list_info(graph.ids.tolist())}
+        return [
+            (friends[friend_id], [friends[int(graph.ids[j])] for j in graph.neighbours(i)
+                                  if int(graph.ids[j]) in friends])
+            for i, friend_id in enumerate(graph.ids.tolist()) if friend_id in friends
+        ]
+
+    def get_friend_graph(self, link: str) -> FriendGraph | None:
+        """
+        Метод, возвращающий граф связей между всеми друзьями пользователя.
+        Общие друзья запрашиваются методом friends.getMutual по 100 друзей
+        за вызов, вызовы объединяются по 25 в один execute
+
+        Parameters
+        ----------
+        link: str
+            Ссылка на аккаунт
+
+        Returns
+        -------
+        FriendGraph | None
+            Граф дружеских связей или None, если список друзей скрыт
+            или запрос общих друзей завершился ошибкой
+
         """
         try:
             _id = self.get_id_from_link(link)
-            _friends = self.__vk.friends.get(user_id=_id, count=20)['items']
-            connections = []
+            friends = self.__get_friends(_id)
+        except ApiError:
+            return
 
-            for friend in self.get_users_list_info(_friends):
-                connections.append(
-                    (friend, self.get_mutual_friends(link, str(friend.get('id'))))
-                )
+        def build() -> FriendGraph:
+            sources, targets = [], []
+            chunks = [friends[i:i + self.MUTUAL_TARGETS_BATCH]
+                      for i in range(0, len(friends), self.MUTUAL_TARGETS_BATCH)]
+            responses = self.__execute('friends.getMutual', [
+                {'source_uid': _id, 'target_uids': ','.join(map(str, chunk))} for chunk in chunks
+            ])
+            for response in responses:
+                for item in response or []:
+                    common = item.get('common_friends') or []
+                    sources += [item['id']] * len(common)
+                    targets += common
+            return FriendGraph.from_edges(_id, friends, sources, targets)
 
-            return connections
+        try:
+            return self.__cache.get_or_set(f'friend_graph:{_id}', build)
         except ApiError:
             return
 
+    def get_two_hop_sketch(self, link: str) -> HyperLogLog | None:
+        """
+        Метод, возвращающий скетч HyperLogLog множества друзей и друзей
+        друзей пользователя (включая его самого). Скетч складывается
+        объединением скетчей списков друзей каждого друга, которые
+        кэшируются отдельно и переиспользуются для других пользователей
+        с общими друзьями; отсутствующие в кэше списки запрашиваются через
+        execute (по EXECUTE_BATCH списков за запрос), скрытые пропускаются.
+        Итоговый скетч (4 КБ) тоже кэшируется
+
+        Parameters
+        ----------
+        link: str
+            Ссылка на аккаунт
+
+        Returns
+        -------
+        HyperLogLog | None
+            Скетч или None, если список друзей скрыт
+
+        """
+        try:
+            _id = self.get_id_from_link(link)
+            friends = self.__get_friends(_id)
+        except ApiError:
+            return
+
+        def build() -> bytes:
+            sketch = HyperLogLog()
+            sketch.add(friends)
+            missing = []
+            for friend in friends:
+                cached = self.__cache.get(f'friends_sketch:{friend}')
+                if cached is None:
+                    missing.append(friend)
+                else:
+                    sketch.merge(HyperLogLog.from_bytes(cached))
+            responses = self.__execute('friends.get', [{'user_id': friend} for friend in missing])
+            for friend, response in zip(missing, responses):
+                if response:
+                    friend_sketch = HyperLogLog(sketch.precision)
+                    friend_sketch.add(response['items'])
+                    self.__cache.set(f'friends_sketch:{friend}', friend_sketch.to_bytes())
+                    sketch.merge(friend_sketch)
+            return sketch.to_bytes()
+
+        return HyperLogLog.from_bytes(self.__cache.get_or_set(f'two_hop_sketch:{_id}', build))
+
+    def estimate_two_hop_reach(self, link: str) -> Estimate | None:
+        """
+        Метод, оценивающий количество различных пользователей на расстоянии
+        не больше двух шагов (друзья и друзья друзей, включая самого
+        пользователя) с доверительным интервалом
+
+        Parameters
+        ----------
+        link: str
+            Ссылка на аккаунт
+
+        Returns
+        -------
+        Estimate | None
+            Оценка охвата или None, если список друзей скрыт
+
+        """
+        sketch = self.get_two_hop_sketch(link)
+        return None if sketch is None else sketch.estimate()
+
+    def get_counters(self, ids: List[int]) -> Dict[int, Optional[Dict[str, int]]]:
+        """
+        Метод, возвращающий счётчики нескольких аккаунтов VK (друзья,
+        подписки, записи на стене) - дешёвая проверка изменений перед
+        полной синхронизацией. VK возвращает counters только при запросе
+        одного пользователя, поэтому вызовы users.get и wall.get
+        объединяются через execute
+
+        Parameters
+        ----------
+        ids: List[int]
+            Список ID аккаунтов VK
+
+        Returns
+        -------
+        Dict[int, Optional[Dict[str, int]]]
+            Счётчики по ID аккаунта (None, если профиль закрыт или удалён)
+
+        """
+        users = self.__execute('users.get', [{'user_id': _id, 'fields': 'counters'} for _id in ids])
+        walls = self.__execute('wall.get', [{'owner_id': _id, 'count': 1} for _id in ids])
+
+        counters = {}
+        for _id, user, wall in zip(ids, users, walls):
+            if not user or 'counters' not in user[0] or not wall:
+                counters[_id] = None
+            else:
+                counters[_id] = {**user[0]['counters'], 'posts': wall['count']}
+        return counters
+
+    def get_profile_sections(self, _id: int, sections: List[str]) -> Dict[str, Optional[List[int]]]:
+        """
+        Метод, запрашивающий у VK API (минуя кэш) актуальные списки ID
+        разделов аккаунта: friends - друзья, subscriptions - подписки
+        (сообщества с отрицательными ID), activity - последние WATCH_POSTS
+        записей на стене. Каждый раздел стоит одного вызова API
+
+        Parameters
+        ----------
+        _id: int
+            ID пользователя
+        sections: List[str]
+            Запрашиваемые разделы
+
+        Returns
+        -------
+        Dict[str, Optional[List[int]]]
+            Списки ID по разделам (None, если раздел скрыт)
+
+        """
+        def subscriptions() -> List[int]:
+            subs = self.__vk.users.getSubscriptions(user_id=_id)
+            return subs['users']['items'] + [-group for group in subs['groups']['items']]
+
+        fetchers = {
+            'friends': lambda: self.__vk.friends.get(user_id=_id)['items'],
+            'subscriptions': subscriptions,
+            'activity': lambda: [post['id'] for post in
+                                 self.__vk.wall.get(owner_id=_id, count=self.WATCH_POSTS)['items']]
+        }
+
+        result = {}
+        for section in sections:
+            try:
+                result[section] = fetchers[section]()
+            except ApiError:
+                result[section] = None
+        return result
+
+    def __execute(self, method: str, params_list: List[Dict]) -> List:
+        """
+        Служебный метод, выполняющий несколько вызовов одного метода API
+        через execute (по EXECUTE_BATCH вызовов за запрос). Неудавшиеся
+        вызовы возвращаются как False
+
+        Parameters
+        ----------
+        method: str
+            Название метода API
+        params_list: List[Dict]
+            Параметры каждого вызова
+
+        Returns
+        -------
+        List
+            Ответы на вызовы в порядке params_list
+
+        """
+        results = []
+        for start in range(0, len(params_list), self.EXECUTE_BATCH):
+            calls = ','.join(f'API.{method}({dumps(params, ensure_ascii=False)})'
+                             for params in params_list[start:start + self.EXECUTE_BATCH])
+            results += self.__vk.execute(code=f'return [{calls}];')
+        return results
+
+    def __get_friends(self, _id: int, count: Optional[int] = None) -> List[int]:
+        """
+        Служебный метод, возвращающий список ID друзей пользователя
+        (в порядке hints) через кэш
+
+        Parameters
+        ----------
+        _id: int
+            ID пользователя
+        count: Optional[int]
+            Максимальное количество друзей
+
+        Returns
+        -------
+        List[int]
+            Список ID друзей
+
+        Raises
+        ------
+        ApiError
+            Если список друзей скрыт
+
+        """
+        return self.__cache.get_or_set(
+            f'friends:{_id}:{count}',
+            lambda: self.__vk.friends.get(user_id=_id, count=count, order='hints')['items']
+        )
+
     @staticmethod
     def analyse_acquaintances(user_info: UserInfo, count: int = 10, country: bool = True,
                               city: bool = True) -> List[Dict[str, str]]:
@@ -458,6 +1106,17 @@ class Vk:
         List[Dict[str, str]]
             Список словарей с короткой информацией о рекомендуемом аккаунте
 
+        """
+        return single_flight.do(('acquaintances', user_info.get('id'), count, country, city),
+                                lambda: Vk.__find_acquaintances(user_info, count, country, city))
+
+    @staticmethod
+    def __find_acquaintances(user_info: UserInfo, count: int, country: bool, city: bool) -> List[Dict[str, str]]:
+        """
+        Служебный метод, подбирающий по локальной базе аккаунтов
+        пользователей, рекомендуемых GigaChat для знакомства
+        (параметры - как у analyse_acquaintances)
+
         """
         with open('vkapi/data.json') as f:
             data = load(f)
@@ -476,7 +1135,7 @@ class Vk:
 
         check = set()
         shuffle(filter_data)
-        written_squeeze = get_written_squeeze(user_info)
+        written_squeeze = get_cache().get_or_set(f'summary:{user_info["id"]}', lambda: get_written_squeeze(user_info))
 
         for user in filter_data:
             if check_acquaintances(
@@ -513,7 +1172,8 @@ class Vk:
                             f'"fields": "city, country, interests"}});' for i in range(len(ind))])
         rs_vars = ''.join([f'{"a" * (i + 1)}+' for i in range(len(ind))])[:-1]
 
-        data = self.__vk.execute(code=f'{res_code}return {rs_vars};')
+        with priority(BACKGROUND):
+            data = self.__vk.execute(code=f'{res_code}return {rs_vars};')
 
         with open('data.json') as f:
             _json = load(f)
@@ -1,6 +1,8 @@
 """Модели словарей, связанных с информацией об аккаунтах ВК"""
 
-from typing import TypedDict, Optional, List
+from typing import TypedDict, Optional, List, Dict, Tuple, Any, Iterable, Iterator
+from collections.abc import Mapping
+from array import array
 
 
 class University(TypedDict, total=False):
@@ -134,3 +136,271 @@ class GroupInfo(TypedDict, total=False):
     name: str
     link: str
     photo: str
+
+
+class Estimate(TypedDict, total=False):
+    """
+    Словарь с выборочной оценкой показателя
+    и её доверительным интервалом
+
+    Attributes
+    ----------
+    value: float
+        Точечная оценка
+    low: float
+        Нижняя граница доверительного интервала
+    high: float
+        Верхняя граница доверительного интервала
+    sample_size: int
+        Размер выборки, по которой построена оценка
+
+    """
+
+    value: float
+    low: float
+    high: float
+    sample_size: int
+
+
+class GraphAnalytics(TypedDict, total=False):
+    """
+    Словарь с показателями графа дружеских связей
+    (списки упорядочены по плотным индексам друзей)
+
+    Attributes
+    ----------
+    communities: List[int]
+        Номер сообщества каждого друга (0 - самое крупное)
+    degree: List[int]
+        Количество связей каждого друга внутри графа
+    betweenness: List[float]
+        Центральность по посредничеству
+    participation: List[float]
+        Коэффициент участия (доля связей с другими сообществами)
+    bridges: List[int]
+        Индексы друзей-мостов между сообществами
+
+    """
+
+    communities: List[int]
+    degree: List[int]
+    betweenness: List[float]
+    participation: List[float]
+    bridges: List[int]
+
+
+class FriendOverlap(TypedDict, total=False):
+    """
+    Словарь с попарным сравнением списков друзей нескольких
+    пользователей (для скрытых профилей значения None)
+
+    Attributes
+    ----------
+    links: List[str]
+        Ссылки на аккаунты
+    ids: List[int]
+        ID пользователей
+    friends_count: List[Optional[int]]
+        Количество друзей каждого пользователя
+    intersection: List[List[Optional[int]]]
+        Количество общих друзей для каждой пары
+    jaccard: List[List[Optional[float]]]
+        Коэффициент Жаккара списков друзей для каждой пары
+
+    """
+
+    links: List[str]
+    ids: List[int]
+    friends_count: List[Optional[int]]
+    intersection: List[List[Optional[int]]]
+    jaccard: List[List[Optional[float]]]
+
+
+class FriendDemographics(TypedDict, total=False):
+    """
+    Словарь с распределениями друзей пользователя
+    по странам, городам, годам рождения и университетам
+
+    Attributes
+    ----------
+    total: int
+        Количество друзей
+    countries: List[Tuple[str, int]]
+        Самые частые страны и количество друзей из них
+    cities: List[Tuple[str, int]]
+        Самые частые города и количество друзей из них
+    birth_years: List[Tuple[int, int]]
+        Годы рождения (по возрастанию) и количество друзей
+    universities: List[Tuple[str, int]]
+        Самые частые университеты и количество друзей
+    filled: Dict[str, int]
+        Количество друзей, указавших каждое поле
+
+    """
+
+    total: int
+    countries: List[Tuple[str, int]]
+    cities: List[Tuple[str, int]]
+    birth_years: List[Tuple[int, int]]
+    universities: List[Tuple[str, int]]
+    filled: Dict[str, int]
+
+
+class ProfileReport(TypedDict, total=False):
+    """
+    Словарь с сохранёнными в кэше результатами анализа аккаунта
+    (отсутствующие в кэше разделы равны None)
+
+    Attributes
+    ----------
+    link: str
+        Ссылка на аккаунт
+    info: UserInfo
+        Данные об аккаунте
+    summary: Optional[str]
+        Краткое описание пользователя от GigaChat
+    toxicity: Optional[Tuple[str, Optional[List[int]], List[str]]]
+        Коэффициент токсичности, даты постов и ссылки на токсичные тексты
+    analytics: Optional[GraphAnalytics]
+        Показатели графа дружеских связей
+    activity_graph: Optional[str]
+        HTML графика активности
+    mutual_graph: Optional[str]
+        HTML графа дружеских связей
+
+    """
+
+    link: str
+    info: UserInfo
+    summary: Optional[str]
+    toxicity: Optional[Tuple[str, Optional[List[int]], List[str]]]
+    analytics: Optional[GraphAnalytics]
+    activity_graph: Optional[str]
+    mutual_graph: Optional[str]
+
+
+class CompactSubscriptions(Mapping):
+    """
+    Компактное представление подписок аккаунта VK: списки ID
+    хранятся в массивах int64 вместо списков объектов int.
+    Поддерживает интерфейс словаря (только для чтения)
+
+    Attributes
+    ----------
+    users: Optional[array]
+        Массив ID пользователей
+    groups: Optional[array]
+        Массив ID сообществ
+
+    """
+
+    __slots__ = ('users', 'groups')
+
+    def __init__(self, users: Optional[Iterable[int]] = None, groups: Optional[Iterable[int]] = None) -> None:
+        self.users = _to_array(users)
+        self.groups = _to_array(groups)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def to_dict(self) -> Subscriptions:
+        """Преобразование в обычный словарь Subscriptions"""
+        return Subscriptions(users=_to_list(self.users), groups=_to_list(self.groups))
+
+
+class CompactUserInfo(Mapping):
+    """
+    Компактное представление UserInfo: объект со слотами вместо словаря,
+    списки ID друзей и дат постов хранятся в массивах int64
+    (8 байт на элемент вместо 28+ байт на объект int и 8 байт на ссылку).
+    Поддерживает интерфейс словаря (только для чтения), поэтому может
+    передаваться в шаблоны и методы Vk вместо UserInfo.
+    Используется только при пакетном анализе, где в памяти одновременно
+    держится много профилей; кэш и снимки в БД хранят списки ID
+    в упакованном виде (int64) независимо от этого класса
+
+    Methods
+    -------
+    from_dict(info)
+        Создание из словаря UserInfo
+    to_dict()
+        Преобразование в обычный словарь UserInfo
+
+    """
+
+    __slots__ = tuple(UserInfo.__annotations__)
+
+    def __init__(self, **fields: Any) -> None:
+        for key in self.__slots__:
+            value = fields.get(key)
+            if key in ('friends', 'post_dates'):
+                value = _to_array(value)
+            elif key == 'subscriptions' and value is not None and not isinstance(value, CompactSubscriptions):
+                value = CompactSubscriptions(value.get('users'), value.get('groups'))
+            setattr(self, key, value)
+
+    @classmethod
+    def from_dict(cls, info: UserInfo) -> 'CompactUserInfo':
+        """
+        Создание компактного представления из словаря UserInfo
+
+        Parameters
+        ----------
+        info: UserInfo
+            Словарь с данными об аккаунте VK
+
+        Returns
+        -------
+        CompactUserInfo
+            Компактное представление
+
+        """
+        return cls(**info)
+
+    def to_dict(self) -> UserInfo:
+        """
+        Преобразование в обычный словарь UserInfo
+
+        Returns
+        -------
+        UserInfo
+            Словарь с данными об аккаунте VK
+
+        """
+        info = UserInfo(**{key: getattr(self, key) for key in self.__slots__})
+        info['friends'] = _to_list(self.friends)
+        info['post_dates'] = _to_list(self.post_dates)
+        if self.subscriptions is not None:
+            info['subscriptions'] = self.subscriptions.to_dict()
+        return info
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+
+def _to_array(values: Optional[Iterable[int]]) -> Optional[array]:
+    """Упаковка последовательности ID в массив int64 (None сохраняется)"""
+    if values is None or isinstance(values, array):
+        return values
+    return array('q', values)
+
+
+def _to_list(values: Optional[array]) -> Optional[List[int]]:
+    """Распаковка массива int64 в список (None сохраняется)"""
+    return None if values is None else values.tolist()
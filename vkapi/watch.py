@@ -0,0 +1,216 @@
+"""Синхронизация отслеживаемых аккаунтов и запись их изменений"""
+
+from math import ceil
+from time import time
+from typing import Dict, List, Optional, Tuple
+
+from main.models import VkAccount, ProfileChange
+from .vk_tools import Vk
+
+SECTION_COUNTERS = {
+    'friends': ('friends',),
+    'subscriptions': ('groups', 'pages', 'subscriptions'),
+    'activity': ('posts',)
+}
+
+
+def diff_ids(before: List[int], after: List[int]) -> Tuple[List[int], List[int]]:
+    """
+    Функция сравнения двух списков ID
+
+    Parameters
+    ----------
+    before: List[int]
+        ID при прошлой синхронизации
+    after: List[int]
+        Актуальные ID
+
+    Returns
+    -------
+    Tuple[List[int], List[int]]
+        Добавленные и удалённые ID
+
+    """
+    old, new = set(before), set(after)
+    return sorted(new - old), sorted(old - new)
+
+
+def changed_sections(before: Optional[Dict[str, int]], after: Dict[str, int]) -> List[str]:
+    """
+    Функция, возвращающая разделы, счётчики которых изменились
+    (все разделы, если аккаунт ещё не синхронизировался)
+
+    Parameters
+    ----------
+    before: Optional[Dict[str, int]]
+        Счётчики при прошлой синхронизации
+    after: Dict[str, int]
+        Актуальные счётчики
+
+    Returns
+    -------
+    List[str]
+        Названия разделов
+
+    """
+    if before is None:
+        return list(SECTION_COUNTERS)
+    return [section for section, keys in SECTION_COUNTERS.items()
+            if any(before.get(key) != after.get(key) for key in keys)]
+
+
+def _synced_at(account: VkAccount) -> float:
+    """Время последней синхронизации записи (0, если её не было)"""
+    return (account.watch_state or {}).get('synced_at', 0)
+
+
+def _mark_closed(account: VkAccount, _id: int) -> None:
+    """
+    Функция, запоминающая проверку закрытого или удалённого аккаунта
+    (состояние разделов сохраняется до открытия профиля)
+
+    Parameters
+    ----------
+    account: VkAccount
+        Запись отслеживаемого аккаунта
+    _id: int
+        ID пользователя
+
+    """
+    account.watch_state = {**(account.watch_state or {}), 'id': _id, 'synced_at': time(), 'closed': True}
+
+
+def _sync_account(account: VkAccount, _id: int, counters: Dict[str, int],
+                  fetched: Dict[str, Optional[List[int]]]) -> List[ProfileChange]:
+    """
+    Функция, обновляющая состояние записи отслеживаемого аккаунта
+    и возвращающая найденные изменения (первая синхронизация раздела
+    только запоминает его состояние)
+
+    Parameters
+    ----------
+    account: VkAccount
+        Запись отслеживаемого аккаунта
+    _id: int
+        ID пользователя
+    counters: Dict[str, int]
+        Актуальные счётчики
+    fetched: Dict[str, Optional[List[int]]]
+        Запрошенные разделы (None, если раздел скрыт)
+
+    Returns
+    -------
+    List[ProfileChange]
+        Несохранённые изменения
+
+    """
+    state = account.watch_state or {}
+    new_counters = dict(state.get('counters') or {})
+    new_state = {'id': _id, 'synced_at': time()}
+    changes = []
+
+    for section, keys in SECTION_COUNTERS.items():
+        new_state[section] = state.get(section)
+        after = fetched.get(section)
+        if section in fetched and after is None:
+            # раздел скрыт: счётчики не обновляются, чтобы проверить его снова
+            continue
+        new_counters.update((key, counters.get(key)) for key in keys)
+        if after is None:
+            continue
+
+        new_state[section] = after
+        before = state.get(section)
+        if before is None:
+            continue
+        added, removed = diff_ids(before, after)
+        if section == 'activity' and len(after) == Vk.WATCH_POSTS:
+            # записи, вытесненные за пределы последних WATCH_POSTS, не удалены
+            removed = [post for post in removed if post > min(after)]
+        if added or removed:
+            changes.append(ProfileChange(account=account, section=section, added=added, removed=removed))
+
+    new_state['counters'] = new_counters
+    account.watch_state = new_state
+    return changes
+
+
+def sync_watchlist(vk: Vk, budget: int) -> Dict[str, int]:
+    """
+    Функция, синхронизирующая отслеживаемые аккаунты с бюджетом
+    вызовов API на один цикл. Сначала одним пакетом запрашиваются
+    счётчики всех аккаунтов, затем полностью - только разделы, счётчики
+    которых изменились. Аккаунты обходятся начиная с давно
+    синхронизированных, не уместившиеся в бюджет остаются до следующего
+    цикла. Закрытые и удалённые аккаунты отмечаются проверенными, чтобы
+    не занимать бюджет следующего цикла. Замены с неизменным итоговым
+    счётчиком (один друг удалён, другой добавлен) обнаруживаются при
+    следующем изменении счётчика
+
+    Parameters
+    ----------
+    vk: Vk
+        Объект доступа к API VK
+    budget: int
+        Допустимое количество вызовов API за цикл
+
+    Returns
+    -------
+    Dict[str, int]
+        Количество отслеживаемых, проверенных, синхронизированных
+        и закрытых аккаунтов, записанных изменений и потраченных вызовов API
+
+    """
+    accounts: Dict[str, List[VkAccount]] = {}
+    for account in VkAccount.objects.filter(watched=True):
+        accounts.setdefault(account.link, []).append(account)
+    links = sorted(accounts, key=lambda link: min(_synced_at(account) for account in accounts[link]))
+
+    calls = 0
+    ids = {link: next((account.watch_state['id'] for account in accounts[link]
+                       if account.watch_state and 'id' in account.watch_state), None) for link in links}
+    unresolved = [link for link in links if ids[link] is None]
+    if unresolved:
+        calls += ceil(len(unresolved) / Vk.EXECUTE_BATCH)
+        ids.update(zip(unresolved, vk.resolve_links(unresolved)))
+
+    # счётчики: по два execute (users.get и wall.get) на EXECUTE_BATCH аккаунтов
+    links = [link for link in links if ids[link] is not None]
+    links = links[:max(0, (budget - calls) // 2) * Vk.EXECUTE_BATCH]
+    counters = vk.get_counters([ids[link] for link in links]) if links else {}
+    calls += 2 * ceil(len(links) / Vk.EXECUTE_BATCH)
+
+    synced = closed = 0
+    changes = []
+    for link in links:
+        _id = ids[link]
+        current = counters.get(_id)
+        if current is None:
+            for account in accounts[link]:
+                _mark_closed(account, _id)
+            VkAccount.objects.bulk_update(accounts[link], ['watch_state'])
+            closed += 1
+            continue
+
+        sections = {section for account in accounts[link] for section in
+                    changed_sections((account.watch_state or {}).get('counters'), current)}
+        sections = [section for section in SECTION_COUNTERS if section in sections]
+        if calls + len(sections) > budget:
+            break
+        fetched = vk.get_profile_sections(_id, sections)
+        calls += len(sections)
+
+        for account in accounts[link]:
+            changes += _sync_account(account, _id, current, fetched)
+        VkAccount.objects.bulk_update(accounts[link], ['watch_state'])
+        synced += 1
+
+    ProfileChange.objects.bulk_create(changes)
+    return {
+        'watched': len(accounts),
+        'checked': len(counters),
+        'synced': synced,
+        'closed': closed,
+        'changes': len(changes),
+        'calls': calls
+    }